@@ -2,7 +2,7 @@ import os
 import base64
 import requests
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, BinaryIO, Union
 from prompts import SYSTEM_MESSAGE_EXTRACT, SYSTEM_MESSAGE_TRANSLATE
 import logging
 import re
@@ -24,6 +24,45 @@ DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4o")
 logger = logging.getLogger("APIClient")
 
 
+def read_image_bytes(image: Union[str, bytes, BinaryIO]) -> bytes:
+    """
+    Get the encoded bytes of an image given as a path, bytes or a binary buffer.
+    
+    Args:
+        image: Path to the image, encoded image bytes or a binary buffer
+        
+    Returns:
+        Encoded image bytes
+    """
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    if isinstance(image, memoryview):
+        return image.tobytes()
+    if hasattr(image, "read"):
+        return image.read()
+    with open(image, "rb") as img_file:
+        return img_file.read()
+
+
+def detect_image_mime_type(image_bytes: bytes) -> str:
+    """
+    Detect the MIME type of encoded image bytes from their signature.
+    
+    Args:
+        image_bytes: Encoded image bytes
+        
+    Returns:
+        MIME type (PNG is assumed when the format is not recognized)
+    """
+    if image_bytes.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if image_bytes[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/png"
+
+
 class OpenAIClient:
     """Client for interacting with OpenAI API or compatible server"""
     
@@ -48,21 +87,20 @@ class OpenAIClient:
             "Content-Type": "application/json"
         }
     
-    def encode_image(self, image_path: str) -> str:
+    def encode_image(self, image: Union[str, bytes, BinaryIO]) -> str:
         """
         Encode an image to base64.
         
         Args:
-            image_path: Path to the image
+            image: Path to the image, encoded image bytes or a binary buffer
             
         Returns:
             Base64 string
         """
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode('utf-8')
+        return base64.b64encode(read_image_bytes(image)).decode('utf-8')
     
     def process_page(self, 
-                    image_path: str, 
+                    image: Union[str, bytes, BinaryIO], 
                     previous_context: str = "", 
                     instructions: str = "Extract all textual information from the document page and format it in Markdown",
                     translate: bool = False,
@@ -71,7 +109,7 @@ class OpenAIClient:
         Process a document page through the API.
         
         Args:
-            image_path: Path to the page image
+            image: Path to the page image, encoded image bytes or a binary buffer
             previous_context: Context from previous pages (not used in current implementation)
             instructions: Instructions for the model
             translate: Flag indicating whether to translate the content
@@ -80,8 +118,32 @@ class OpenAIClient:
         Returns:
             Extracted and formatted text
         """
+        return self.request_page(image, previous_context, instructions, translate, target_language)["content"]
+    
+    def request_page(self, 
+                     image: Union[str, bytes, BinaryIO], 
+                     previous_context: str = "", 
+                     instructions: str = "Extract all textual information from the document page and format it in Markdown",
+                     translate: bool = False,
+                     target_language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process a document page through the API and return response details.
+        
+        Args:
+            image: Path to the page image, encoded image bytes or a binary buffer
+            previous_context: Context from previous pages (not used in current implementation)
+            instructions: Instructions for the model
+            translate: Flag indicating whether to translate the content
+            target_language: Target language for translation
+            
+        Returns:
+            Dictionary with the extracted text ("content"), the finish reason
+            ("finish_reason") and token usage as reported by the API ("usage")
+        """
         # Encode the image
-        base64_image = self.encode_image(image_path)
+        image_bytes = read_image_bytes(image)
+        mime_type = detect_image_mime_type(image_bytes)
+        base64_image = base64.b64encode(image_bytes).decode('utf-8')
         
         # Create messages for the model
         messages = []
@@ -105,7 +167,7 @@ class OpenAIClient:
         content.append({
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/png;base64,{base64_image}"
+                "url": f"data:{mime_type};base64,{base64_image}"
             }
         })
         
@@ -143,7 +205,8 @@ class OpenAIClient:
         result = response.json()
         
         try:
-            content = result["choices"][0]["message"]["content"]
+            choice = result["choices"][0]
+            content = choice["message"]["content"]
             # Логируем ответ модели
             logger.info(f"Received response from {self.model} ({len(content)} chars)")
             
@@ -152,7 +215,11 @@ class OpenAIClient:
             # Удаляем пустые строки, которые могли остаться после удаления блока размышлений
             cleaned_content = re.sub(r'\n{3,}', '\n\n', cleaned_content)
             
-            return cleaned_content
+            return {
+                "content": cleaned_content,
+                "finish_reason": choice.get("finish_reason"),
+                "usage": result.get("usage") or {}
+            }
         except (KeyError, IndexError) as e:
             logger.error(f"Unexpected response format: {str(e)}, {result}")
             raise Exception(f"Unexpected response format: {str(e)}, {result}") 
\ No newline at end of file
@@ -3,17 +3,38 @@
 
 import os
 import argparse
+import hashlib
+import json
 import logging
+import re
 import tempfile
+from contextlib import ExitStack
 from pathlib import Path
 from tqdm import tqdm
 from dotenv import load_dotenv
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from pdf_utils import extract_images_from_pdf, get_pdf_metadata, resize_image_if_needed
-from api_client import OpenAIClient
+from pdf_utils import (Document, iter_page_images, get_page_range, parse_page_set, format_page_set, select_sections,
+                       get_pdf_metadata, get_image_info, page_image_dpi, crop_image_margins, render_thumbnails)
+from image_encoder import DEFAULT_FORMATS, DEFAULT_MAX_BYTES, LEGIBLE_DPI, encode_image
+from render_backends import (RENDER_BACKENDS, DEFAULT_RENDER_BACKEND, check_render_backend,
+                             get_render_backend)
+from render_cache import RenderCache, DEFAULT_CACHE_DIR, DEFAULT_RENDER_CACHE_SIZE_MB
+from metadata_cache import MetadataCache, describe_document
+from page_analysis import (DEFAULT_BLANK_THRESHOLD, DEFAULT_COLOR_THRESHOLD, page_ink_stats, is_blank_page, page_color_mode,
+                           page_dhash, hamming_distance)
+from page_tiling import needs_tiling, plan_tiles, split_page_image, stitch_tile_markdown
+from model_profiles import MODEL_PROFILES, get_model_profile
+from page_index import PageTextIndex, find_keyword_pages
+from text_layer import (DEFAULT_TEXT_LAYER_SCORE, page_layout_stats, score_text_layer, find_repeated_lines,
+                        text_layer_markdown)
+from response_checks import check_response
+from workspace import DEFAULT_WORKSPACE_DIR, DEFAULT_WORKSPACE_SIZE_MB, Workspace, estimate_page_bytes
+from dpi_calibration import CALIBRATION_DPIS, DEFAULT_AGREEMENT, DEFAULT_SAMPLE_PAGES, calibrate_dpi, pick_sample_pages
+from api_client import OpenAIClient, read_image_bytes
 from markdown_generator import create_markdown_file, merge_markdown_files, clean_markdown, add_table_of_contents
-from prompts import PAGE_INSTRUCTION_TEMPLATE, PAGE_INSTRUCTION_TEMPLATE_TRANSLATE
+from prompts import PAGE_INSTRUCTION_TEMPLATE, PAGE_INSTRUCTION_TEMPLATE_TRANSLATE, PAGE_TILE_INSTRUCTION
 
 
 # Logging setup
@@ -34,19 +55,289 @@ def parse_args():
     parser.add_argument("pdf_path", help="Path to the PDF file")
     parser.add_argument("--output", "-o", help="Directory for saving results", default="output")
     parser.add_argument("--model", "-m", help="Model to use", default=None)
-    parser.add_argument("--temp-dir", "-t", help="Temporary directory for images", default=None)
+    parser.add_argument("--temp-dir", "-t", help="Temporary directory for images (not cleaned up; by default a managed workspace is used)", default=None)
+    parser.add_argument("--workspace-dir", help="Root of the managed run workspaces", default=DEFAULT_WORKSPACE_DIR)
+    parser.add_argument("--workspace-size", type=int, help="Disk budget in MB of all run workspaces; artifacts kept from failed and debug runs are evicted beyond it when a run starts or ends", default=DEFAULT_WORKSPACE_SIZE_MB)
+    parser.add_argument("--tmpfs", action="store_true", help="Place the run workspace on tmpfs (/dev/shm) if there is enough RAM")
     parser.add_argument("--poppler-path", "-p", help="Path to Poppler executable files (e.g., C:/Poppler/Library/bin)", default=None)
     parser.add_argument("--debug", action="store_true", help="Enable debug mode")
     parser.add_argument("--translate", "-tr", action="store_true", help="Enable translation of the parsed document")
     parser.add_argument("--target-language", "-tl", help="Target language for translation (e.g., 'Russian', 'German')", default=None)
     parser.add_argument("--start-page", "-sp", type=int, help="First page to process (1-based index)", default=None)
     parser.add_argument("--end-page", "-ep", type=int, help="Last page to process (1-based index)", default=None)
+    parser.add_argument("--sections", nargs="+", help="Process only outline (bookmark) sections whose titles match these regular expressions, e.g. \"electrical characteristics\"", default=None)
+    parser.add_argument("--list-sections", action="store_true", help="Print the document outline with page ranges and exit")
+    parser.add_argument("--find", nargs="+", help="Process only pages whose text layer contains these words or phrases, e.g. \"ADC_CR1\" \"STM32F4*\"", default=None)
+    parser.add_argument("--find-regex", nargs="+", help="Process only pages whose text layer matches these regular expressions", default=None)
+    parser.add_argument("--find-neighbors", type=int, help="Also process this many pages before and after each --find/--find-regex match", default=0)
+    parser.add_argument("--pages", "-ps", help="Pages to process, e.g. \"1-4,37,120-140\" (instead of --start-page/--end-page)", default=None)
+    parser.add_argument("--render-workers", "-w", type=int, help="Number of parallel page rendering workers", default=1)
+    parser.add_argument("--chunk-size", type=int, help="Maximum number of consecutive pages rendered per renderer call", default=4)
+    parser.add_argument("--in-memory", action="store_true", help="Keep rendered pages in memory instead of writing them to the temporary directory")
+    parser.add_argument("--render-cache-dir", help="Directory of the persistent render cache", default=os.path.join(DEFAULT_CACHE_DIR, "renders"))
+    parser.add_argument("--render-cache-size", type=int, help="Render cache size budget in MB", default=DEFAULT_RENDER_CACHE_SIZE_MB)
+    parser.add_argument("--no-render-cache", action="store_true", help="Disable the persistent render cache")
+    parser.add_argument("--no-metadata-cache", action="store_true", help="Disable the persistent document metadata cache")
+    parser.add_argument("--no-mmap", action="store_true", help="Read the PDF through regular file I/O instead of a memory mapping")
+    parser.add_argument("--passthrough-scans", action="store_true", help="Send embedded JPEG/CCITT images of single-image scanned pages instead of rendering them")
+    parser.add_argument("--skip-blank-pages", action="store_true", help="Do not send blank and 'intentionally left blank' pages to the model")
+    parser.add_argument("--blank-threshold", type=float, help="Ink coverage (fraction of page pixels) below which a page counts as blank", default=DEFAULT_BLANK_THRESHOLD)
+    parser.add_argument("--crop-margins", action="store_true", help="Crop empty page margins before sending pages to the model")
+    parser.add_argument("--crop-padding", type=int, help="Padding in pixels kept around the content when cropping margins", default=16)
+    parser.add_argument("--tile-large-pages", action="store_true", help="Split pages larger than the model's image limits into overlapping tiles")
+    parser.add_argument("--tile-workers", type=int, help="Number of tiles of a page sent to the model concurrently", default=4)
+    parser.add_argument("--image-formats", nargs="+", choices=DEFAULT_FORMATS, help="Image formats the encoder may send (palette = palette PNG)", default=list(DEFAULT_FORMATS))
+    parser.add_argument("--max-image-size", type=float, help="Byte budget of a page image in MB", default=DEFAULT_MAX_BYTES / (1024 * 1024))
+    parser.add_argument("--convert-monochrome", action="store_true", help="Send pages without meaningful color as grayscale, or black and white for bilevel scans")
+    parser.add_argument("--color-threshold", type=float, help="Fraction of colored pixels above which a page keeps its colors", default=DEFAULT_COLOR_THRESHOLD)
+    parser.add_argument("--dedupe-pages", action="store_true", help="Reuse the result of an earlier page for near-identical pages instead of sending them again")
+    parser.add_argument("--dedupe-distance", type=int, help="Largest perceptual hash distance (bits out of 256) between duplicate pages", default=4)
+    parser.add_argument("--dedupe-exact", action="store_true", help="Only treat pages as duplicates if their rendered images are byte-identical")
+    parser.add_argument("--thumbnail-pass", action="store_true", help="Detect blank and duplicate pages on low-resolution thumbnails and render only the remaining pages at full resolution")
+    parser.add_argument("--thumbnail-dpi", type=int, help="Resolution of the thumbnail pass", default=30)
+    parser.add_argument("--dpi", type=int, help="Rendering resolution of the pages sent to the model", default=200)
+    parser.add_argument("--calibrate-dpi", action="store_true", help="Choose the lowest resolution whose output on a few sample pages matches the highest candidate resolution (cached per document and model)")
+    parser.add_argument("--calibration-dpis", type=int, nargs="+", help="Candidate resolutions of the calibration", default=list(CALIBRATION_DPIS))
+    parser.add_argument("--calibration-pages", type=int, help="Number of sample pages of the calibration", default=DEFAULT_SAMPLE_PAGES)
+    parser.add_argument("--calibration-tolerance", type=float, help="Agreement (0-1) with the highest resolution's output required on every sample page", default=DEFAULT_AGREEMENT)
+    parser.add_argument("--progressive", action="store_true", help="Send pages at reduced resolution first and retry at full resolution only when the response looks bad")
+    parser.add_argument("--progressive-scale", type=float, help="Size of the reduced image relative to the full one", default=0.6)
+    parser.add_argument("--text-layer", action="store_true", help="Convert born-digital prose pages from their text layer instead of rendering them and sending them to the model")
+    parser.add_argument("--text-layer-score", type=float, help="Text-layer quality score (0-1) from which a page is converted locally", default=DEFAULT_TEXT_LAYER_SCORE)
+    parser.add_argument("--model-profile", choices=sorted(MODEL_PROFILES), help="Image limits and token accounting to use (chosen from --model by default)", default=None)
+    parser.add_argument("--render-timeout", type=float, help="Per-page rendering time limit in seconds; slower pages are retried at lower DPI or marked failed (renders in supervised worker processes)", default=None)
+    parser.add_argument("--render-memory-limit", type=int, help="Memory limit of a render worker process in MB (renders in supervised worker processes)", default=None)
+    parser.add_argument("--render-backend", "-rb", choices=sorted(RENDER_BACKENDS), help="Page rendering backend", default=DEFAULT_RENDER_BACKEND)
     
     return parser.parse_args()
 
 
+def crop_tokens_saved(model_profile, size, box):
+    """
+    Estimate the image tokens saved by cropping a page.
+    
+    Args:
+        model_profile: Profile of the model the page is sent to
+        size: Original image size (width, height)
+        box: Crop box (left, top, right, bottom)
+        
+    Returns:
+        Estimated token difference (negative if the crop costs more)
+    """
+    left, top, right, bottom = box
+    return model_profile.estimate_tokens(*size) - model_profile.estimate_tokens(right - left, bottom - top)
+
+
+def find_duplicate_page(processed_pages, page_hash, max_distance, digest=None, text=""):
+    """
+    Find an already processed page that the current page duplicates.
+    
+    Args:
+        processed_pages: Records of processed pages with "hash", "digest", "text" and "md_file"
+        page_hash: Perceptual hash of the current page
+        max_distance: Largest Hamming distance between duplicates
+        digest: Hash of the rendered page bytes, required to match if given
+        text: Normalized text layer of the current page; pages whose text layers differ are never duplicates
+        
+    Returns:
+        Record of the closest duplicate, or None
+    """
+    best, best_distance = None, max_distance + 1
+    for record in processed_pages:
+        if digest is not None and record["digest"] != digest:
+            continue
+        if text and record["text"] and text != record["text"]:
+            continue
+        distance = hamming_distance(page_hash, record["hash"])
+        if distance < best_distance:
+            best, best_distance = record, distance
+    return best
+
+
+def plan_page_skips(thumbnails, document, skip_blank_pages=False, blank_threshold=DEFAULT_BLANK_THRESHOLD,
+                    dedupe_pages=False, dedupe_distance=4):
+    """
+    Find the pages that need no full-resolution render, using page thumbnails.
+    
+    Args:
+        thumbnails: ThumbnailStack of the pages to process
+        document: Opened document, used for the text layer
+        skip_blank_pages: Plan blank and "intentionally left blank" pages
+        blank_threshold: Ink coverage below which a page counts as blank
+        dedupe_pages: Plan pages that duplicate an earlier page
+        dedupe_distance: Largest perceptual hash distance between duplicate pages
+        
+    Returns:
+        Dictionary {page_num: {"status": "blank"}} or {page_num: {"status": "duplicate", "duplicate_of": page}}
+    """
+    plan = {}
+    unique_pages = []
+    for page_num in thumbnails.pages:
+        thumbnail = thumbnails.get(page_num)
+        text = document.page_text(page_num)
+        if skip_blank_pages:
+            ink_stats = page_ink_stats(thumbnail)
+            if is_blank_page(ink_stats, blank_threshold, text):
+                logger.info(f"Page {page_num} is blank (ink coverage {ink_stats['ink_coverage']:.3%}), skipping API call")
+                plan[page_num] = {"status": "blank"}
+                continue
+        
+        if dedupe_pages:
+            page_record = {"page": page_num, "hash": page_dhash(thumbnail), "digest": None, "text": " ".join(text.split())}
+            duplicate = find_duplicate_page(unique_pages, page_record["hash"], dedupe_distance, text=page_record["text"])
+            if duplicate is not None:
+                logger.info(f"Page {page_num} duplicates page {duplicate['page']}, reusing its result")
+                plan[page_num] = {"status": "duplicate", "duplicate_of": duplicate["page"]}
+                continue
+            unique_pages.append(page_record)
+    return plan
+
+
+def request_tiled_page(client, page_image, boxes, instructions, encode, translate=False, target_language=None, workers=4):
+    """
+    Send a page to the model as overlapping tiles and stitch the results.
+    
+    Args:
+        client: API client
+        page_image: Path to the page image, or encoded image bytes
+        boxes: Tile boxes from plan_tiles, in reading order
+        instructions: Instructions for the whole page
+        encode: Function encoding a tile image, returning (data, info) like image_encoder.encode_image
+        translate: Flag indicating whether to translate the content
+        target_language: Target language for translation
+        workers: Number of tiles sent concurrently
+        
+    Returns:
+        Dictionary with the stitched text ("content"), token usage summed over tiles ("usage")
+        and the encoder results of the tiles ("encodings")
+    """
+    lefts = sorted({box[0] for box in boxes})
+    tops = sorted({box[1] for box in boxes})
+    
+    def request_tile(tile_num, box, tile_image):
+        tile_data, encoding = encode(tile_image)
+        tile_instructions = instructions + PAGE_TILE_INSTRUCTION.format(
+            tile_num=tile_num,
+            tile_count=len(boxes),
+            row=tops.index(box[1]) + 1,
+            rows=len(tops),
+            col=lefts.index(box[0]) + 1,
+            cols=len(lefts)
+        )
+        response = client.request_page(
+            image=tile_data,
+            instructions=tile_instructions,
+            translate=translate,
+            target_language=target_language
+        )
+        return response, encoding
+    
+    tiles = split_page_image(page_image, boxes)
+    # Results are collected in tile order, whichever tile finishes first
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(request_tile, range(1, len(boxes) + 1), boxes, tiles))
+    responses = [response for response, _ in results]
+    
+    return {
+        "content": stitch_tile_markdown([response["content"] for response in responses]),
+        "usage": {"total_tokens": sum(response["usage"].get("total_tokens", 0) for response in responses)},
+        "encodings": [encoding for _, encoding in results]
+    }
+
+
+def log_render_supervision(render_backend):
+    """
+    Log how often supervised rendering had to intervene during a run.
+    
+    Args:
+        render_backend: SupervisedBackend used for the run
+    """
+    logger.info(f"Render supervision: {render_backend.timeouts} timeouts, {render_backend.memory_failures} "
+                f"out-of-memory renders, {render_backend.errors} renderer errors, {render_backend.empty_renders} "
+                f"empty renders, {len(render_backend.degraded_pages)} pages rendered at reduced DPI, "
+                f"{len(render_backend.failed_pages)} pages failed")
+
+
+def log_run_summary(run_stats):
+    """
+    Log per-run statistics, including estimated savings from pages that were not sent to the model.
+    
+    Args:
+        run_stats: Statistics collected by process_datasheet
+    """
+    pages_sent = run_stats["pages_sent"]
+    logger.info(f"Run summary: {pages_sent} pages sent to the model in {run_stats['api_seconds']:.1f} s, "
+                f"{run_stats['api_tokens']} tokens")
+    
+    # Savings are estimated from the average cost of the pages that were sent
+    avg_seconds = run_stats["api_seconds"] / pages_sent if pages_sent else 0.0
+    avg_tokens = run_stats["api_tokens"] / pages_sent if pages_sent else 0.0
+    
+    cropped_pages = run_stats["cropped_pages"]
+    if cropped_pages:
+        logger.info(f"Cropped margins on {cropped_pages} pages, saving {run_stats['crop_bytes_saved'] / 1024:.0f} KB "
+                    f"({run_stats['crop_bytes_saved'] / cropped_pages / 1024:.1f} KB per page) and about "
+                    f"{run_stats['crop_tokens_saved']} image tokens ({run_stats['crop_tokens_saved'] / cropped_pages:.0f} per page)")
+    
+    if run_stats["encoded_images"]:
+        logger.info(f"Encoded {run_stats['encoded_images']} images in {run_stats['encode_seconds']:.1f} s "
+                    f"(mean {run_stats['encode_seconds'] / run_stats['encoded_images'] * 1000:.0f} ms per image, "
+                    f"slowest page {run_stats['encode_max_seconds'] * 1000:.0f} ms), "
+                    f"~{run_stats['image_tokens']} image tokens")
+    
+    if run_stats["color_modes"]:
+        mode_names = {"RGB": "color", "L": "grayscale", "1": "black and white"}
+        logger.info("Encoded page color modes: " + ", ".join(f"{count} {mode_names.get(mode, mode)}"
+                                                     for mode, count in sorted(run_stats["color_modes"].items())))
+    
+    if run_stats["tiled_pages"]:
+        logger.info(f"Sent {run_stats['tiled_pages']} large pages as {run_stats['tiles_sent']} tiles")
+    
+    blank_pages = run_stats["blank_pages"]
+    if blank_pages:
+        logger.info(f"Skipped {len(blank_pages)} blank pages ({', '.join(map(str, blank_pages))}), "
+                    f"saving about {len(blank_pages) * avg_seconds:.1f} s and {len(blank_pages) * avg_tokens:.0f} tokens")
+    
+    if run_stats["progressive_pages"]:
+        escalated_pages = run_stats["escalated_pages"]
+        reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(run_stats["escalation_reasons"].items()))
+        logger.info(f"Escalated {len(escalated_pages)} of {run_stats['progressive_pages']} pages sent at reduced resolution "
+                    f"to full resolution ({len(escalated_pages) / run_stats['progressive_pages']:.0%})"
+                    + (f": {reasons}" if reasons else ""))
+    
+    duplicate_pages = run_stats["duplicate_pages"]
+    if duplicate_pages:
+        logger.info(f"Reused results for {len(duplicate_pages)} duplicate pages ({', '.join(map(str, duplicate_pages))}), "
+                    f"saving about {len(duplicate_pages) * avg_seconds:.1f} s and {len(duplicate_pages) * avg_tokens:.0f} tokens")
+    
+    text_layer_pages = run_stats["text_layer_pages"]
+    if text_layer_pages:
+        logger.info(f"Converted {len(text_layer_pages)} pages from the text layer ({format_page_set(text_layer_pages)}), "
+                    f"saving about {len(text_layer_pages) * avg_seconds:.1f} s and {len(text_layer_pages) * avg_tokens:.0f} tokens")
+    
+    if run_stats["page_paths"]:
+        path_names = {"sent": "sent to the model", "text_layer": "from the text layer", "blank": "blank",
+                      "duplicate": "duplicate", "failed": "failed"}
+        logger.info("Pages by path: " + ", ".join(f"{count} {path_names.get(status, status)}"
+                                                  for status, count in sorted(run_stats["page_paths"].items())))
+
+
 def process_datasheet(pdf_path, output_dir, model=None, context_window=2, temp_dir=None, poppler_path=None, 
-                     debug=False, translate=False, target_language=None, start_page=None, end_page=None, use_context=True):
+                     debug=False, translate=False, target_language=None, start_page=None, end_page=None, use_context=True,
+                     render_workers=1, chunk_size=4, render_backend=DEFAULT_RENDER_BACKEND, in_memory=False,
+                     render_cache_dir=None, render_cache_size=DEFAULT_RENDER_CACHE_SIZE_MB, metadata_cache_dir=None,
+                     use_mmap=True, passthrough_scans=False, skip_blank_pages=False,
+                     blank_threshold=DEFAULT_BLANK_THRESHOLD, crop_margins=False, crop_padding=16,
+                     tile_large_pages=False, tile_workers=4, image_formats=DEFAULT_FORMATS,
+                     max_image_bytes=DEFAULT_MAX_BYTES, model_profile=None, convert_monochrome=False,
+                     color_threshold=DEFAULT_COLOR_THRESHOLD, dedupe_pages=False, dedupe_distance=4,
+                     dedupe_exact=False, thumbnail_pass=False, thumbnail_dpi=30, dpi=200, dpi_calibration=False,
+                     calibration_dpis=CALIBRATION_DPIS, calibration_pages=DEFAULT_SAMPLE_PAGES,
+                     calibration_tolerance=DEFAULT_AGREEMENT, progressive=False, progressive_scale=0.6,
+                     workspace_dir=None, workspace_size=DEFAULT_WORKSPACE_SIZE_MB, use_tmpfs=False,
+                     render_timeout=None, render_memory_limit=None, pages=None, sections=None,
+                     keywords=None, keyword_patterns=None, keyword_neighbors=0, text_layer_fast_path=False,
+                     text_layer_score=DEFAULT_TEXT_LAYER_SCORE):
     """
     Process the entire datasheet.
     
@@ -55,7 +346,7 @@ def process_datasheet(pdf_path, output_dir, model=None, context_window=2, temp_d
         output_dir: Directory for saving results
         model: Model identifier to use
         context_window: Number of previous pages for context
-        temp_dir: Directory for temporary files
+        temp_dir: Directory for temporary files (a managed workspace is used if not specified)
         poppler_path: Path to Poppler executable files
         debug: Debug mode flag
         translate: Flag indicating whether to translate the content
@@ -63,6 +354,62 @@ def process_datasheet(pdf_path, output_dir, model=None, context_window=2, temp_d
         start_page: First page to process (1-based index)
         end_page: Last page to process (1-based index)
         use_context: Flag indicating whether to use context from previous pages
+        render_workers: Number of page chunks rendered in parallel
+        chunk_size: Maximum number of consecutive pages rendered per renderer call
+        render_backend: Page rendering backend name (pdftoppm, pdftocairo, pdfium)
+        in_memory: Keep rendered pages as encoded bytes in memory from render to request
+        render_cache_dir: Directory of the persistent render cache (None disables the cache)
+        render_cache_size: Render cache size budget in MB
+        metadata_cache_dir: Directory of the persistent metadata cache (None disables the cache)
+        use_mmap: Access the PDF through a shared read-only memory mapping
+        passthrough_scans: Send embedded images of single-image scanned pages instead of rendering them
+        skip_blank_pages: Write a placeholder instead of calling the API for blank pages
+        blank_threshold: Ink coverage below which a page counts as blank
+        crop_margins: Crop empty page margins before resizing and sending pages
+        crop_padding: Padding in pixels kept around the content when cropping
+        tile_large_pages: Split pages beyond the model profile's image limits into overlapping tiles
+        tile_workers: Number of tiles of a page sent to the model concurrently
+        image_formats: Image formats the encoder may send ("png", "palette", "jpeg", "webp")
+        max_image_bytes: Byte budget of a page image
+        model_profile: Name of the model profile (image limits and token accounting);
+            chosen from the model name if not specified
+        convert_monochrome: Send pages without meaningful color as grayscale or black and white
+        color_threshold: Fraction of colored pixels above which a page keeps its colors
+        dedupe_pages: Reuse the result of an earlier near-identical page instead of sending the page
+        dedupe_distance: Largest perceptual hash distance (bits out of 256) between duplicate pages
+        dedupe_exact: Also require duplicate pages to render to identical bytes
+        thumbnail_pass: Detect blank and duplicate pages on low-resolution thumbnails, so that
+            only the remaining pages are rendered at full resolution
+        thumbnail_dpi: Resolution of the thumbnail pass
+        dpi: Rendering resolution of the pages sent to the model
+        dpi_calibration: Choose the rendering resolution by comparing model outputs on sample pages,
+            replacing ``dpi``
+        calibration_dpis: Candidate resolutions of the calibration
+        calibration_pages: Number of sample pages of the calibration
+        calibration_tolerance: Agreement with the highest resolution's output required on every sample page
+        progressive: Send each page at a reduced resolution first and retry at full resolution only
+            when the response looks bad (truncated, short, garbled numbers, text layer mismatch)
+        progressive_scale: Size of the first, reduced image relative to the full one
+        workspace_dir: Root of the managed workspaces (default: DEFAULT_WORKSPACE_DIR)
+        workspace_size: Disk budget in MB of all workspaces under the root, shared by concurrent runs
+        use_tmpfs: Place the workspace on tmpfs (/dev/shm) if there is enough RAM
+        render_timeout: Per-page rendering time limit in seconds; pages exceeding it are retried
+            at lower DPI or marked failed
+        render_memory_limit: Memory limit of a render worker process in MB
+        pages: Page set such as "1-4,37,120-140", or a list of page numbers (1-based);
+            used instead of start_page/end_page. Only these pages are rendered, and they
+            are merged into a single output
+        sections: Regular expressions matched against outline (bookmark) titles, ignoring case;
+            only pages of matching sections (and their subsections) are processed
+        keywords: Words or phrases looked up in the text layer; only matching pages
+            are processed. A trailing "*" matches any word ending
+        keyword_patterns: Regular expressions searched in the text layer, ignoring case;
+            only matching pages are processed
+        keyword_neighbors: Number of pages before and after each keyword match to process as well
+        text_layer_fast_path: Convert pages whose text layer scores at least ``text_layer_score``
+            (see text_layer.score_text_layer) to Markdown locally, without rendering them or
+            calling the model. Not available with translation
+        text_layer_score: Smallest text-layer quality score of the pages converted locally
     
     Returns:
         Path to the generated Markdown file
@@ -78,129 +425,505 @@ def process_datasheet(pdf_path, output_dir, model=None, context_window=2, temp_d
         prompt_logger.addHandler(prompt_file_handler)
         prompt_logger.setLevel(logging.DEBUG)
     
-    # Get PDF metadata
+    # Open the PDF once and share it between metadata, rendering and text-layer code
     logger.info(f"Extracting metadata from {pdf_path}")
-    metadata = get_pdf_metadata(pdf_path)
-    total_pages = metadata.get('page_count', 0)
-    logger.info(f"Title: {metadata.get('title', 'Unknown')}, pages: {total_pages}")
-    
-    # Validate page range
-    if start_page is not None:
-        logger.info(f"Starting from page {start_page}")
-    if end_page is not None:
-        logger.info(f"Ending at page {end_page}")
-    
-    # Determine output filename based on PDF name
-    output_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    
-    # Add page range to filename if specified
-    page_range_suffix = ""
-    if start_page is not None or end_page is not None:
-        start_str = str(start_page) if start_page is not None else "1"
-        end_str = str(end_page) if end_page is not None else str(total_pages)
-        page_range_suffix = f"_p{start_str}-{end_str}"
-        output_name = f"{output_name}{page_range_suffix}"
-    
-    if translate and target_language:
-        output_name = f"{output_name}_{target_language.lower()}"
-    
-    # Extract page images
-    logger.info(f"Extracting pages from PDF as images")
-    image_paths = extract_images_from_pdf(
-        pdf_path, 
-        temp_dir, 
-        poppler_path,
-        start_page=start_page,
-        end_page=end_page
-    )
-    logger.info(f"Extracted {len(image_paths)} pages")
-    
-    # Initialize API client
-    client = OpenAIClient(model=model)
-    
-    # Process each page
-    page_markdown_files = []
-    context = ""
-    context_pages = []
-    
-    # We're disabling context by default, so we'll just log that it's disabled
-    logger.info("Context feature is disabled. Each page will be processed independently.")
-    
-    logger.info(f"Starting page processing")
-    for i, image_path in enumerate(tqdm(image_paths)):
-        # Get actual page number (file name format: page_XXX.png)
-        page_filename = os.path.basename(image_path)
-        try:
-            page_num = int(page_filename.split('_')[1].split('.')[0])
-        except (IndexError, ValueError):
-            page_num = i + 1  # Fallback if filename parsing fails
-            
-        logger.info(f"Processing page {page_num}/{total_pages}")
+    metadata_cache = MetadataCache(metadata_cache_dir) if metadata_cache_dir else None
+    document_info = metadata_cache.get(pdf_path) if metadata_cache is not None else None
+    if document_info is not None:
+        logger.info("Using cached document metadata")
+    pdf_hash = metadata_cache.file_hash(pdf_path) if metadata_cache is not None else None
+    
+    with Document(pdf_path, sha256=pdf_hash, info=document_info, use_mmap=use_mmap) as document, \
+            Workspace(workspace_dir, workspace_size, keep=debug) as workspace, ExitStack() as cleanup:
+        if metadata_cache is not None and document_info is None:
+            document_info = describe_document(document)
+            metadata_cache.put(document_info)
+        metadata = get_pdf_metadata(document)
+        total_pages = metadata.get('page_count', 0)
+        logger.info(f"Title: {metadata.get('title', 'Unknown')}, pages: {total_pages}")
+    
+        # Validate page range
+        if start_page is not None:
+            logger.info(f"Starting from page {start_page}")
+        if end_page is not None:
+            logger.info(f"Ending at page {end_page}")
+    
+        # Determine output filename based on PDF name
+        output_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    
+        # Select the pages to process
+        if pages is not None:
+            if isinstance(pages, str):
+                pages = parse_page_set(pages, total_pages)
+            selected_pages = sorted({page_num for page_num in pages if 1 <= page_num <= total_pages})
+            if not selected_pages:
+                raise ValueError(f"The page set selects no pages of the document ({total_pages} pages)")
+        else:
+            first_page, last_page = get_page_range(total_pages, start_page, end_page)
+            selected_pages = list(range(first_page, last_page + 1))
+        if sections:
+            section_pages = set(select_sections(document.outline, sections))
+            selected_pages = [page_num for page_num in selected_pages if page_num in section_pages]
+            if not selected_pages:
+                raise ValueError(f"No outline sections match {', '.join(sections)} in the selected pages")
+        if keywords or keyword_patterns:
+            index = PageTextIndex.from_document(document, selected_pages)
+            selected_pages = find_keyword_pages(index, keywords, keyword_patterns, keyword_neighbors)
+            if not selected_pages:
+                raise ValueError("No pages of the selection match the search terms (pages without a text layer cannot be searched)")
+        page_selection = pages is not None or sections or keywords or keyword_patterns
+        if page_selection:
+            logger.info(f"Processing pages {format_page_set(selected_pages)}")
+    
+        # Add page range to filename if specified
+        page_range_suffix = ""
+        if page_selection:
+            page_range_suffix = f"_p{format_page_set(selected_pages, '_')}"
+            if len(page_range_suffix) > 40:
+                page_range_suffix = f"_p{selected_pages[0]}-{selected_pages[-1]}_{len(selected_pages)}pages"
+            output_name = f"{output_name}{page_range_suffix}"
+        elif start_page is not None or end_page is not None:
+            start_str = str(start_page) if start_page is not None else "1"
+            end_str = str(end_page) if end_page is not None else str(total_pages)
+            page_range_suffix = f"_p{start_str}-{end_str}"
+            output_name = f"{output_name}{page_range_suffix}"
+    
+        if translate and target_language:
+            output_name = f"{output_name}_{target_language.lower()}"
+    
+        # Render pages lazily: each page is sent to the API as soon as it is rendered
+        page_count = len(selected_pages)
+        logger.info(f"Rendering {page_count} pages from PDF as images")
+        render_cache = None
+        if render_cache_dir:
+            render_cache = RenderCache(render_cache_dir, render_cache_size)
+            logger.info(f"Using render cache at {render_cache_dir}")
         
-        # Check and resize image if needed
-        img_path = resize_image_if_needed(image_path)
+        # A pathological page must not stall the run: render in supervised worker processes with limits
+        if render_timeout or render_memory_limit:
+            render_backend = cleanup.enter_context(get_render_backend(render_backend, poppler_path,
+                                                                      page_timeout=render_timeout,
+                                                                      max_memory_mb=render_memory_limit))
+            # Shut the workers down and report even when the run fails part way
+            cleanup.callback(log_render_supervision, render_backend)
         
-        # Create instructions for the model
-        if translate and target_language:
-            logger.info(f"Translating content to {target_language}")
-            instructions = PAGE_INSTRUCTION_TEMPLATE_TRANSLATE.format(
-                page_num=page_num,
-                total_pages=total_pages,
-                target_language=target_language
-            )
-        else:
-            instructions = PAGE_INSTRUCTION_TEMPLATE.format(
+        # Initialize API client
+        client = OpenAIClient(model=model)
+        model_profile = MODEL_PROFILES[model_profile] if model_profile else get_model_profile(client.model)
+        logger.info(f"Using the {model_profile.name} model profile")
+        
+        def encode_page(image, color_mode=None, image_dpi=None, scale=1.0):
+            # Never send pixels the provider would scale away, and stay below the next token tier
+            width, height, _ = get_image_info(image)
+            target_width, target_height = model_profile.target_size(width, height)
+            data, encoding = encode_image(image, max_image_bytes, min_scale=min(1.0, LEGIBLE_DPI / (image_dpi or dpi)),
+                                          max_side=max(1, round(max(target_width, target_height) * scale)),
+                                          formats=image_formats, color_mode=color_mode)
+            encoding["image_tokens"] = model_profile.estimate_tokens(encoding["width"], encoding["height"])
+            return data, encoding
+        
+        def page_instructions(page_num):
+            if translate and target_language:
+                return PAGE_INSTRUCTION_TEMPLATE_TRANSLATE.format(
+                    page_num=page_num,
+                    total_pages=total_pages,
+                    target_language=target_language
+                )
+            return PAGE_INSTRUCTION_TEMPLATE.format(
                 page_num=page_num,
                 total_pages=total_pages
             )
         
-        # Process the page
-        try:
-            logger.info(f"Sending page {page_num} image to API")
-            # We're always passing an empty context now, regardless of use_context
-            previous_context = ""
-            
-            markdown_content = client.process_page(
-                image_path=img_path,
-                previous_context=previous_context,
-                instructions=instructions,
-                translate=translate,
-                target_language=target_language
+        # Born-digital prose pages are converted from their text layer, with no render and no API call
+        page_plan = {}
+        text_layer_scores = {}
+        if text_layer_fast_path and translate:
+            logger.warning("The text-layer fast path cannot translate, sending all pages to the model")
+        elif text_layer_fast_path:
+            text_layer_started = time.perf_counter()
+            texts = {page_num: document.page_text(page_num) for page_num in selected_pages}
+            repeated_lines = find_repeated_lines(texts.values())
+            for page_num in selected_pages:
+                text_layer_scores[page_num] = score_text_layer(texts[page_num], page_layout_stats(document.page(page_num)))
+                if text_layer_scores[page_num]["score"] >= text_layer_score:
+                    markdown = text_layer_markdown(texts[page_num], repeated_lines)
+                    if markdown:
+                        page_plan[page_num] = {"status": "text_layer", "markdown": markdown}
+            logger.info(f"Scored the text layer of {page_count} pages in {time.perf_counter() - text_layer_started:.1f} s, "
+                        f"{len(page_plan)} pages converted locally")
+        model_pages = [page_num for page_num in selected_pages if page_num not in page_plan]
+        
+        # Find the cheapest legible resolution on a few sample pages; the result is cached per document and model
+        if dpi_calibration and model_pages:
+            calibrations = (document_info or {}).get("dpi_calibration", {})
+            calibration = calibrations.get(client.model)
+            if calibration is not None and calibration["dpis"] == sorted(set(calibration_dpis)) \
+                    and calibration["tolerance"] == calibration_tolerance:
+                dpi = calibration["dpi"]
+                logger.info(f"Using cached calibrated resolution of {dpi} DPI")
+            else:
+                sample_pages = pick_sample_pages(document, model_pages, calibration_pages)
+                logger.info(f"Calibrating resolution on pages {', '.join(map(str, sample_pages))} "
+                            f"at {', '.join(map(str, sorted(set(calibration_dpis))))} DPI")
+                dpi, agreement = calibrate_dpi(
+                    pdf_path,
+                    client,
+                    sample_pages,
+                    page_instructions,
+                    dpis=calibration_dpis,
+                    tolerance=calibration_tolerance,
+                    encode=lambda image, image_dpi: encode_page(image, image_dpi=image_dpi),
+                    target_size=model_profile.target_size,
+                    poppler_path=poppler_path,
+                    backend=render_backend,
+                    cache=render_cache,
+                    document=document
+                )
+                if metadata_cache is not None:
+                    calibrations[client.model] = {
+                        "dpi": dpi,
+                        "dpis": sorted(set(calibration_dpis)),
+                        "tolerance": calibration_tolerance,
+                        "pages": sample_pages,
+                        "agreement": {str(key): value for key, value in agreement.items()}
+                    }
+                    metadata_cache.update(document.sha256, {"dpi_calibration": calibrations})
+        logger.info(f"Rendering pages at {dpi} DPI")
+        
+        # Blank and duplicate pages are found on cheap thumbnails and never rendered at full resolution.
+        # Byte-exact deduplication needs the full render and stays in the page loop.
+        if thumbnail_pass and model_pages and (skip_blank_pages or (dedupe_pages and not dedupe_exact)):
+            thumbnails_started = time.perf_counter()
+            thumbnails = render_thumbnails(
+                pdf_path,
+                model_pages,
+                dpi=thumbnail_dpi,
+                poppler_path=poppler_path,
+                backend=render_backend,
+                document=document,
+                workers=render_workers
             )
+            page_plan.update(plan_page_skips(thumbnails, document, skip_blank_pages, blank_threshold,
+                                             dedupe_pages and not dedupe_exact, dedupe_distance))
+            logger.info(f"Thumbnail pass over {len(thumbnails)} pages took {time.perf_counter() - thumbnails_started:.1f} s, "
+                        f"{page_count - len(page_plan)} pages left to render")
+        render_pages = [page_num for page_num in selected_pages if page_num not in page_plan]
+        
+        # Page images go to a workspace that is removed after a successful run, unless a directory was given
+        if temp_dir is None and not in_memory:
+            temp_dir = workspace.create(len(render_pages) * estimate_page_bytes(dpi), use_tmpfs=use_tmpfs)
+        rendered_pages = iter_page_images(
+            pdf_path, 
+            temp_dir, 
+            poppler_path,
+            pages=render_pages,
+            dpi=dpi,
+            chunk_size=chunk_size,
+            workers=render_workers,
+            backend=render_backend,
+            in_memory=in_memory,
+            cache=render_cache,
+            document=document,
+            passthrough_scans=passthrough_scans
+        )
+        
+        def iter_pages():
+            # Planned pages have no image; the rest come from the renderer in page order
+            for page_num in selected_pages:
+                if page_num in page_plan:
+                    yield page_num, None
+                else:
+                    yield next(rendered_pages)
+        page_images = iter_pages()
+    
+        # Process each page
+        page_markdown_files = []
+        context = ""
+        context_pages = []
+        page_records = []
+        processed_pages = []
+        completed_pages = {}
+        run_stats = {"pages_sent": 0, "api_seconds": 0.0, "api_tokens": 0, "blank_pages": [],
+                     "cropped_pages": 0, "crop_bytes_saved": 0, "crop_tokens_saved": 0,
+                     "tiled_pages": 0, "tiles_sent": 0, "encoded_images": 0, "encode_seconds": 0.0,
+                     "encode_max_seconds": 0.0, "image_tokens": 0, "color_modes": {}, "duplicate_pages": [],
+                     "progressive_pages": 0, "escalated_pages": [], "escalation_reasons": {},
+                     "text_layer_pages": [], "page_paths": {}}
+        
+        def record_encoding(page_num, page_record, encoding):
+            logger.info(f"Encoded page {page_num} as {encoding['format']} {encoding['mode']} {encoding['width']}x{encoding['height']} "
+                        f"({encoding['size'] / 1024:.0f} KB, ~{encoding['image_tokens']} image tokens) "
+                        f"in {encoding['seconds'] * 1000:.0f} ms")
+            if "encoding" in page_record:
+                page_record["low_res_encoding"] = page_record["encoding"]
+            page_record["encoding"] = {key: encoding[key] for key in
+                                       ("format", "quality", "width", "height", "mode", "size", "seconds",
+                                        "image_tokens")}
+            run_stats["image_tokens"] += encoding["image_tokens"]
+            run_stats["encoded_images"] += 1
+            run_stats["encode_seconds"] += encoding["seconds"]
+            run_stats["encode_max_seconds"] = max(run_stats["encode_max_seconds"], encoding["seconds"])
+    
+        # We're disabling context by default, so we'll just log that it's disabled
+        logger.info("Context feature is disabled. Each page will be processed independently.")
+    
+        logger.info(f"Starting page processing")
+        for i, (page_num, page_image) in enumerate(tqdm(page_images, total=page_count)):
+            logger.info(f"Processing page {page_num}/{total_pages}")
+            page_md_file = os.path.join(output_dir, f"{output_name}_page_{page_num:03d}.md")
+            page_record = {"page": page_num, "status": "sent"}
+            if page_num in text_layer_scores:
+                page_record["text_layer"] = text_layer_scores[page_num]
+            page_records.append(page_record)
             
-            # Clean the Markdown
-            clean_content = clean_markdown(markdown_content)
+            planned = page_plan.get(page_num)
+            if planned is not None and planned["status"] == "text_layer":
+                create_markdown_file(planned["markdown"], page_md_file)
+                page_markdown_files.append(page_md_file)
+                completed_pages[page_num] = page_md_file
+                run_stats["text_layer_pages"].append(page_num)
+                page_record["status"] = "text_layer"
+                continue
+            if planned is not None and planned["status"] == "blank":
+                create_markdown_file(f"<!-- Page {page_num}: blank page, not sent to the model -->\n", page_md_file)
+                page_markdown_files.append(page_md_file)
+                run_stats["blank_pages"].append(page_num)
+                page_record["status"] = "blank"
+                continue
+            if planned is not None:
+                original_md_file = completed_pages.get(planned["duplicate_of"])
+                if original_md_file is None:
+                    logger.error(f"Page {page_num} duplicates page {planned['duplicate_of']}, which failed")
+                    page_record["status"] = "failed"
+                    continue
+                with open(original_md_file, 'r', encoding='utf-8') as f:
+                    create_markdown_file(f.read(), page_md_file)
+                page_markdown_files.append(page_md_file)
+                run_stats["duplicate_pages"].append(page_num)
+                page_record.update(planned)
+                continue
             
-            # Save result for individual page
-            page_md_file = os.path.join(output_dir, f"{output_name}_page_{page_num:03d}.md")
-            create_markdown_file(clean_content, page_md_file)
-            page_markdown_files.append(page_md_file)
+            if page_image is None:
+                logger.error(f"Page {page_num} could not be rendered, skipping it")
+                page_record["status"] = "failed"
+                continue
+            
+            if skip_blank_pages and not thumbnail_pass:
+                ink_stats = page_ink_stats(page_image)
+                if is_blank_page(ink_stats, blank_threshold, document.page_text(page_num)):
+                    logger.info(f"Page {page_num} is blank (ink coverage {ink_stats['ink_coverage']:.3%}), skipping API call")
+                    create_markdown_file(f"<!-- Page {page_num}: blank page, not sent to the model -->\n", page_md_file)
+                    page_markdown_files.append(page_md_file)
+                    run_stats["blank_pages"].append(page_num)
+                    page_record["status"] = "blank"
+                    continue
             
-            # In debug mode: pause between requests for easier debugging
-            if debug and i < len(image_paths) - 1:
-                logger.debug(f"Pausing 3 seconds before processing next page")
-                time.sleep(3)
+            # Vendor datasheets repeat pages (ordering information, package drawings); reuse earlier results
+            if dedupe_pages and (dedupe_exact or not thumbnail_pass):
+                processed_page = {
+                    "page": page_num,
+                    "hash": page_dhash(page_image),
+                    "digest": hashlib.sha256(read_image_bytes(page_image)).hexdigest() if dedupe_exact else None,
+                    "text": " ".join(document.page_text(page_num).split()),
+                    "md_file": page_md_file
+                }
+                duplicate = find_duplicate_page(processed_pages, processed_page["hash"], dedupe_distance,
+                                                processed_page["digest"], processed_page["text"])
+                if duplicate is not None:
+                    logger.info(f"Page {page_num} duplicates page {duplicate['page']}, reusing its result")
+                    with open(duplicate["md_file"], 'r', encoding='utf-8') as f:
+                        create_markdown_file(f.read(), page_md_file)
+                    page_markdown_files.append(page_md_file)
+                    run_stats["duplicate_pages"].append(page_num)
+                    page_record["status"] = "duplicate"
+                    page_record["duplicate_of"] = duplicate["page"]
+                    continue
+            
+            # Passthrough scans and pages a supervised backend rendered at a lower DPI
+            # have their own resolution, which the legibility floor is based on
+            width, height, size_before = get_image_info(page_image)
+            image_dpi = page_image_dpi(document.page(page_num), width, height) or dpi
+            
+            if crop_margins:
+                # A narrow crop can cost more image tiles than the full page; keep the page then
+                page_image, crop_box = crop_image_margins(
+                    page_image, crop_padding,
+                    accept=lambda size, box: crop_tokens_saved(model_profile, size, box) >= 0
+                )
+                if crop_box is not None:
+                    size_after = get_image_info(page_image)[2]
+                    page_record["crop_box"] = list(crop_box)
+                    run_stats["cropped_pages"] += 1
+                    run_stats["crop_bytes_saved"] += size_before - size_after
+                    run_stats["crop_tokens_saved"] += crop_tokens_saved(model_profile, (width, height), crop_box)
+            
+            # Large-format pages are sent in tiles instead of being shrunk as a whole
+            tile_boxes = None
+            if tile_large_pages:
+                width, height, _ = get_image_info(page_image)
+                if needs_tiling(width, height, model_profile):
+                    tile_boxes = plan_tiles(width, height, model_profile)
+                    page_record["tiles"] = [list(box) for box in tile_boxes]
+                    logger.info(f"Page {page_num} is {width}x{height} px, sending it as {len(tile_boxes)} tiles")
+            
+            # Most pages are black on white and need no color channels
+            color_mode = None
+            if convert_monochrome:
+                color_mode = page_color_mode(page_image, color_threshold)
+                page_record["color_mode"] = color_mode
+            
+            # Encode the page within the byte budget, losslessly where it fits;
+            # in progressive mode the page is first sent at a reduced resolution
+            full_image = page_image
+            progressive_page = progressive and tile_boxes is None
+            if tile_boxes is None:
+                page_image, encoding = encode_page(page_image, color_mode, image_dpi,
+                                                   scale=progressive_scale if progressive_page else 1.0)
+                record_encoding(page_num, page_record, encoding)
+        
+            # Create instructions for the model
+            if translate and target_language:
+                logger.info(f"Translating content to {target_language}")
+            instructions = page_instructions(page_num)
+        
+            # Process the page
+            try:
+                logger.info(f"Sending page {page_num} image to API")
+                # We're always passing an empty context now, regardless of use_context
+                previous_context = ""
+            
+                request_started = time.perf_counter()
+                if tile_boxes is not None:
+                    response = request_tiled_page(
+                        client,
+                        page_image,
+                        tile_boxes,
+                        instructions,
+                        lambda tile_image: encode_page(tile_image, color_mode, image_dpi),
+                        translate=translate,
+                        target_language=target_language,
+                        workers=tile_workers
+                    )
+                    run_stats["tiled_pages"] += 1
+                    encode_seconds = sum(encoding["seconds"] for encoding in response["encodings"])
+                    image_tokens = sum(encoding["image_tokens"] for encoding in response["encodings"])
+                    page_record["image_tokens"] = image_tokens
+                    run_stats["encoded_images"] += len(tile_boxes)
+                    run_stats["encode_seconds"] += encode_seconds
+                    run_stats["encode_max_seconds"] = max(run_stats["encode_max_seconds"], encode_seconds)
+                    run_stats["image_tokens"] += image_tokens
+                    logger.info(f"Encoded {len(tile_boxes)} tiles of page {page_num} "
+                                f"(~{image_tokens} image tokens) in {encode_seconds * 1000:.0f} ms")
+                    run_stats["tiles_sent"] += len(tile_boxes)
+                else:
+                    response = client.request_page(
+                        image=page_image,
+                        previous_context=previous_context,
+                        instructions=instructions,
+                        translate=translate,
+                        target_language=target_language
+                    )
+                
+                # Retry at full resolution when the low-resolution result looks incomplete or misread
+                if progressive_page:
+                    run_stats["progressive_pages"] += 1
+                    reasons = check_response(response["content"], response["finish_reason"], document.page_text(page_num))
+                    if reasons:
+                        logger.info(f"Page {page_num} looks bad at reduced resolution ({', '.join(reasons)}), "
+                                    f"retrying at full resolution")
+                        run_stats["api_tokens"] += response["usage"].get("total_tokens", 0)
+                        page_record["escalated"] = reasons
+                        run_stats["escalated_pages"].append(page_num)
+                        for reason in reasons:
+                            run_stats["escalation_reasons"][reason] = run_stats["escalation_reasons"].get(reason, 0) + 1
+                        page_image, encoding = encode_page(full_image, color_mode, image_dpi)
+                        record_encoding(page_num, page_record, encoding)
+                        response = client.request_page(
+                            image=page_image,
+                            previous_context=previous_context,
+                            instructions=instructions,
+                            translate=translate,
+                            target_language=target_language
+                        )
+                run_stats["api_seconds"] += time.perf_counter() - request_started
+                run_stats["api_tokens"] += response["usage"].get("total_tokens", 0)
+                run_stats["pages_sent"] += 1
+                if convert_monochrome:
+                    # The encoder keeps black-and-white pages in grayscale when it has to shrink them
+                    encoded_mode = encoding["mode"] if tile_boxes is None else response["encodings"][0]["mode"]
+                    run_stats["color_modes"][encoded_mode] = run_stats["color_modes"].get(encoded_mode, 0) + 1
+                markdown_content = response["content"]
+            
+                # Clean the Markdown
+                clean_content = clean_markdown(markdown_content)
+            
+                # Save result for individual page
+                create_markdown_file(clean_content, page_md_file)
+                page_markdown_files.append(page_md_file)
+                completed_pages[page_num] = page_md_file
+                if dedupe_pages and (dedupe_exact or not thumbnail_pass):
+                    processed_pages.append(processed_page)
+            
+                # In debug mode: pause between requests for easier debugging
+                if debug and i < page_count - 1:
+                    logger.debug(f"Pausing 3 seconds before processing next page")
+                    time.sleep(3)
                 
-        except Exception as e:
-            logger.error(f"Error processing page {page_num}: {str(e)}")
-            # Continue with next page
+            except Exception as e:
+                logger.error(f"Error processing page {page_num}: {str(e)}")
+                page_record["status"] = "failed"
+                # Continue with next page
+    
+        if any(page_record["status"] == "failed" for page_record in page_records):
+            workspace.mark_failed()
+        for page_record in page_records:
+            run_stats["page_paths"][page_record["status"]] = run_stats["page_paths"].get(page_record["status"], 0) + 1
+        log_run_summary(run_stats)
+        
+        # Per-page metadata (status, crop boxes, ...)
+        pages_json_file = os.path.join(output_dir, f"{output_name}_pages.json")
+        with open(pages_json_file, 'w', encoding='utf-8') as f:
+            json.dump(page_records, f, indent=2)
+        if render_cache is not None:
+            logger.info(f"Render cache: {render_cache.hits} hits, {render_cache.misses} misses")
     
-    # Merge all pages into one document
-    logger.info(f"Merging {len(page_markdown_files)} pages into one document")
-    output_md_file = os.path.join(output_dir, f"{output_name}_full.md")
-    merge_markdown_files(page_markdown_files, output_md_file, metadata)
+        # Merge all pages into one document
+        logger.info(f"Merging {len(page_markdown_files)} pages into one document")
+        output_md_file = os.path.join(output_dir, f"{output_name}_full.md")
+        merge_markdown_files(page_markdown_files, output_md_file, metadata)
     
-    # Add table of contents
-    with open(output_md_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+        # Add table of contents
+        with open(output_md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
     
-    content_with_toc = add_table_of_contents(content)
+        content_with_toc = add_table_of_contents(content)
     
-    with open(output_md_file, 'w', encoding='utf-8') as f:
-        f.write(content_with_toc)
+        with open(output_md_file, 'w', encoding='utf-8') as f:
+            f.write(content_with_toc)
+    
+        logger.info(f"Processing complete. Result saved to {output_md_file}")
+        return output_md_file
+
+
+def list_sections(pdf_path):
+    """
+    Print the outline of a document with the page range of each section.
     
-    logger.info(f"Processing complete. Result saved to {output_md_file}")
-    return output_md_file
+    Args:
+        pdf_path: Path to the PDF file
+        
+    Returns:
+        Exit code
+    """
+    with Document(pdf_path) as document:
+        outline = document.outline
+    if not outline:
+        print(f"{pdf_path} has no outline")
+        return 0
+    for entry in outline:
+        page_range = str(entry["page"]) if entry["page"] == entry["end_page"] else f"{entry['page']}-{entry['end_page']}"
+        print(f"{'  ' * entry['level']}{entry['title']} (p. {page_range})")
+    return 0
 
 
 def main():
@@ -216,6 +939,9 @@ def main():
         logger.error(f"PDF file not found: {args.pdf_path}")
         return 1
     
+    if args.list_sections:
+        return list_sections(args.pdf_path)
+    
     # Check translation parameters
     if args.translate and not args.target_language:
         logger.error("Translation requested but target language not specified. Use --target-language to specify the language.")
@@ -230,6 +956,82 @@ def main():
         logger.error("End page must be greater than or equal to start page.")
         return 1
     
+    if args.pages is not None:
+        if args.start_page is not None or args.end_page is not None:
+            logger.error("Use either --pages or --start-page/--end-page, not both.")
+            return 1
+        try:
+            parse_page_set(args.pages, 0)
+        except ValueError as e:
+            logger.error(f"Invalid page set: {str(e)}")
+            return 1
+    
+    if args.sections:
+        try:
+            select_sections([], args.sections)
+        except ValueError as e:
+            logger.error(str(e))
+            return 1
+    
+    if args.find_regex:
+        for pattern in args.find_regex:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                logger.error(f"Invalid regular expression '{pattern}': {str(e)}")
+                return 1
+    
+    if args.find_neighbors < 0:
+        logger.error("Number of neighbor pages must not be negative.")
+        return 1
+    
+    if args.render_workers < 1:
+        logger.error("Number of render workers must be at least 1.")
+        return 1
+    
+    if args.chunk_size < 1:
+        logger.error("Chunk size must be at least 1.")
+        return 1
+    
+    try:
+        check_render_backend(args.render_backend)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    
+    if args.dpi < 1 or min(args.calibration_dpis) < 1:
+        logger.error("Rendering resolution must be at least 1 DPI.")
+        return 1
+    
+    if not 0 < args.progressive_scale <= 1:
+        logger.error("Progressive scale must be greater than 0 and at most 1.")
+        return 1
+    
+    if args.calibration_pages < 1:
+        logger.error("Number of calibration pages must be at least 1.")
+        return 1
+    
+    if not 0 <= args.text_layer_score <= 1:
+        logger.error("Text-layer score must be between 0 and 1.")
+        return 1
+    
+    if args.text_layer and args.translate:
+        logger.error("The text-layer fast path cannot be combined with translation.")
+        return 1
+    
+    if args.thumbnail_dpi < 1:
+        logger.error("Thumbnail resolution must be at least 1 DPI.")
+        return 1
+    
+    if (args.render_timeout is not None and args.render_timeout <= 0) or \
+            (args.render_memory_limit is not None and args.render_memory_limit <= 0):
+        logger.error("Render time and memory limits must be positive.")
+        return 1
+    
+    if args.tile_workers < 1:
+        logger.error("Number of tile workers must be at least 1.")
+        return 1
+    
     # Process the document
     try:
         output_file = process_datasheet(
@@ -244,7 +1046,51 @@ def main():
             target_language=args.target_language,
             start_page=args.start_page,
             end_page=args.end_page,
-            use_context=False  # Always disable context
+            use_context=False,  # Always disable context
+            render_workers=args.render_workers,
+            chunk_size=args.chunk_size,
+            render_backend=args.render_backend,
+            in_memory=args.in_memory,
+            render_cache_dir=None if args.no_render_cache else args.render_cache_dir,
+            render_cache_size=args.render_cache_size,
+            metadata_cache_dir=None if args.no_metadata_cache else os.path.join(DEFAULT_CACHE_DIR, "metadata"),
+            use_mmap=not args.no_mmap,
+            passthrough_scans=args.passthrough_scans,
+            skip_blank_pages=args.skip_blank_pages,
+            blank_threshold=args.blank_threshold,
+            crop_margins=args.crop_margins,
+            crop_padding=args.crop_padding,
+            tile_large_pages=args.tile_large_pages,
+            tile_workers=args.tile_workers,
+            image_formats=args.image_formats,
+            max_image_bytes=int(args.max_image_size * 1024 * 1024),
+            model_profile=args.model_profile,
+            convert_monochrome=args.convert_monochrome,
+            color_threshold=args.color_threshold,
+            dedupe_pages=args.dedupe_pages,
+            dedupe_distance=args.dedupe_distance,
+            dedupe_exact=args.dedupe_exact,
+            thumbnail_pass=args.thumbnail_pass,
+            thumbnail_dpi=args.thumbnail_dpi,
+            dpi=args.dpi,
+            dpi_calibration=args.calibrate_dpi,
+            calibration_dpis=args.calibration_dpis,
+            calibration_pages=args.calibration_pages,
+            calibration_tolerance=args.calibration_tolerance,
+            progressive=args.progressive,
+            progressive_scale=args.progressive_scale,
+            workspace_dir=args.workspace_dir,
+            workspace_size=args.workspace_size,
+            use_tmpfs=args.tmpfs,
+            render_timeout=args.render_timeout,
+            render_memory_limit=args.render_memory_limit,
+            pages=args.pages,
+            sections=args.sections,
+            keywords=args.find,
+            keyword_patterns=args.find_regex,
+            keyword_neighbors=args.find_neighbors,
+            text_layer_fast_path=args.text_layer,
+            text_layer_score=args.text_layer_score
         )
         logger.info(f"Successfully created file: {output_file}")
         return 0
@@ -0,0 +1,189 @@
+import difflib
+import logging
+import re
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pdf_utils import Document, iter_page_images
+
+
+logger = logging.getLogger("DpiCalibration")
+
+# Resolutions tried by default; the highest one is the reference
+CALIBRATION_DPIS = (100, 150, 200, 300)
+
+# Default number of sample pages
+DEFAULT_SAMPLE_PAGES = 3
+
+# Default agreement with the reference output a resolution needs on every sample page
+DEFAULT_AGREEMENT = 0.95
+
+# Images sent at sizes this close differ only by rounding in the provider's scaling
+SAME_SIZE_TOLERANCE = 0.02
+
+
+def _tokens(text: str) -> List[str]:
+    # Words and numbers only: Markdown syntax and spacing vary between runs without any loss of legibility
+    return re.findall(r"\w+", text.lower())
+
+
+def text_agreement(first: str, second: str) -> float:
+    """
+    Measure how closely two extraction results agree.
+
+    Args:
+        first: Markdown of one extraction
+        second: Markdown of the other extraction
+
+    Returns:
+        Similarity of the word and number sequences, from 0.0 to 1.0
+    """
+    first_tokens, second_tokens = _tokens(first), _tokens(second)
+    if not first_tokens and not second_tokens:
+        return 1.0
+    return difflib.SequenceMatcher(None, first_tokens, second_tokens, autojunk=False).ratio()
+
+
+def pick_sample_pages(document: Document, pages: List[int], count: int = DEFAULT_SAMPLE_PAGES) -> List[int]:
+    """
+    Choose calibration pages spread over the pages to process.
+
+    The pages are split into ``count`` equal parts, and the page with the longest
+    text layer is taken from each part, since dense pages are the first to
+    become illegible. Without a text layer the middle page of each part is used.
+
+    Args:
+        document: Opened document
+        pages: Sorted page numbers to choose from (1-based)
+        count: Number of pages to choose
+
+    Returns:
+        Sorted page numbers
+    """
+    count = max(1, min(count, len(pages)))
+    samples = []
+    for part in range(count):
+        part_pages = pages[part * len(pages) // count:(part + 1) * len(pages) // count]
+        middle = (len(part_pages) - 1) // 2
+        _, _, page_num = max((len(document.page_text(page_num).strip()), -abs(i - middle), page_num)
+                             for i, page_num in enumerate(part_pages))
+        samples.append(page_num)
+    return samples
+
+
+def distinct_payload_dpis(page_sizes: List[Tuple[float, float]], dpis: Sequence[int],
+                          target_size: Callable[[int, int], Tuple[int, int]]) -> List[int]:
+    """
+    Drop resolutions at which the model would receive the same images as at a lower one.
+
+    Providers scale large images down, so above some resolution every render is
+    sent at the same size and comparing their outputs tells nothing.
+
+    Args:
+        page_sizes: Page sizes in points (width, height), as rendered
+        dpis: Candidate resolutions
+        target_size: Function mapping a rendered size to the size sent, such as ModelProfile.target_size
+
+    Returns:
+        Sorted resolutions, the lowest of each group that results in the same image sizes
+        (within SAME_SIZE_TOLERANCE)
+    """
+    distinct, previous = [], None
+    for dpi in sorted(set(dpis)):
+        sizes = [target_size(max(1, round(width * dpi / 72)), max(1, round(height * dpi / 72)))
+                 for width, height in page_sizes]
+        if previous is not None and all(abs(size[0] - other[0]) <= other[0] * SAME_SIZE_TOLERANCE
+                                        and abs(size[1] - other[1]) <= other[1] * SAME_SIZE_TOLERANCE
+                                        for size, other in zip(sizes, previous)):
+            continue
+        distinct.append(dpi)
+        previous = sizes
+    return distinct
+
+
+def _page_sizes(document: Document, pages: List[int]) -> List[Tuple[float, float]]:
+    sizes = []
+    for page_num in pages:
+        page = document.page(page_num)
+        width, height = float(page.mediabox.width), float(page.mediabox.height)
+        # Renderers apply the page rotation
+        sizes.append((height, width) if page.get("/Rotate", 0) % 180 == 90 else (width, height))
+    return sizes
+
+
+def calibrate_dpi(pdf_path: str, client, pages: List[int], instructions: Callable[[int], str],
+                  dpis: Sequence[int] = CALIBRATION_DPIS, tolerance: float = DEFAULT_AGREEMENT,
+                  encode: Optional[Callable] = None,
+                  target_size: Optional[Callable[[int, int], Tuple[int, int]]] = None,
+                  **render_options) -> Tuple[int, Dict[int, float]]:
+    """
+    Find the lowest rendering resolution whose output matches the highest one.
+
+    The sample pages are extracted at the highest resolution first. Lower
+    resolutions are then tried from the lowest up, and the first one whose
+    output agrees with the reference within ``tolerance`` on every sample page
+    is chosen, so the remaining resolutions are never requested. Resolutions
+    that would reach the model at the same size as a lower one are not tried;
+    if that leaves a single resolution, no requests are made at all.
+
+    Args:
+        pdf_path: Path to the PDF file
+        client: API client with a process_page method
+        pages: Sample page numbers (1-based)
+        instructions: Function returning the model instructions for a page number
+        dpis: Candidate resolutions
+        tolerance: Smallest agreement (see text_agreement) accepted on every sample page
+        encode: Optional function turning a rendered page and its resolution into the payload sent,
+            returning (data, info)
+        target_size: Optional function mapping a rendered size (width, height) to the size sent
+            (see distinct_payload_dpis)
+        **render_options: Options passed on to iter_page_images (poppler_path, backend, cache, document, ...)
+
+    Returns:
+        Tuple (dpi, agreement), where agreement maps each tried resolution to its
+        lowest agreement over the sample pages
+    """
+    dpis = sorted(set(dpis))
+    if target_size is not None:
+        document = render_options.get("document")
+        if document is not None:
+            page_sizes = _page_sizes(document, pages)
+        else:
+            with Document(pdf_path) as document:
+                page_sizes = _page_sizes(document, pages)
+        distinct = distinct_payload_dpis(page_sizes, dpis, target_size)
+        if len(distinct) < len(dpis):
+            logger.info(f"{', '.join(str(dpi) for dpi in dpis if dpi not in distinct)} DPI would reach the model "
+                        f"at the same size as a lower resolution, not trying them")
+        dpis = distinct
+    if len(dpis) == 1:
+        logger.info(f"The model receives the same images at every resolution, using {dpis[0]} DPI")
+        return dpis[0], {dpis[0]: 1.0}
+
+    def extract(dpi: int) -> Dict[int, str]:
+        outputs = {}
+        for page_num, page_image in iter_page_images(pdf_path, pages=pages, dpi=dpi, in_memory=True, **render_options):
+            if page_image is None:
+                continue
+            if encode is not None:
+                page_image, _ = encode(page_image, dpi)
+            outputs[page_num] = client.process_page(page_image, instructions=instructions(page_num))
+        return outputs
+
+    started = time.perf_counter()
+    reference_dpi = dpis[-1]
+    reference = extract(reference_dpi)
+    agreement = {reference_dpi: 1.0}
+    chosen = reference_dpi
+    for dpi in dpis[:-1]:
+        outputs = extract(dpi)
+        # Pages that could not be rendered at either resolution are not compared
+        compared = [page_num for page_num in pages if page_num in outputs and page_num in reference]
+        agreement[dpi] = min((text_agreement(outputs[page_num], reference[page_num]) for page_num in compared), default=0.0)
+        logger.info(f"{dpi} DPI agrees with {reference_dpi} DPI to {agreement[dpi]:.1%} on pages {', '.join(map(str, pages))}")
+        if agreement[dpi] >= tolerance:
+            chosen = dpi
+            break
+
+    logger.info(f"Calibrated to {chosen} DPI in {time.perf_counter() - started:.1f} s")
+    return chosen, agreement
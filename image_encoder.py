@@ -0,0 +1,188 @@
+import io
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from PIL import Image
+
+from page_analysis import open_page_image
+
+
+# Default payload limit of vision APIs
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+# Formats tried by default, lossless first
+DEFAULT_FORMATS = ("png", "palette", "jpeg", "webp")
+
+# Formats that keep every pixel; the first one within the budget is used even if a lossy one is smaller
+LOSSLESS_FORMATS = ("png",)
+
+# Scale ladder of the search; the smallest scale used is the legibility floor (min_scale)
+SCALE_STEPS = (1.0, 0.85, 0.7, 0.6, 0.5, 0.4, 0.3)
+
+# Lowest resolution at which small print stays legible; the default legibility floor
+# of encode_image (min_scale 0.5) keeps it for pages rendered at 200 DPI
+LEGIBLE_DPI = 100
+
+# Qualities of the lossy formats, tried from best to worst before the scale is lowered
+QUALITY_STEPS = (85, 70, 50)
+
+# Colors of palette PNG; enough for antialiased text and line art
+PALETTE_COLORS = 64
+
+# Below this scale black-and-white pages are kept in grayscale, since thresholding
+# a downscaled page breaks thin strokes
+BILEVEL_MIN_SCALE = 0.75
+
+# Encoded size is roughly proportional to the pixel count; candidates predicted to
+# miss the budget by more than this factor are not encoded at all
+PREDICTION_SLACK = 1.25
+
+_PIL_FORMATS = {"png": "PNG", "palette": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+
+
+def _encode(img: Image.Image, image_format: str, quality: Optional[int]) -> Optional[bytes]:
+    """Encode an image in one of the candidate formats, or return None if the format does not apply"""
+    if image_format == "palette":
+        if img.mode in ("1", "P"):
+            return None
+        img = img.convert("RGB").quantize(PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
+    elif image_format in ("jpeg", "webp") and img.mode not in ("L", "RGB"):
+        img = img.convert("L" if img.mode == "1" else "RGB")
+
+    options = {"quality": quality} if quality is not None else {}
+    if image_format == "webp":
+        # Nearly the size of the default effort level at half the encode time
+        options["method"] = 2
+    buffer = io.BytesIO()
+    img.save(buffer, _PIL_FORMATS[image_format], **options)
+    return buffer.getvalue()
+
+
+def encode_image(image: Union[str, bytes, Image.Image], max_bytes: int = DEFAULT_MAX_BYTES,
+                 min_scale: float = 0.5, max_side: Optional[int] = None,
+                 formats: Iterable[str] = DEFAULT_FORMATS, color_mode: Optional[str] = None) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Encode a page image into the smallest payload that fits a byte budget.
+
+    The search walks down a fixed ladder of scales. At each scale it tries the
+    formats in order (lossy ones at decreasing quality). A lossless payload
+    that fits the budget is returned at once; otherwise the smallest fitting
+    payload is, so the page keeps the highest resolution the budget allows.
+    An input re-used as-is counts as lossless. Scales below min_scale are not
+    tried. If nothing fits, the smallest payload at min_scale is returned.
+
+    Args:
+        image: Path to the image, encoded image bytes or a PIL image
+        max_bytes: Byte budget of the payload
+        min_scale: Legibility floor: smallest scale relative to the input
+            (0.5 keeps 100 DPI for pages rendered at 200 DPI)
+        max_side: Optional limit of the longest side in pixels; the search starts there,
+            and only that size is tried if it is already below the legibility floor
+        formats: Candidate formats: "png", "palette" (palette PNG), "jpeg", "webp"
+        color_mode: Optional mode to convert the page to before encoding: "L" (grayscale)
+            or "1" (black and white, applied after scaling and only down to BILEVEL_MIN_SCALE),
+            see page_analysis.page_color_mode
+
+    Returns:
+        Tuple (data, info), where info holds the chosen "format", "quality",
+        "scale", "width", "height", "mode" and "size", plus the number of "encodes"
+        and the time spent ("seconds")
+    """
+    started = time.perf_counter()
+    original = None if isinstance(image, Image.Image) else image
+    img = open_page_image(image)
+    original_format = (img.format or "").lower()
+    width, height = img.size
+
+    base_scale = 1.0
+    if max_side and max(width, height) > max_side:
+        base_scale = max_side / max(width, height)
+    # The ladder starts at max_side and stops at the legibility floor
+    if base_scale > min_scale:
+        scales = [scale for scale in SCALE_STEPS if base_scale * scale > min_scale] + [min_scale / base_scale]
+    else:
+        scales = [1.0]
+
+    # Re-use the input as-is when it needs no scaling or mode change and is already in a candidate format
+    source_mode = img.mode
+    passthrough = None
+    if original is not None and base_scale == 1.0 and original_format in formats \
+            and color_mode in (None, source_mode):
+        if isinstance(original, (bytes, bytearray)):
+            passthrough = bytes(original)
+        else:
+            with open(original, "rb") as f:
+                passthrough = f.read()
+        # Nothing beats the input as-is, so its format is tried first
+        formats = [original_format] + [image_format for image_format in formats if image_format != original_format]
+
+    if img.mode in ("1", "P"):
+        img = img.convert("L" if img.mode == "1" else "RGB")
+    if color_mode in ("L", "1") and img.mode != "L":
+        img = img.convert("L")
+
+    best = None
+    encodes = 0
+    # Size in bytes per pixel of each format at the last scale, used to skip hopeless candidates
+    density: Dict[str, float] = {}
+    for scale in scales:
+        total_scale = base_scale * scale
+        size = (max(1, round(width * total_scale)), max(1, round(height * total_scale)))
+        scaled = img if size == img.size else img.resize(size, Image.LANCZOS)
+        if color_mode == "1" and total_scale >= BILEVEL_MIN_SCALE:
+            scaled = scaled.point(lambda value: 255 if value >= 128 else 0, mode="1")
+        pixels = size[0] * size[1]
+
+        fitting = []
+        candidates = []
+        for image_format in formats:
+            # A 1-bit PNG is already a two-color palette image
+            if image_format == "palette" and scaled.mode == "1":
+                if "png" in formats:
+                    continue
+                image_format = "png"
+            qualities = QUALITY_STEPS if image_format in ("jpeg", "webp") else (None,)
+            fits_lossless = False
+            for quality in qualities:
+                key = f"{image_format}:{quality}"
+                if scale != scales[-1] and key in density and density[key] * pixels > max_bytes * PREDICTION_SLACK:
+                    continue
+                mode = scaled.mode
+                if passthrough is not None and scale == 1.0 and image_format == original_format \
+                        and quality == qualities[0]:
+                    data, mode = passthrough, source_mode
+                else:
+                    data = _encode(scaled, image_format, quality)
+                    encodes += 1
+                if data is None:
+                    break
+                density[key] = len(data) / pixels
+                candidate = (len(data), data, image_format, quality, total_scale, size, mode)
+                candidates.append(candidate)
+                if len(data) <= max_bytes:
+                    fitting.append(candidate)
+                    fits_lossless = image_format in LOSSLESS_FORMATS or data is passthrough
+                    break
+            # A lossless payload within the budget is not traded for a smaller lossy one
+            if fits_lossless:
+                fitting = [fitting[-1]]
+                break
+
+        if fitting:
+            best = min(fitting, key=lambda candidate: candidate[0])
+            break
+        if scale == scales[-1]:
+            best = min(candidates, key=lambda candidate: candidate[0])
+
+    size_bytes, data, image_format, quality, total_scale, size, mode = best
+    return data, {
+        "format": image_format,
+        "quality": quality,
+        "scale": total_scale,
+        "width": size[0],
+        "height": size[1],
+        "mode": mode,
+        "size": size_bytes,
+        "encodes": encodes,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from pdf_utils import Document
+from render_cache import DEFAULT_CACHE_DIR, file_sha256, write_atomic
+
+
+logger = logging.getLogger("MetadataCache")
+
+
+def page_fingerprints(document: Document) -> List[str]:
+    """
+    Hash the content stream of every page.
+
+    Pulls and hashes the content of all pages, so it is only worth it for
+    consumers that compare pages across documents or runs.
+
+    Args:
+        document: Opened document
+
+    Returns:
+        SHA-256 hex digest of each page's content, in page order
+    """
+    fingerprints = []
+    for page in document.reader.pages:
+        digest = hashlib.sha256()
+        try:
+            contents = page.get_contents()
+            if contents is not None:
+                digest.update(contents.get_data())
+        except Exception:
+            pass
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def describe_document(document: Document, fingerprints: bool = False) -> Dict[str, Any]:
+    """
+    Collect everything worth caching about a document.
+
+    Page sizes come from the page dictionaries alone; page content is only
+    read when fingerprints are requested.
+
+    Args:
+        document: Opened document
+        fingerprints: Also compute per-page content fingerprints (see page_fingerprints)
+
+    Returns:
+        Dictionary with metadata, page count, outline, per-page dimensions (points)
+        and, if requested, per-page content fingerprints
+    """
+    info = {
+        "sha256": document.sha256,
+        "metadata": {key: str(value) for key, value in document.metadata.items() if key != "page_count"},
+        "page_count": document.page_count,
+        "outline": document.outline,
+        "page_sizes": [[float(page.mediabox.width), float(page.mediabox.height)] for page in document.reader.pages],
+    }
+    if fingerprints:
+        info["page_fingerprints"] = page_fingerprints(document)
+    return info
+
+
+class MetadataCache:
+    """
+    Persistent cache of document metadata and, once requested, page fingerprints.
+
+    Entries are stored by content hash. A per-path index remembers the file's
+    size and mtime, so unchanged files are recognized without hashing them;
+    any change in size or mtime forces a re-hash, and changed content gets a
+    fresh entry.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Cache root directory (default: metadata/ under DEFAULT_CACHE_DIR)
+        """
+        self.cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, "metadata")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _index_path(self, pdf_path: str) -> str:
+        path_key = hashlib.sha256(os.path.abspath(pdf_path).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "paths", f"{path_key}.json")
+
+    def _entry_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, "documents", f"{sha256}.json")
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, path: str, data: dict) -> None:
+        try:
+            write_atomic(path, json.dumps(data).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"Could not write metadata cache entry: {str(e)}")
+
+    def file_hash(self, pdf_path: str) -> str:
+        """
+        Get the content hash of a file, reusing the stored hash while size and mtime are unchanged.
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            SHA-256 hex digest of the file contents
+        """
+        stat = os.stat(pdf_path)
+        index = self._read_json(self._index_path(pdf_path))
+        if index and index.get("size") == stat.st_size and index.get("mtime_ns") == stat.st_mtime_ns:
+            return index["sha256"]
+
+        sha256 = file_sha256(pdf_path)
+        self._write_json(self._index_path(pdf_path), {
+            "path": os.path.abspath(pdf_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+        })
+        return sha256
+
+    def get(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up cached information for a file.
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            Cached entry (see describe_document), or None if the content is not cached
+        """
+        info = self._read_json(self._entry_path(self.file_hash(pdf_path)))
+        # Partial entries (only results added by update) do not describe the document
+        if info is None or "page_count" not in info or "page_sizes" not in info:
+            return None
+        return info
+
+    def put(self, info: Dict[str, Any]) -> None:
+        """
+        Store information produced by describe_document.
+
+        Args:
+            info: Document information including its sha256
+        """
+        self._write_json(self._entry_path(info["sha256"]), info)
+
+    def update(self, sha256: str, fields: Dict[str, Any]) -> bool:
+        """
+        Add or replace fields of a cached entry, such as results computed for the document later.
+
+        Only entries stored by put are updated, so that no entry exists without the
+        document description.
+
+        Args:
+            sha256: Content hash of the document
+            fields: Fields to store
+
+        Returns:
+            True if the entry exists and was updated
+        """
+        info = self._read_json(self._entry_path(sha256))
+        if info is None:
+            logger.debug(f"Not caching {', '.join(fields)}: document {sha256[:12]} is not cached")
+            return False
+        info.update(fields)
+        self._write_json(self._entry_path(sha256), info)
+        return True
+
+
+def load_document_info(pdf_path: str, cache: Optional[MetadataCache] = None,
+                       fingerprints: bool = False) -> Dict[str, Any]:
+    """
+    Get document information, parsing the PDF only if it is not cached.
+
+    Suitable for planning batches: for files seen before this costs a stat and a
+    small JSON read instead of a full PDF parse.
+
+    Args:
+        pdf_path: Path to the PDF file
+        cache: Metadata cache (a default one is used if not specified)
+        fingerprints: Include per-page content fingerprints, computing and caching
+            them if the cached entry does not have them yet
+
+    Returns:
+        Document information (see describe_document)
+    """
+    cache = cache or MetadataCache()
+    info = cache.get(pdf_path)
+    if info is not None and (not fingerprints or "page_fingerprints" in info):
+        return info
+
+    with Document(pdf_path, sha256=cache.file_hash(pdf_path)) as document:
+        if info is None:
+            info = describe_document(document, fingerprints=fingerprints)
+            cache.put(info)
+        else:
+            info["page_fingerprints"] = page_fingerprints(document)
+            cache.update(info["sha256"], {"page_fingerprints": info["page_fingerprints"]})
+    return info
@@ -0,0 +1,276 @@
+import math
+from typing import List, Optional, Tuple
+
+
+class ModelProfile:
+    """
+    Image limits and image token accounting of a family of vision models.
+
+    Subclasses implement the provider's billing rule in estimate_tokens and
+    the provider-side downscaling in provider_size.
+    """
+
+    def __init__(self, name: str, max_pixels: int = 6_000_000, max_aspect_ratio: float = 2.5, tile_overlap: int = 64):
+        """
+        Initialize the profile.
+
+        Args:
+            name: Profile name
+            max_pixels: Largest page (in pixels) sent as a single image; larger pages are tiled.
+                About an A4/Letter page at 250 DPI, so large-format sheets at the usual
+                200 DPI are split into tiles of roughly a regular page each
+            max_aspect_ratio: Longest page side / shortest side sent as a single image;
+                longer strips are tiled, since the provider would shrink them to fit its size limits
+            tile_overlap: Overlap between neighbouring tiles in pixels, so that lines cut
+                at a tile border appear whole in one of the tiles
+        """
+        self.name = name
+        self.max_pixels = max_pixels
+        self.max_aspect_ratio = max_aspect_ratio
+        self.tile_overlap = tile_overlap
+
+    def provider_size(self, width: int, height: int) -> Tuple[int, int]:
+        """
+        Size the provider scales an image to before the model sees it.
+
+        Args:
+            width: Image width in pixels
+            height: Image height in pixels
+
+        Returns:
+            Tuple (width, height)
+        """
+        return width, height
+
+    def estimate_tokens(self, width: int, height: int) -> int:
+        """
+        Estimate the input tokens billed for an image.
+
+        Args:
+            width: Image width in pixels as sent
+            height: Image height in pixels as sent
+
+        Returns:
+            Estimated number of tokens
+        """
+        raise NotImplementedError
+
+    def tier_scales(self, width: int, height: int) -> List[float]:
+        """
+        Scales (below 1) at which the image drops into a cheaper token tier.
+
+        Profiles billing by patch or area have no tiers worth a visible loss of
+        resolution: every shrink saves tokens in proportion.
+        """
+        return []
+
+    def target_size(self, width: int, height: int, tier_slack: float = 0.1) -> Tuple[int, int]:
+        """
+        Largest image size worth sending.
+
+        Pixels the provider would scale away are never sent. If shrinking the
+        image by at most ``tier_slack`` drops it into a cheaper token tier, the
+        largest size of that tier is used instead.
+
+        Args:
+            width: Image width in pixels
+            height: Image height in pixels
+            tier_slack: Largest extra shrink accepted to save tokens (0.1 = 10 %)
+
+        Returns:
+            Tuple (width, height)
+        """
+        width, height = self.provider_size(width, height)
+        best_scale, best_tokens = 1.0, self.estimate_tokens(width, height)
+        for scale in sorted(self.tier_scales(width, height), reverse=True):
+            if scale < 1.0 - tier_slack:
+                break
+            tokens = self.estimate_tokens(math.floor(width * scale), math.floor(height * scale))
+            if tokens < best_tokens:
+                best_scale, best_tokens = scale, tokens
+        return max(1, math.floor(width * best_scale)), max(1, math.floor(height * best_scale))
+
+
+class TiledProfile(ModelProfile):
+    """Providers that bill a fixed number of tokens per image tile (OpenAI GPT-4o, Gemini)"""
+
+    def __init__(self, name: str, tile_size: int, tile_tokens: int, base_tokens: int = 0,
+                 fit_size: Optional[int] = None, short_side: Optional[int] = None, **limits):
+        """
+        Initialize the profile.
+
+        Args:
+            name: Profile name
+            tile_size: Side of a billing tile in pixels
+            tile_tokens: Tokens per tile
+            base_tokens: Tokens per image on top of the tiles
+            fit_size: Images are first scaled down to fit a square of this side
+            short_side: Then scaled down so that the short side is at most this long
+            **limits: Tiling limits, see ModelProfile
+        """
+        super().__init__(name, **limits)
+        self.tile_size = tile_size
+        self.tile_tokens = tile_tokens
+        self.base_tokens = base_tokens
+        self.fit_size = fit_size
+        self.short_side = short_side
+
+    def provider_size(self, width: int, height: int) -> Tuple[int, int]:
+        scale = 1.0
+        if self.fit_size:
+            scale = min(scale, self.fit_size / max(width, height))
+        if self.short_side:
+            scale = min(scale, self.short_side / min(width, height))
+        return max(1, math.floor(width * scale)), max(1, math.floor(height * scale))
+
+    def estimate_tokens(self, width: int, height: int) -> int:
+        if width <= 0 or height <= 0:
+            return 0
+        width, height = self.provider_size(width, height)
+        tiles = math.ceil(width / self.tile_size) * math.ceil(height / self.tile_size)
+        return self.base_tokens + self.tile_tokens * tiles
+
+    def tier_scales(self, width: int, height: int) -> List[float]:
+        # A tile boundary is crossed when a side shrinks to a multiple of the tile size
+        return [count * self.tile_size / side
+                for side in (width, height)
+                for count in range(1, math.ceil(side / self.tile_size))]
+
+
+class UnscaledProfile(TiledProfile):
+    """
+    Models of unknown providers, such as self-hosted OpenAI-compatible servers.
+
+    Nothing is known about their downscaling or billing, so images are sent as
+    rendered (within the byte budget) and tokens are only estimated with the
+    OpenAI tile rule.
+    """
+
+    def __init__(self, name: str, **limits):
+        super().__init__(name, tile_size=512, tile_tokens=170, base_tokens=85, **limits)
+
+    def tier_scales(self, width: int, height: int) -> List[float]:
+        # Token tiers are a guess here, never worth a loss of resolution
+        return []
+
+
+class PatchProfile(ModelProfile):
+    """Providers that bill one token per image patch, up to a patch budget (GPT-4.1 mini, Qwen-VL)"""
+
+    def __init__(self, name: str, patch_size: int, max_patches: int, **limits):
+        """
+        Initialize the profile.
+
+        Args:
+            name: Profile name
+            patch_size: Side of an image patch (one token) in pixels
+            max_patches: Images with more patches are scaled down to this many
+            **limits: Tiling limits, see ModelProfile
+        """
+        super().__init__(name, **limits)
+        self.patch_size = patch_size
+        self.max_patches = max_patches
+
+    def _patches(self, width: int, height: int) -> int:
+        return math.ceil(width / self.patch_size) * math.ceil(height / self.patch_size)
+
+    def provider_size(self, width: int, height: int) -> Tuple[int, int]:
+        if self._patches(width, height) <= self.max_patches:
+            return width, height
+        scale = math.sqrt(self.max_patches * self.patch_size ** 2 / (width * height))
+        # Patch rounding can still overshoot; shrink until the budget is met
+        while self._patches(math.floor(width * scale), math.floor(height * scale)) > self.max_patches:
+            scale *= 0.99
+        return max(1, math.floor(width * scale)), max(1, math.floor(height * scale))
+
+    def estimate_tokens(self, width: int, height: int) -> int:
+        if width <= 0 or height <= 0:
+            return 0
+        return self._patches(*self.provider_size(width, height))
+
+
+class AreaProfile(ModelProfile):
+    """Providers that bill tokens in proportion to the image area (Anthropic Claude)"""
+
+    def __init__(self, name: str, pixels_per_token: int, max_side: int, max_tokens: int, **limits):
+        """
+        Initialize the profile.
+
+        Args:
+            name: Profile name
+            pixels_per_token: Image area per token
+            max_side: Images are scaled down so that the long side is at most this long
+            max_tokens: And so that they cost at most this many tokens
+            **limits: Tiling limits, see ModelProfile
+        """
+        super().__init__(name, **limits)
+        self.pixels_per_token = pixels_per_token
+        self.max_side = max_side
+        self.max_tokens = max_tokens
+
+    def provider_size(self, width: int, height: int) -> Tuple[int, int]:
+        scale = min(1.0, self.max_side / max(width, height),
+                    math.sqrt(self.max_tokens * self.pixels_per_token / (width * height)))
+        return max(1, math.floor(width * scale)), max(1, math.floor(height * scale))
+
+    def estimate_tokens(self, width: int, height: int) -> int:
+        if width <= 0 or height <= 0:
+            return 0
+        width, height = self.provider_size(width, height)
+        return math.ceil(width * height / self.pixels_per_token)
+
+
+MODEL_PROFILES = {
+    # High-detail images: fit into 2048x2048, short side down to 768, 170 tokens per 512 px tile
+    "openai": TiledProfile("openai", tile_size=512, tile_tokens=170, base_tokens=85, fit_size=2048, short_side=768),
+    # GPT-4o mini counts the same tiles at a higher token rate
+    "openai-mini": TiledProfile("openai-mini", tile_size=512, tile_tokens=5667, base_tokens=2833,
+                                fit_size=2048, short_side=768),
+    # GPT-4.1 mini/nano and o4-mini: 32 px patches, at most 1536 per image
+    "openai-patch": PatchProfile("openai-patch", patch_size=32, max_patches=1536),
+    # Claude scales images down to 1568 px on the long side and about 1600 tokens
+    "anthropic": AreaProfile("anthropic", pixels_per_token=750, max_side=1568, max_tokens=1600, max_aspect_ratio=2.0),
+    # Gemini: 258 tokens per 768 px tile
+    "google": TiledProfile("google", tile_size=768, tile_tokens=258),
+    # Gemma 3 squeezes every image into 896x896 and 256 tokens
+    "gemma": TiledProfile("gemma", tile_size=896, tile_tokens=256, fit_size=896),
+    # Qwen2.5-VL: 28 px patches merged 2x2 into one token, default budget of 16384 patches
+    "qwen": PatchProfile("qwen", patch_size=56, max_patches=4096),
+    # Unknown models: no provider downscaling, token estimate only
+    "default": UnscaledProfile("default"),
+}
+
+# Model name prefixes of each profile, checked in order
+MODEL_FAMILIES = [
+    ("gpt-4o-mini", "openai-mini"),
+    ("gpt-4.1-mini", "openai-patch"),
+    ("gpt-4.1-nano", "openai-patch"),
+    ("o4-mini", "openai-patch"),
+    ("gpt-", "openai"),
+    ("o1", "openai"),
+    ("o3", "openai"),
+    ("o4", "openai"),
+    ("claude", "anthropic"),
+    ("gemini", "google"),
+    ("gemma", "gemma"),
+    ("qwen", "qwen"),
+]
+
+
+def get_model_profile(model: Optional[str]) -> ModelProfile:
+    """
+    Get the profile of a model by its name.
+
+    Provider prefixes such as "openai/" or "google/" are ignored.
+
+    Args:
+        model: Model identifier
+
+    Returns:
+        Matching profile, or the default profile for unknown models
+    """
+    name = (model or "").lower().rsplit("/", 1)[-1]
+    for prefix, profile_name in MODEL_FAMILIES:
+        if name.startswith(prefix):
+            return MODEL_PROFILES[profile_name]
+    return MODEL_PROFILES["default"]
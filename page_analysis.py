@@ -0,0 +1,228 @@
+import io
+import re
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+
+# Side of the downscaled copy used for page statistics
+ANALYSIS_SIZE = 256
+
+# Pixels at least this much darker than the paper color count as ink
+INK_CONTRAST = 64
+
+# Default ink coverage below which a page is considered blank
+DEFAULT_BLANK_THRESHOLD = 0.002
+
+# Text of vendor filler pages
+BLANK_PAGE_TEXT = re.compile(r"intentionally\s+(left\s+)?blank", re.IGNORECASE)
+
+# Longer text layers belong to pages with real content besides the filler phrase
+BLANK_PAGE_MAX_TEXT = 300
+
+# Pixels whose color channels differ by more than this count as colored
+COLOR_SATURATION = 48
+
+# Default fraction of colored pixels above which a page keeps its colors
+DEFAULT_COLOR_THRESHOLD = 0.0005
+
+# Gray pages with fewer midtone pixels per dark pixel are already black and white
+# (thresholded scans). Antialiased text renders have 0.15-0.35 at 200-300 DPI and
+# more at lower resolutions; thresholding them would break thin strokes and small type
+BILEVEL_MAX_MIDTONE_RATIO = 0.02
+
+
+def open_page_image(image: Union[str, bytes, Image.Image]) -> Image.Image:
+    """
+    Open a page image given as a path, encoded bytes or an already decoded image.
+
+    Args:
+        image: Path to the image, encoded image bytes or a PIL image
+
+    Returns:
+        PIL image
+    """
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, (bytes, bytearray)):
+        return Image.open(io.BytesIO(image))
+    return Image.open(image)
+
+
+def to_gray_array(image: Union[str, bytes, Image.Image], size: int = ANALYSIS_SIZE) -> np.ndarray:
+    """
+    Decode a page into a small grayscale array.
+
+    Args:
+        image: Path to the image, encoded image bytes or a PIL image
+        size: Maximum side of the downscaled copy
+
+    Returns:
+        2-D float32 array of luminance values in 0..255
+    """
+    img = open_page_image(image)
+    # Let the JPEG decoder skip detail we are about to throw away. draft() changes
+    # the image in place, so images passed in by the caller are left alone
+    if img is not image:
+        img.draft("L", (size, size))
+    gray = img.convert("L")
+    gray.thumbnail((size, size), Image.BOX)
+    return np.asarray(gray, dtype=np.float32)
+
+
+def page_ink_stats(image: Union[str, bytes, Image.Image, np.ndarray]) -> Dict[str, float]:
+    """
+    Compute ink coverage and luminance variance of a page.
+
+    Ink is measured relative to the paper color (the median luminance), so
+    gray or yellowed scans are handled the same as clean renders.
+
+    Args:
+        image: Page image, or a grayscale array from to_gray_array
+
+    Returns:
+        Dictionary with "ink_coverage" (fraction of ink pixels) and "variance"
+    """
+    gray = image if isinstance(image, np.ndarray) else to_gray_array(image)
+    if gray.size == 0:
+        return {"ink_coverage": 0.0, "variance": 0.0}
+
+    paper = np.median(gray)
+    ink = gray < (paper - INK_CONTRAST)
+    return {
+        "ink_coverage": float(ink.mean()),
+        "variance": float(gray.var()),
+    }
+
+
+def is_blank_page(stats: Dict[str, float], threshold: float = DEFAULT_BLANK_THRESHOLD, text: str = "") -> bool:
+    """
+    Decide whether a page can be skipped as blank.
+
+    Args:
+        stats: Result of page_ink_stats
+        threshold: Ink coverage below which the page is blank
+        text: Text layer of the page, used to recognize "intentionally left blank" pages
+
+    Returns:
+        True if the page is blank
+    """
+    if stats["ink_coverage"] < threshold:
+        return True
+    text = " ".join(text.split())
+    return len(text) <= BLANK_PAGE_MAX_TEXT and BLANK_PAGE_TEXT.search(text) is not None
+
+
+def find_content_box(image: Union[str, bytes, Image.Image], padding: int = 16,
+                     scan_size: int = 1024, min_ink_pixels: int = 2) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the bounding box of the page content, ignoring empty margins.
+
+    The scan runs on a downscaled copy; the box is mapped back to full
+    resolution and grown by ``padding`` plus one scan pixel to absorb the
+    rounding.
+
+    Args:
+        image: Path to the image, encoded image bytes or a PIL image
+        padding: Margin to keep around the content, in full-resolution pixels
+        scan_size: Maximum side of the downscaled copy used for the scan
+        min_ink_pixels: Rows and columns with fewer ink pixels are treated as noise
+
+    Returns:
+        Box (left, top, right, bottom) in full-resolution pixels, or None if
+        the page has no content or nothing to crop
+    """
+    img = open_page_image(image)
+    width, height = img.size
+    gray = to_gray_array(img, scan_size)
+    if gray.size == 0:
+        return None
+
+    ink = gray < (np.median(gray) - INK_CONTRAST)
+    rows = np.flatnonzero(ink.sum(axis=1) >= min_ink_pixels)
+    cols = np.flatnonzero(ink.sum(axis=0) >= min_ink_pixels)
+    if rows.size == 0 or cols.size == 0:
+        return None
+
+    scale_x = width / gray.shape[1]
+    scale_y = height / gray.shape[0]
+    box = (
+        max(0, int((cols[0] - 1) * scale_x) - padding),
+        max(0, int((rows[0] - 1) * scale_y) - padding),
+        min(width, int((cols[-1] + 2) * scale_x) + padding),
+        min(height, int((rows[-1] + 2) * scale_y) + padding),
+    )
+    if box == (0, 0, width, height):
+        return None
+    return box
+
+
+def page_color_mode(image: Union[str, bytes, Image.Image], color_threshold: float = DEFAULT_COLOR_THRESHOLD,
+                    size: int = 1024) -> str:
+    """
+    Choose the cheapest image mode that keeps the information on a page.
+
+    Color is checked on a downscaled copy. Black-and-white detection needs the
+    full resolution, since any resampling creates gray edge pixels.
+
+    Args:
+        image: Path to the image, encoded image bytes or a PIL image
+        color_threshold: Fraction of colored pixels above which the page stays in color
+        size: Maximum side of the downscaled copy used for the color check
+
+    Returns:
+        "RGB" for pages with colored content, "1" for black-and-white pages
+        without antialiasing (typically scans), "L" for other pages
+    """
+    img = open_page_image(image)
+    if img.mode == "1":
+        return "1"
+    if img.mode in ("RGB", "RGBA", "P", "CMYK", "YCbCr"):
+        small = img.convert("RGB")
+        small.thumbnail((size, size), Image.BOX)
+        pixels = np.asarray(small, dtype=np.int16)
+        saturation = pixels.max(axis=2) - pixels.min(axis=2)
+        if (saturation > COLOR_SATURATION).mean() > color_threshold:
+            return "RGB"
+
+    gray = np.asarray(img.convert("L"))
+    paper = int(np.median(gray))
+    # Dark pixels are ink, pixels between ink and paper are antialiased or scanned gray edges
+    dark = (gray < paper // 2).sum()
+    midtones = ((gray >= paper // 2) & (gray < paper - INK_CONTRAST)).sum()
+    if dark and midtones / dark < BILEVEL_MAX_MIDTONE_RATIO:
+        return "1"
+    return "L"
+
+
+def page_dhash(image: Union[str, bytes, Image.Image, np.ndarray], hash_size: int = 16) -> int:
+    """
+    Compute the difference hash (dHash) of a page.
+
+    The page is reduced to (hash_size + 1) x hash_size gray cells; each bit
+    tells whether a cell is brighter than its left neighbour. Renders of the
+    same page give the same or a very close hash regardless of encoding.
+
+    Args:
+        image: Page image, or a grayscale array from to_gray_array
+        hash_size: Hash side; the hash has hash_size ** 2 bits
+
+    Returns:
+        Hash as an integer
+    """
+    if isinstance(image, np.ndarray):
+        gray = Image.fromarray(np.clip(image, 0, 255).astype(np.uint8))
+    else:
+        img = open_page_image(image)
+        if img is not image:
+            img.draft("L", (hash_size * 8, hash_size * 8))
+        gray = img.convert("L")
+    cells = np.asarray(gray.resize((hash_size + 1, hash_size), Image.BOX), dtype=np.int16)
+    bits = cells[:, 1:] > cells[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(first ^ second).count("1")
@@ -0,0 +1,137 @@
+import bisect
+import logging
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from pdf_utils import Document
+
+
+logger = logging.getLogger("PageIndex")
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class PageTextIndex:
+    """
+    In-memory inverted index of the text layer of document pages.
+
+    Keywords are matched as whole words, ignoring case and punctuation, so
+    "ADC_CR1" matches "ADC_CR1:" and "74HC595 Q1" matches "74HC595-Q1". A
+    trailing "*" matches any word ending ("STM32F4*").
+    """
+
+    def __init__(self, texts: Dict[int, str]):
+        """
+        Build the index.
+
+        Args:
+            texts: Text layer of each page, by page number
+        """
+        self.texts = texts
+        self._normalized: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        for page_num, text in texts.items():
+            tokens = _tokenize(text)
+            self._normalized[page_num] = " ".join(tokens)
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(page_num)
+        self._vocabulary = sorted(self._postings)
+
+    @classmethod
+    def from_document(cls, document: Document, pages: Iterable[int]) -> "PageTextIndex":
+        """
+        Extract the text layer of pages and index it.
+
+        Args:
+            document: Opened document
+            pages: Page numbers to index (1-based)
+
+        Returns:
+            Index of the pages
+        """
+        started = time.perf_counter()
+        index = cls({page_num: document.page_text(page_num) for page_num in pages})
+        logger.info(f"Indexed the text layer of {len(index.texts)} pages ({len(index._vocabulary)} distinct words) "
+                    f"in {time.perf_counter() - started:.1f} s")
+        return index
+
+    def _token_pages(self, token: str) -> Set[int]:
+        if not token.endswith("*"):
+            return self._postings.get(token, set())
+        prefix = token[:-1]
+        pages = set()
+        for word in self._vocabulary[bisect.bisect_left(self._vocabulary, prefix):]:
+            if not word.startswith(prefix):
+                break
+            pages |= self._postings[word]
+        return pages
+
+    def find(self, keyword: str) -> Set[int]:
+        """
+        Find the pages containing a keyword or phrase.
+
+        Args:
+            keyword: Word or phrase; words may end with "*"
+
+        Returns:
+            Page numbers
+        """
+        tokens = re.findall(r"\w+\*?", keyword.lower())
+        if not tokens:
+            return set()
+        # Narrow down with the postings of each word, then check the word order of phrases
+        candidates = set.intersection(*(self._token_pages(token) for token in tokens))
+        if len(tokens) == 1:
+            return candidates
+        phrase = re.compile(r"\b" + " ".join(re.escape(token[:-1]) + r"\w*" if token.endswith("*") else re.escape(token)
+                                             for token in tokens) + r"\b")
+        return {page_num for page_num in candidates if phrase.search(self._normalized[page_num])}
+
+    def find_regex(self, pattern: str) -> Set[int]:
+        """
+        Find the pages whose text layer matches a regular expression.
+
+        Args:
+            pattern: Regular expression, searched in the raw text ignoring case
+
+        Returns:
+            Page numbers
+        """
+        regex = re.compile(pattern, re.IGNORECASE)
+        return {page_num for page_num, text in self.texts.items() if regex.search(text)}
+
+
+def find_keyword_pages(index: PageTextIndex, keywords: Optional[List[str]] = None,
+                       patterns: Optional[List[str]] = None, neighbors: int = 0) -> List[int]:
+    """
+    Select the pages matching any keyword or regular expression.
+
+    Args:
+        index: Text index of the candidate pages
+        keywords: Words or phrases (see PageTextIndex.find)
+        patterns: Regular expressions (see PageTextIndex.find_regex)
+        neighbors: Number of pages before and after each match to include as well,
+            for tables and descriptions continued from or on adjacent pages
+
+    Returns:
+        Sorted page numbers, limited to the indexed pages
+    """
+    matches = set()
+    for keyword in keywords or []:
+        pages = index.find(keyword)
+        logger.info(f"'{keyword}' found on {len(pages)} pages")
+        matches |= pages
+    for pattern in patterns or []:
+        pages = index.find_regex(pattern)
+        logger.info(f"/{pattern}/ found on {len(pages)} pages")
+        matches |= pages
+
+    selected = set()
+    for page_num in matches:
+        selected.update(range(page_num - neighbors, page_num + neighbors + 1))
+    return sorted(selected & set(index.texts))
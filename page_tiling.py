@@ -0,0 +1,133 @@
+import io
+import math
+import re
+from typing import List, Tuple, Union
+
+from model_profiles import ModelProfile
+from page_analysis import open_page_image
+
+
+# Upper bound on tiles per page, to keep a mis-sized page from turning into dozens of requests
+MAX_TILES = 16
+
+# Longest run of repeated lines looked for where two tiles meet
+MAX_OVERLAP_LINES = 20
+
+# Shorter repeats (such as a lone "---" or "- 5V") are kept, they are likely not overlap
+MIN_OVERLAP_CHARS = 10
+
+
+def needs_tiling(width: int, height: int, profile: ModelProfile) -> bool:
+    """
+    Check whether a page exceeds the single-image limits of a model profile.
+
+    Args:
+        width: Page width in pixels
+        height: Page height in pixels
+        profile: Model profile
+
+    Returns:
+        True if the page should be split into tiles
+    """
+    if width <= 0 or height <= 0:
+        return False
+    aspect_ratio = max(width, height) / min(width, height)
+    return width * height > profile.max_pixels or aspect_ratio > profile.max_aspect_ratio
+
+
+def plan_tiles(width: int, height: int, profile: ModelProfile) -> List[Tuple[int, int, int, int]]:
+    """
+    Split a page into the smallest grid of overlapping tiles that fit the profile limits.
+
+    Args:
+        width: Page width in pixels
+        height: Page height in pixels
+        profile: Model profile
+
+    Returns:
+        Tile boxes (left, top, right, bottom) in reading order: rows top to bottom,
+        tiles left to right within a row
+    """
+    overlap = profile.tile_overlap
+    cols, rows = 1, 1
+    while cols * rows < MAX_TILES:
+        tile_width = math.ceil((width + (cols - 1) * overlap) / cols)
+        tile_height = math.ceil((height + (rows - 1) * overlap) / rows)
+        if not needs_tiling(tile_width, tile_height, profile):
+            break
+        # Split the longer side; this also fixes a too narrow tile
+        if tile_width >= tile_height:
+            cols += 1
+        else:
+            rows += 1
+
+    def spans(length: int, count: int) -> List[Tuple[int, int]]:
+        size = math.ceil((length + (count - 1) * overlap) / count)
+        step = size - overlap
+        return [(min(i * step, length - size), min(i * step, length - size) + size) for i in range(count)]
+
+    return [(left, top, right, bottom)
+            for top, bottom in spans(height, rows)
+            for left, right in spans(width, cols)]
+
+
+def split_page_image(image: Union[str, bytes], boxes: List[Tuple[int, int, int, int]]) -> List[bytes]:
+    """
+    Cut tiles out of a page image.
+
+    Args:
+        image: Path to the image, or encoded image bytes
+        boxes: Tile boxes from plan_tiles
+
+    Returns:
+        Encoded tiles, in the format of the page image (PNG if unknown)
+    """
+    tiles = []
+    with open_page_image(image) as img:
+        image_format = img.format or "PNG"
+        save_options = {"quality": 90} if image_format == "JPEG" else {}
+        for box in boxes:
+            buffer = io.BytesIO()
+            img.crop(box).save(buffer, image_format, **save_options)
+            tiles.append(buffer.getvalue())
+    return tiles
+
+
+def _normalize_line(line: str) -> str:
+    return re.sub(r"\s+", " ", line).strip().lower()
+
+
+def stitch_tile_markdown(parts: List[str], max_overlap_lines: int = MAX_OVERLAP_LINES) -> str:
+    """
+    Join the Markdown of the tiles of a page, dropping lines repeated across tile borders.
+
+    Where the last lines of the text so far match the first lines of the next
+    tile (ignoring case, whitespace and blank lines), the longest such run is
+    kept only once.
+
+    Args:
+        parts: Markdown of each tile, in reading order
+        max_overlap_lines: Longest run of repeated lines to look for
+
+    Returns:
+        Markdown of the whole page
+    """
+    lines: List[str] = []
+    for part in parts:
+        new_lines = part.strip().splitlines()
+        tail = [_normalize_line(line) for line in lines if line.strip()][-max_overlap_lines:]
+        head_indices = [i for i, line in enumerate(new_lines) if line.strip()][:max_overlap_lines]
+        head = [_normalize_line(new_lines[i]) for i in head_indices]
+
+        overlap = 0
+        for count in range(min(len(tail), len(head)), 0, -1):
+            if tail[-count:] == head[:count] and sum(map(len, head[:count])) >= MIN_OVERLAP_CHARS:
+                overlap = count
+                break
+        if overlap:
+            new_lines = new_lines[head_indices[overlap - 1] + 1:]
+
+        if lines and new_lines:
+            lines.append("")
+        lines.extend(new_lines)
+    return "\n".join(lines).strip() + "\n"
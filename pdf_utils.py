@@ -1,53 +1,255 @@
+import hashlib
+import io
+import mmap
 import os
+import re
 import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from pdf2image import convert_from_path
-from PyPDF2 import PdfReader
-from typing import List, Tuple
+from PyPDF2 import PdfReader, PageObject
+from PyPDF2.generic import ArrayObject, ContentStream, DictionaryObject
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+import numpy as np
 from PIL import Image
 
+from render_backends import RenderBackend, DEFAULT_RENDER_BACKEND, get_render_backend
+from render_cache import RenderCache, file_sha256
+from page_analysis import find_content_box
+from image_encoder import DEFAULT_FORMATS, SCALE_STEPS, encode_image
 
-def extract_images_from_pdf(pdf_path: str, output_dir: str = None, poppler_path: str = None, 
-                           start_page: int = None, end_page: int = None) -> List[str]:
+
+class MappedFile(io.RawIOBase):
     """
-    Extract page images from a PDF file and save them to a temporary directory.
+    Read-only seekable stream over a shared memory mapping.
     
-    Args:
-        pdf_path: Path to the PDF file
-        output_dir: Directory for saving images (if not specified, a temporary one is created)
-        poppler_path: Path to Poppler executable files (e.g., "C:/Poppler/Library/bin")
-        start_page: First page to extract (1-based index, default: first page)
-        end_page: Last page to extract (1-based index, default: last page)
-        
-    Returns:
-        List of paths to saved images
+    Each stream keeps its own position, so several readers can share one
+    mapping (and the OS page cache) without copying the file into memory.
     """
-    if output_dir is None:
-        output_dir = tempfile.mkdtemp(prefix="datasheet_parser_")
-    else:
-        os.makedirs(output_dir, exist_ok=True)
     
-    # Check if Poppler path exists
-    if poppler_path is None:
-        # Try to find Poppler in standard locations
-        possible_paths = [
-            "C:/Program Files/poppler/bin",
-            "C:/Program Files (x86)/poppler/bin",
-            "C:/Poppler/bin",
-            "C:/Poppler/Library/bin",
-            os.path.join(os.path.dirname(os.path.abspath(__file__)), "poppler/bin")
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                poppler_path = path
-                break
+    def __init__(self, mapping: mmap.mmap):
+        self._mapping = mapping
+        self._position = 0
     
-    # Get total page count to validate page range
-    reader = PdfReader(pdf_path)
-    total_pages = len(reader.pages)
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._mapping) if size is None or size < 0 else min(self._position + size, len(self._mapping))
+        data = self._mapping[self._position:end]
+        self._position = max(self._position, end)
+        return data
     
-    # Validate and adjust page range
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._mapping)
+        self._position = max(0, offset)
+        return self._position
+    
+    def tell(self) -> int:
+        return self._position
+
+
+class Document:
+    """
+    PDF document opened once per run.
+    
+    Shares a single parsed PyPDF2 reader between metadata, page count, rendering
+    and text-layer code instead of re-parsing the file in every helper. When
+    cached document information is supplied, the file is not parsed unless a
+    page object is needed.
+    
+    By default the file is memory-mapped read-only: PyPDF2 reads the mapping
+    directly instead of copying the whole file into a BytesIO, and in-process
+    renderers get their own stream over the same mapping (see open_stream).
+    """
+    
+    def __init__(self, pdf_path: str, sha256: Optional[str] = None, info: Optional[dict] = None,
+                 use_mmap: bool = True):
+        """
+        Open the document. The file is parsed on first access to the reader.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            sha256: Known SHA-256 of the file contents
+            info: Cached document information (see metadata_cache.describe_document);
+                  metadata and page count are served from it without parsing the file
+            use_mmap: Access the file through a read-only memory mapping
+        """
+        self.path = pdf_path
+        self.info = info
+        self._reader = None
+        self._sha256 = sha256 or (info or {}).get("sha256")
+        self._metadata = None
+        self._outline = None
+        self._page_texts = {}
+        self._file = None
+        self._mapping = None
+        self._closed = False
+        
+        if use_mmap:
+            self._file = open(pdf_path, "rb")
+            try:
+                self._mapping = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Empty files and some special files cannot be mapped
+                self._file.close()
+                self._file = None
+    
+    @property
+    def reader(self) -> PdfReader:
+        """Parsed PyPDF2 reader"""
+        self._check_open()
+        if self._reader is None:
+            self._reader = PdfReader(self._mapping if self._mapping is not None else self.path)
+        return self._reader
+    
+    def open_stream(self) -> BinaryIO:
+        """
+        Open an independent binary stream over the document's contents.
+        
+        Returns:
+            Stream over the shared memory mapping, or a regular file object if the
+            document is not memory-mapped
+        """
+        self._check_open()
+        if self._mapping is not None:
+            return MappedFile(self._mapping)
+        return open(self.path, "rb")
+    
+    @property
+    def page_count(self) -> int:
+        """Number of pages in the document"""
+        if self.info is not None:
+            return self.info["page_count"]
+        return len(self.reader.pages)
+    
+    @property
+    def metadata(self) -> dict:
+        """Document metadata in the format returned by get_pdf_metadata"""
+        if self._metadata is None:
+            if self.info is not None:
+                self._metadata = dict(self.info["metadata"], page_count=self.page_count)
+            else:
+                metadata = self.reader.metadata or {}
+                self._metadata = {
+                    "title": metadata.get("/Title", "Unknown"),
+                    "author": metadata.get("/Author", "Unknown"),
+                    "subject": metadata.get("/Subject", ""),
+                    "creator": metadata.get("/Creator", ""),
+                    "producer": metadata.get("/Producer", ""),
+                    "page_count": self.page_count
+                }
+        return self._metadata
+    
+    @property
+    def outline(self) -> List[dict]:
+        """Document outline (bookmarks) in the format returned by read_outline"""
+        if self._outline is None:
+            if self.info is not None and "outline" in self.info:
+                self._outline = self.info["outline"]
+            else:
+                self._outline = read_outline(self.reader)
+        return self._outline
+    
+    @property
+    def sha256(self) -> str:
+        """SHA-256 of the file contents (computed on first use)"""
+        if self._sha256 is None:
+            if self._mapping is not None:
+                self._sha256 = hashlib.sha256(self._mapping).hexdigest()
+            else:
+                self._sha256 = file_sha256(self.path)
+        return self._sha256
+    
+    def page(self, page_num: int) -> PageObject:
+        """
+        Get a page object.
+        
+        Args:
+            page_num: Page number (1-based index)
+            
+        Returns:
+            PyPDF2 page object
+        """
+        return self.reader.pages[page_num - 1]
+    
+    def page_text(self, page_num: int) -> str:
+        """
+        Extract the text layer of a page. The text is extracted once per page
+        and cached, since blank detection, deduplication, response checks and
+        page selection all read it.
+        
+        Args:
+            page_num: Page number (1-based index)
+            
+        Returns:
+            Extracted text (empty if the page has no text layer)
+        """
+        text = self._page_texts.get(page_num)
+        if text is None:
+            try:
+                text = self.page(page_num).extract_text() or ""
+            except Exception:
+                text = ""
+            self._page_texts[page_num] = text
+        return text
+    
+    @property
+    def closed(self) -> bool:
+        """True once the document has been closed"""
+        return self._closed
+    
+    def _check_open(self) -> None:
+        # A closed document would otherwise silently re-open the file by path
+        if self._closed:
+            raise ValueError(f"I/O operation on closed document {self.path}")
+    
+    def close(self) -> None:
+        """
+        Release the underlying file.
+        
+        The mapping is unmapped at once, so streams from open_stream and readers
+        created before must not be used afterwards; they raise ValueError.
+        """
+        self._closed = True
+        self._reader = None
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def get_page_range(total_pages: int, start_page: int = None, end_page: int = None) -> Tuple[int, int]:
+    """
+    Clamp a requested page range to the pages that exist in the document.
+    
+    Args:
+        total_pages: Number of pages in the document
+        start_page: First page (1-based index, default: first page)
+        end_page: Last page (1-based index, default: last page)
+        
+    Returns:
+        Tuple (start_page, end_page), both inclusive
+    """
     if start_page is None:
         start_page = 1
     else:
@@ -58,83 +260,708 @@ def extract_images_from_pdf(pdf_path: str, output_dir: str = None, poppler_path:
     else:
         end_page = max(start_page, min(end_page, total_pages))
     
-    # PDF2Image uses 0-based indexing, convert from 1-based
-    first_page = start_page
-    last_page = end_page
+    return start_page, end_page
+
+
+# Outline destinations below this fraction of the page height start mid-page,
+# so the previous section still ends on that page
+_SECTION_TOP_FRACTION = 0.85
+
+
+def _flatten_outline(reader: PdfReader, items: list, level: int, entries: List[dict]) -> None:
+    for item in items:
+        # Children follow their parent as a nested list
+        if isinstance(item, list):
+            _flatten_outline(reader, item, level + 1, entries)
+            continue
+        try:
+            page_index = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page_index is None or page_index < 0:
+            continue
+        
+        mid_page = False
+        try:
+            top = float(item.get("/Top"))
+        except (TypeError, ValueError):
+            top = None
+        if top is not None:
+            mediabox = reader.pages[page_index].mediabox
+            mid_page = top - float(mediabox.bottom) < float(mediabox.height) * _SECTION_TOP_FRACTION
+        entries.append({"title": " ".join(str(item.get("/Title", "")).split()), "level": level,
+                        "page": page_index + 1, "mid_page": mid_page})
+
+
+def read_outline(reader: PdfReader) -> List[dict]:
+    """
+    Read the outline (bookmarks) of a PDF as a flat list of sections.
+    
+    A section ends where the next entry at the same or a higher level begins:
+    on the page before it, or on its page if it starts mid-page.
+    
+    Args:
+        reader: PyPDF2 reader
+        
+    Returns:
+        Entries in document order, each a dictionary with "title", "level" (0 for
+        top-level entries), "page" and "end_page" (1-based, inclusive)
+    """
+    try:
+        items = reader.outline
+    except Exception:
+        return []
+    entries: List[dict] = []
+    _flatten_outline(reader, items, 0, entries)
+    
+    page_count = len(reader.pages)
+    for i, entry in enumerate(entries):
+        end_page = page_count
+        for following in entries[i + 1:]:
+            if following["level"] <= entry["level"]:
+                end_page = following["page"] if following["mid_page"] else following["page"] - 1
+                break
+        entry["end_page"] = max(entry["page"], end_page)
+    for entry in entries:
+        del entry["mid_page"]
+    return entries
+
+
+def select_sections(outline: List[dict], patterns: List[str]) -> List[int]:
+    """
+    Resolve outline sections selected by title to pages.
     
-    # Extract pages as images
+    Args:
+        outline: Outline entries from read_outline
+        patterns: Regular expressions searched in section titles, ignoring case;
+            a matching section includes its subsections
+        
+    Returns:
+        Sorted page numbers of the matching sections
+        
+    Raises:
+        ValueError: If a pattern is not a valid regular expression
+    """
     try:
-        images = convert_from_path(pdf_path, first_page=first_page, last_page=last_page, poppler_path=poppler_path)
-    except Exception as e:
-        if "poppler" in str(e).lower():
-            raise Exception(
-                "Could not find Poppler. Please install Poppler from "
-                "https://github.com/oschwartz10612/poppler-windows/releases/ "
-                "and specify the path using the --poppler-path argument."
-            )
-        raise e
-    
-    # Save images
-    image_paths = []
-    for i, image in enumerate(images):
-        page_num = start_page + i
+        regexes = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    except re.error as e:
+        raise ValueError(f"Invalid section pattern: {str(e)}")
+    pages = set()
+    for entry in outline:
+        if any(regex.search(entry["title"]) for regex in regexes):
+            pages.update(range(entry["page"], entry["end_page"] + 1))
+    return sorted(pages)
+
+
+def parse_page_set(spec: str, total_pages: int) -> List[int]:
+    """
+    Parse a page set such as "1-4,37,120-140".
+    
+    Ranges may be open ("120-" runs to the last page, "-5" starts at the first);
+    pages beyond the end of the document are dropped.
+    
+    Args:
+        spec: Comma-separated page numbers and inclusive ranges (1-based)
+        total_pages: Number of pages in the document
+        
+    Returns:
+        Sorted page numbers without duplicates
+        
+    Raises:
+        ValueError: If the page set is malformed
+    """
+    pages = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, separator, last = part.partition("-")
+        try:
+            first_page = int(first) if first else 1
+            last_page = int(last) if last else None
+        except ValueError:
+            raise ValueError(f"Invalid page set entry '{part}'")
+        if not separator:
+            last_page = first_page
+        if first_page < 1 or (last_page is not None and last_page < first_page):
+            raise ValueError(f"Invalid page range '{part}'")
+        pages.update(range(first_page, min(last_page or total_pages, total_pages) + 1))
+    return sorted(pages)
+
+
+def format_page_set(pages: List[int], separator: str = ",") -> str:
+    """
+    Format sorted page numbers as a compact page set, e.g. "1-4,37,120-140".
+    
+    Args:
+        pages: Sorted page numbers
+        separator: Separator between the ranges
+        
+    Returns:
+        Page set string
+    """
+    return separator.join(f"{first}" if first == last else f"{first}-{last}"
+                          for first, last in _group_pages(pages, len(pages) or 1))
+
+
+def _iter_rendered_chunks(backend: RenderBackend, pdf: Union[str, Document], chunks: List[Tuple[int, int]], dpi: int,
+                          workers: int = 1) -> Iterator[Tuple[int, List[Image.Image]]]:
+    """
+    Render page chunks, at most ``workers`` at a time, and yield them in order.
+    
+    Poppler runs as a separate process per chunk, so threads are enough to keep
+    several cores busy. Backends that are not thread-safe render sequentially.
+    
+    Yields:
+        Tuples (first_page, images)
+    """
+    if workers <= 1 or len(chunks) <= 1 or not backend.supports_threads:
+        for first_page, last_page in chunks:
+            yield first_page, backend.render(pdf, first_page, last_page, dpi)
+        return
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        remaining = iter(chunks)
+        
+        def submit_next():
+            chunk = next(remaining, None)
+            if chunk is not None:
+                pending.append((chunk[0], executor.submit(backend.render, pdf, chunk[0], chunk[1], dpi)))
+        
+        # Keep only `workers` chunks in flight to bound memory use
+        for _ in range(workers):
+            submit_next()
+        
+        while pending:
+            first_page, future = pending.popleft()
+            images = future.result()
+            submit_next()
+            yield first_page, images
+
+
+def _group_pages(pages: List[int], chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Group sorted page numbers into contiguous ranges of at most ``chunk_size`` pages.
+    
+    Returns:
+        List of inclusive (first_page, last_page) ranges
+    """
+    chunks = []
+    for page_num in pages:
+        if chunks and page_num == chunks[-1][1] + 1 and page_num - chunks[-1][0] < chunk_size:
+            chunks[-1] = (chunks[-1][0], page_num)
+        else:
+            chunks.append((page_num, page_num))
+    return chunks
+
+
+# Operators that put text or vector graphics on a page
+_MARKING_OPERATORS = {b"Tj", b"TJ", b"'", b'"', b"BI", b"sh", b"S", b"s", b"f", b"F", b"f*", b"B", b"B*", b"b", b"b*"}
+
+# Minimum fraction of the page area a scan image must cover
+_SCAN_MIN_COVERAGE = 0.9
+
+
+def find_scan_image(page: PageObject) -> Optional[DictionaryObject]:
+    """
+    Detect a page that consists of a single full-page scan image.
+    
+    The page must draw exactly one image XObject, upright and covering most of
+    the page, and nothing else (no text, vector graphics or inline images).
+    
+    Args:
+        page: PyPDF2 page object
+        
+    Returns:
+        The image XObject, or None if the page is not a single-image scan
+    """
+    try:
+        if page.get("/Rotate", 0) % 360 != 0:
+            return None
+        
+        resources = page.get("/Resources")
+        xobjects = resources.get_object().get("/XObject") if resources is not None else None
+        if xobjects is None:
+            return None
+        xobjects = xobjects.get_object()
+        if len(xobjects) != 1:
+            return None
+        image = list(xobjects.values())[0].get_object()
+        if image.get("/Subtype") != "/Image":
+            return None
+        
+        contents = page.get_contents()
+        if contents is None:
+            return None
+        if not isinstance(contents, ContentStream):
+            contents = ContentStream(contents, page.pdf)
+        
+        # Track the transformation matrix to find where the image is drawn
+        matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+        stack = []
+        image_matrix = None
+        for operands, operator in contents.operations:
+            if operator in _MARKING_OPERATORS:
+                return None
+            if operator == b"q":
+                stack.append(matrix)
+            elif operator == b"Q" and stack:
+                matrix = stack.pop()
+            elif operator == b"cm":
+                a, b, c, d, e, f = (float(value) for value in operands)
+                m = matrix
+                matrix = (a * m[0] + b * m[2], a * m[1] + b * m[3],
+                          c * m[0] + d * m[2], c * m[1] + d * m[3],
+                          e * m[0] + f * m[2] + m[4], e * m[1] + f * m[3] + m[5])
+            elif operator == b"Do":
+                if image_matrix is not None:
+                    return None
+                image_matrix = matrix
+        
+        if image_matrix is None:
+            return None
+        a, b, c, d = image_matrix[:4]
+        # Rotated, skewed or mirrored placements would need re-rendering to look right
+        if abs(b) > 1e-6 or abs(c) > 1e-6 or a <= 0 or d <= 0:
+            return None
+        page_area = float(page.mediabox.width) * float(page.mediabox.height)
+        if page_area <= 0 or a * d / page_area < _SCAN_MIN_COVERAGE:
+            return None
+        return image
+    except Exception:
+        return None
+
+
+def extract_scan_image(image: DictionaryObject) -> Optional[bytes]:
+    """
+    Get the encoded bytes of a scan image without rasterizing the page.
+    
+    JPEG images are returned as stored in the PDF. CCITT fax images are
+    converted to 1-bit PNG, since vision APIs do not accept CCITT/TIFF.
+    
+    Args:
+        image: Image XObject returned by find_scan_image
+        
+    Returns:
+        JPEG or PNG bytes, or None if the image cannot be passed through as-is
+    """
+    try:
+        # Masks, inverted decode arrays and image masks change how the image looks on the page.
+        # PyPDF2's BooleanObject is truthy even for false, so flags are compared by value.
+        if any(key in image for key in ("/SMask", "/Mask", "/Decode")) or image.get("/ImageMask", False) == True:
+            return None
+        
+        filters = image.get("/Filter")
+        if filters is None:
+            return None
+        filters = filters.get_object()
+        if not isinstance(filters, ArrayObject):
+            filters = [filters]
+        filters = [str(value) for value in filters]
+        
+        if filters == ["/DCTDecode"]:
+            color_space = image.get("/ColorSpace")
+            color_space = color_space.get_object() if color_space is not None else None
+            if isinstance(color_space, ArrayObject) and color_space and color_space[0] == "/ICCBased":
+                components = color_space[1].get_object().get("/N")
+                return image._data if components in (1, 3) else None
+            return image._data if color_space in ("/DeviceGray", "/DeviceRGB") else None
+        
+        if filters == ["/CCITTFaxDecode"]:
+            decode_parms = image.get("/DecodeParms")
+            decode_parms = decode_parms.get_object() if decode_parms is not None else {}
+            if isinstance(decode_parms, ArrayObject):
+                decode_parms = decode_parms[0].get_object() if decode_parms else {}
+            # BlackIs1 images appear inverted relative to the CCITT run colors
+            if decode_parms.get("/BlackIs1", False) == True:
+                return None
+            # PyPDF2 wraps the CCITT data in a TIFF header that Pillow can decode
+            with Image.open(io.BytesIO(image.get_data())) as img:
+                buffer = io.BytesIO()
+                img.convert("1").save(buffer, "PNG", optimize=True)
+                return buffer.getvalue()
+    except Exception:
+        return None
+    return None
+
+
+def iter_page_images(pdf_path: str, output_dir: str = None, poppler_path: str = None,
+                     start_page: int = None, end_page: int = None, dpi: int = 200,
+                     chunk_size: int = 4, workers: int = 1,
+                     backend: Union[str, RenderBackend] = DEFAULT_RENDER_BACKEND,
+                     in_memory: bool = False, cache: Optional[RenderCache] = None,
+                     document: Optional[Document] = None,
+                     passthrough_scans: bool = False,
+                     pages: Optional[List[int]] = None) -> Iterator[Tuple[int, Union[str, bytes]]]:
+    """
+    Render PDF pages in small windows and yield each page image as soon as it is saved.
+    
+    Only ``chunk_size`` decoded pages per worker are held in memory at a time, so memory
+    use does not grow with the length of the document. With ``workers`` > 1 the range is
+    split into chunks that are rendered by parallel renderer processes; pages are still
+    yielded in page order. With ``in_memory`` the encoded PNG bytes are yielded instead
+    of being written to ``output_dir``. Pages found in ``cache`` are not rendered at all.
+    With ``passthrough_scans``, pages that are a single full-page JPEG or CCITT scan
+    yield the embedded image instead of a rendering. With ``pages``, only the listed
+    pages are rendered; consecutive pages are still rendered in shared chunks.
+    Pages a supervised backend could not render are yielded with None as the image.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        output_dir: Directory for saving images (if not specified, a temporary one is created)
+        poppler_path: Path to Poppler executable files (e.g., "C:/Poppler/Library/bin")
+        start_page: First page to extract (1-based index, default: first page)
+        end_page: Last page to extract (1-based index, default: last page)
+        dpi: Rendering resolution
+        chunk_size: Number of pages rendered per renderer call
+        workers: Number of chunks rendered in parallel
+        backend: Render backend instance or name (pdftoppm, pdftocairo, pdfium)
+        in_memory: Yield PNG bytes instead of saving images to disk
+        cache: Persistent render cache for encoded pages
+        document: Already opened document for ``pdf_path`` (opened here if not specified)
+        passthrough_scans: Yield embedded scan images of single-image pages as-is
+        pages: Page numbers to render (1-based), used instead of start_page/end_page
+        
+    Yields:
+        Tuples (page_num, image_path), or (page_num, image_bytes) in in-memory mode
+    """
+    if in_memory:
+        output_dir = None
+    elif output_dir is None:
+        output_dir = tempfile.mkdtemp(prefix="datasheet_parser_")
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    # Get total page count to validate page range
+    owns_document = document is None
+    if owns_document:
+        document = Document(pdf_path)
+    if pages is None:
+        start_page, end_page = get_page_range(document.page_count, start_page, end_page)
+        pages = list(range(start_page, end_page + 1))
+    else:
+        pages = sorted({page_num for page_num in pages if 1 <= page_num <= document.page_count})
+    
+    # Everything that changes the encoded output is part of the cache key
+    backend_name = backend if isinstance(backend, str) else backend.name
+    cache_keys = {}
+    if cache is not None:
+        cache_keys = {page_num: RenderCache.page_key(document.sha256, page_num, dpi=dpi, backend=backend_name, format="png")
+                      for page_num in pages}
+    scan_images = {}
+    if passthrough_scans:
+        for page_num in pages:
+            scan_image = find_scan_image(document.page(page_num))
+            if scan_image is not None:
+                scan_images[page_num] = scan_image
+    to_render = [page_num for page_num in pages if page_num not in scan_images
+                 and (page_num not in cache_keys or not cache.contains(cache_keys[page_num]))]
+    
+    owns_backend = isinstance(backend, str)
+    if owns_backend and to_render:
+        backend = get_render_backend(backend, poppler_path)
+    
+    def rendered_pages():
+        chunks = _group_pages(to_render, max(1, chunk_size))
+        for first_page, images in _iter_rendered_chunks(backend, document, chunks, dpi, workers):
+            for i, image in enumerate(images):
+                yield first_page + i, image
+            del images
+    
+    def save(page_num, image):
+        if image is None:
+            return None
+        if in_memory or cache is not None:
+            buffer = io.BytesIO()
+            image.save(buffer, "PNG")
+            data = buffer.getvalue()
+            # Pages a supervised backend had to render at a lower resolution are not cached
+            if cache is not None and image.info.get("render_dpi", dpi) == dpi:
+                cache.put(cache_keys[page_num], data)
+            return data
         img_path = os.path.join(output_dir, f"page_{page_num:03d}.png")
         image.save(img_path, "PNG")
-        image_paths.append(img_path)
+        return img_path
     
-    return image_paths
+    def render_single(page_num):
+        nonlocal backend
+        if isinstance(backend, str):
+            backend = get_render_backend(backend, poppler_path)
+        image = backend.render(document, page_num, page_num, dpi)[0]
+        page_image = save(page_num, image)
+        if image is not None:
+            image.close()
+        return page_image
+    
+    to_render_set = set(to_render)
+    rendered = rendered_pages()
+    try:
+        for page_num in pages:
+            page_image = None
+            if page_num in to_render_set:
+                if cache is not None:
+                    cache.record_miss()
+                rendered_num, image = next(rendered)
+                page_image = save(rendered_num, image)
+                if image is not None:
+                    image.close()
+            elif page_num in scan_images:
+                page_image = extract_scan_image(scan_images.pop(page_num))
+                if page_image is None:
+                    page_image = render_single(page_num)
+            else:
+                page_image = cache.get(cache_keys[page_num])
+                if page_image is None:
+                    # Evicted by a concurrent run since the lookup
+                    page_image = render_single(page_num)
+            
+            if isinstance(page_image, bytes) and not in_memory:
+                extension = "jpg" if page_image.startswith(b"\xff\xd8") else "png"
+                img_path = os.path.join(output_dir, f"page_{page_num:03d}.{extension}")
+                with open(img_path, "wb") as f:
+                    f.write(page_image)
+                page_image = img_path
+            yield page_num, page_image
+    finally:
+        rendered.close()
+        if owns_backend and not isinstance(backend, str):
+            backend.close()
+        if owns_document:
+            document.close()
 
 
-def get_pdf_metadata(pdf_path: str) -> dict:
+class ThumbnailStack:
     """
-    Get PDF file metadata.
+    Low-resolution grayscale renders of a set of pages, held as one uint8 array.
+    
+    Pages are padded with white to the largest thumbnail size; get() returns
+    a page without the padding.
+    """
+    
+    def __init__(self, pages: List[int], images: np.ndarray, sizes: np.ndarray, dpi: int):
+        """
+        Initialize the stack.
+        
+        Args:
+            pages: Page numbers (1-based) in stack order
+            images: Array of shape (len(pages), height, width)
+            sizes: Array of shape (len(pages), 2) with the (height, width) of each thumbnail
+            dpi: Rendering resolution of the thumbnails
+        """
+        self.pages = pages
+        self.images = images
+        self.sizes = sizes
+        self.dpi = dpi
+        self._index = {page_num: i for i, page_num in enumerate(pages)}
+    
+    def __len__(self) -> int:
+        return len(self.pages)
+    
+    def __contains__(self, page_num: int) -> bool:
+        return page_num in self._index
+    
+    def get(self, page_num: int) -> np.ndarray:
+        """
+        Get the thumbnail of a page.
+        
+        Args:
+            page_num: Page number (1-based index)
+            
+        Returns:
+            2-D uint8 array of luminance values
+        """
+        i = self._index[page_num]
+        height, width = self.sizes[i]
+        return self.images[i, :height, :width]
+
+
+def render_thumbnails(pdf_path: str, pages: List[int], dpi: int = 30, poppler_path: str = None,
+                      backend: Union[str, RenderBackend] = DEFAULT_RENDER_BACKEND,
+                      document: Optional[Document] = None, chunk_size: int = 16,
+                      workers: int = 1) -> ThumbnailStack:
+    """
+    Render low-resolution grayscale thumbnails of pages for analysis.
+    
+    At 30 DPI a Letter page is 255x330 pixels, about 84 KB, so even long
+    documents fit in memory as a single array.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        pages: Page numbers to render (1-based)
+        dpi: Thumbnail resolution
+        poppler_path: Path to Poppler executable files
+        backend: Render backend instance or name (pdftoppm, pdftocairo, pdfium)
+        document: Already opened document for ``pdf_path`` (opened here if not specified)
+        chunk_size: Number of pages rendered per renderer call
+        workers: Number of chunks rendered in parallel
+        
+    Returns:
+        Thumbnail stack of the rendered pages, in ascending page order
+    """
+    owns_document = document is None
+    if owns_document:
+        document = Document(pdf_path)
+    owns_backend = isinstance(backend, str)
+    if owns_backend:
+        backend = get_render_backend(backend, poppler_path)
+    
+    rendered_pages = []
+    thumbnails = []
+    try:
+        chunks = _group_pages(sorted(set(pages)), max(1, chunk_size))
+        for first_page, images in _iter_rendered_chunks(backend, document, chunks, dpi, workers):
+            for i, image in enumerate(images):
+                # Pages that could not be rendered are left out
+                if image is None:
+                    continue
+                rendered_pages.append(first_page + i)
+                thumbnails.append(np.asarray(image.convert("L")))
+                image.close()
+    finally:
+        if owns_backend:
+            backend.close()
+        if owns_document:
+            document.close()
+    
+    sizes = np.array([thumbnail.shape for thumbnail in thumbnails], dtype=np.int32).reshape(-1, 2)
+    height, width = sizes.max(axis=0) if len(thumbnails) else (0, 0)
+    images = np.full((len(thumbnails), height, width), 255, dtype=np.uint8)
+    for i, thumbnail in enumerate(thumbnails):
+        images[i, :thumbnail.shape[0], :thumbnail.shape[1]] = thumbnail
+    return ThumbnailStack(rendered_pages, images, sizes, dpi)
+
+
+def extract_images_from_pdf(pdf_path: str, output_dir: str = None, poppler_path: str = None, 
+                           start_page: int = None, end_page: int = None) -> List[str]:
+    """
+    Extract page images from a PDF file and save them to a temporary directory.
     
     Args:
         pdf_path: Path to the PDF file
+        output_dir: Directory for saving images (if not specified, a temporary one is created)
+        poppler_path: Path to Poppler executable files (e.g., "C:/Poppler/Library/bin")
+        start_page: First page to extract (1-based index, default: first page)
+        end_page: Last page to extract (1-based index, default: last page)
+        
+    Returns:
+        List of paths to saved images
+    """
+    return [image_path for _, image_path in iter_page_images(pdf_path, output_dir, poppler_path,
+                                                             start_page=start_page, end_page=end_page)]
+
+
+def get_pdf_metadata(pdf: Union[str, Document]) -> dict:
+    """
+    Get PDF file metadata.
+    
+    Args:
+        pdf: Path to the PDF file or an opened document
         
     Returns:
         Dictionary with metadata
     """
-    reader = PdfReader(pdf_path)
-    metadata = reader.metadata
+    if isinstance(pdf, Document):
+        return dict(pdf.metadata)
     
-    info = {
-        "title": metadata.get("/Title", "Unknown"),
-        "author": metadata.get("/Author", "Unknown"),
-        "subject": metadata.get("/Subject", ""),
-        "creator": metadata.get("/Creator", ""),
-        "producer": metadata.get("/Producer", ""),
-        "page_count": len(reader.pages)
-    }
+    with Document(pdf) as document:
+        return dict(document.metadata)
+
+
+def get_image_info(image: Union[str, bytes]) -> Tuple[int, int, int]:
+    """
+    Get image dimensions and encoded size without decoding the pixels.
     
-    return info
+    Args:
+        image: Path to the image, or encoded image bytes
+        
+    Returns:
+        Tuple (width, height, size_in_bytes)
+    """
+    in_memory = isinstance(image, (bytes, bytearray))
+    with Image.open(io.BytesIO(image) if in_memory else image) as img:
+        width, height = img.size
+    return width, height, len(image) if in_memory else os.path.getsize(image)
 
 
-def resize_image_if_needed(image_path: str, max_size: int = 5 * 1024 * 1024) -> str:
+def page_image_dpi(page: PageObject, width: int, height: int) -> float:
     """
-    Resize an image if it exceeds the specified size.
+    Get the effective resolution of an image of a whole page.
+    
+    Rendered pages come out at the render DPI, passthrough scans at the resolution
+    they were scanned at, so this is what the legibility floor must be based on.
     
     Args:
-        image_path: Path to the image
-        max_size: Maximum size in bytes (default 5MB)
+        page: PyPDF2 page object
+        width: Image width in pixels
+        height: Image height in pixels
         
     Returns:
-        Path to the image (original or modified)
+        Pixels per inch along the longer side (independent of page rotation)
     """
-    file_size = os.path.getsize(image_path)
+    page_side = max(float(page.mediabox.width), float(page.mediabox.height))
+    return max(width, height) * 72 / page_side if page_side > 0 else 0.0
+
+
+def crop_image_margins(image: Union[str, bytes], padding: int = 16,
+                       accept: Optional[Callable[[Tuple[int, int], Tuple[int, int, int, int]], bool]] = None
+                       ) -> Tuple[Union[str, bytes], Optional[Tuple[int, int, int, int]]]:
+    """
+    Crop empty margins around the page content.
     
-    if file_size <= max_size:
-        return image_path
+    Args:
+        image: Path to the image, or encoded image bytes
+        padding: Margin to keep around the content, in pixels
+        accept: Optional check called with the original size and the proposed crop box;
+            if it returns False the image is left unchanged
+        
+    Returns:
+        Tuple (image, crop_box): the path (rewritten in place) or new bytes, and the
+        crop box (left, top, right, bottom) in original pixels, or None if nothing was cropped
+    """
+    in_memory = isinstance(image, (bytes, bytearray))
+    with Image.open(io.BytesIO(image) if in_memory else image) as img:
+        box = find_content_box(img, padding)
+        if box is None or (accept is not None and not accept(img.size, box)):
+            return image, None
+        
+        image_format = img.format or "PNG"
+        cropped = img.crop(box)
+        save_options = {"quality": 90} if image_format == "JPEG" else {}
+        if in_memory:
+            buffer = io.BytesIO()
+            cropped.save(buffer, image_format, **save_options)
+            return buffer.getvalue(), box
+    
+    cropped.save(image, image_format, **save_options)
+    return image, box
+
+
+def resize_image_if_needed(image: Union[str, bytes], max_size: int = 5 * 1024 * 1024) -> Union[str, bytes]:
+    """
+    Shrink an image if it exceeds the specified size, keeping its format.
     
-    # Open and resize the image
-    with Image.open(image_path) as img:
-        # Determine scaling factor
-        scale_factor = (max_size / file_size) ** 0.5
-        new_width = int(img.width * scale_factor)
-        new_height = int(img.height * scale_factor)
+    See image_encoder.encode_image for a search over formats as well.
+    
+    Args:
+        image: Path to the image, or encoded image bytes
+        max_size: Maximum size in bytes (default 5MB)
         
-        # Resize and save
-        resized_img = img.resize((new_width, new_height), Image.LANCZOS)
-        resized_img.save(image_path, optimize=True)
+    Returns:
+        Path to the image (original or modified), or the (possibly re-encoded) bytes
+    """
+    in_memory = isinstance(image, (bytes, bytearray))
+    file_size = len(image) if in_memory else os.path.getsize(image)
+    
+    if file_size <= max_size:
+        return image
     
-    return image_path 
\ No newline at end of file
+    with Image.open(io.BytesIO(image) if in_memory else image) as img:
+        image_format = (img.format or "PNG").lower()
+    if image_format not in DEFAULT_FORMATS:
+        image_format = "png"
+    data, _ = encode_image(image, max_size, min_scale=SCALE_STEPS[-1], formats=(image_format,))
+    if in_memory:
+        return data
+    with open(image, "wb") as f:
+        f.write(data)
+    return image
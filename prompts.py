@@ -97,4 +97,11 @@ If this page contains a table of contents (TOC):
 - Format it as a clean list WITHOUT dots between entries and page numbers
 - Use a simple format like "Section Name - Page X" or just list the section names
 - DO NOT attempt to reproduce print-style table of contents with alignment dots
-""" 
\ No newline at end of file
+""" 
+
+# Note appended to the page instructions when a large page is sent in tiles
+PAGE_TILE_INSTRUCTION = """
+This image is part {tile_num} of {tile_count} of the page (row {row} of {rows}, column {col} of {cols}).
+Neighbouring parts overlap slightly, so text at the edges may be cut off here and appear in full in another part.
+Extract only what is visible in this part, in reading order, without summarizing or guessing the rest of the page.
+"""
@@ -0,0 +1,418 @@
+import importlib.util
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Resolutions of the retries of a page that timed out or ran out of memory, relative to the requested DPI
+RETRY_DPI_SCALES = (0.5, 0.25)
+
+# Retries never go below this resolution
+MIN_RETRY_DPI = 50
+
+logger = logging.getLogger("RenderBackends")
+
+
+def find_poppler_path() -> Optional[str]:
+    """
+    Look for Poppler executables in standard Windows install locations.
+
+    Returns:
+        Path to the Poppler bin directory, or None to rely on PATH
+    """
+    possible_paths = [
+        "C:/Program Files/poppler/bin",
+        "C:/Program Files (x86)/poppler/bin",
+        "C:/Poppler/bin",
+        "C:/Poppler/Library/bin",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "poppler/bin")
+    ]
+
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class RenderBackend:
+    """Base class for page rasterizers"""
+
+    name = ""
+    # Whether render() may be called from several threads at once
+    supports_threads = True
+    # Optional Python package the backend needs (pip name), or None
+    requires = None
+
+    def render(self, pdf, first_page: int, last_page: int, dpi: int = 200) -> List[Image.Image]:
+        """
+        Render an inclusive page range.
+
+        Args:
+            pdf: Path to the PDF file or an opened pdf_utils.Document
+            first_page: First page to render (1-based index)
+            last_page: Last page to render (1-based index)
+            dpi: Rendering resolution
+
+        Returns:
+            List of rendered pages in page order; SupervisedBackend returns None
+            for pages that could not be rendered
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release resources held by the backend"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PdftoppmBackend(RenderBackend):
+    """Poppler's pdftoppm, driven through pdf2image"""
+
+    name = "pdftoppm"
+    use_pdftocairo = False
+
+    def __init__(self, poppler_path: Optional[str] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            poppler_path: Path to Poppler executable files (searched in standard locations if not specified)
+        """
+        self.poppler_path = poppler_path or find_poppler_path()
+
+    def render(self, pdf, first_page: int, last_page: int, dpi: int = 200) -> List[Image.Image]:
+        from pdf2image import convert_from_path
+
+        try:
+            return convert_from_path(getattr(pdf, "path", pdf), dpi=dpi, first_page=first_page, last_page=last_page,
+                                     poppler_path=self.poppler_path, use_pdftocairo=self.use_pdftocairo)
+        except Exception as e:
+            if "poppler" in str(e).lower():
+                raise Exception(
+                    "Could not find Poppler. Please install Poppler from "
+                    "https://github.com/oschwartz10612/poppler-windows/releases/ "
+                    "and specify the path using the --poppler-path argument."
+                )
+            raise e
+
+
+class PdftocairoBackend(PdftoppmBackend):
+    """Poppler's pdftocairo, driven through pdf2image"""
+
+    name = "pdftocairo"
+    use_pdftocairo = True
+
+
+class PdfiumBackend(RenderBackend):
+    """
+    In-process rasterizer based on pypdfium2.
+
+    Keeps the document open between calls, so there is no subprocess spawn or
+    PPM pipe round-trip per page range. PDFium is not thread-safe, so renders
+    are serialized.
+    """
+
+    name = "pdfium"
+    supports_threads = False
+    requires = "pypdfium2"
+
+    def __init__(self):
+        check_render_backend(self.name)
+        import pypdfium2
+        self._pdfium = pypdfium2
+        self._documents: Dict[object, object] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, pdf):
+        # Documents read through the mapping of a closed pdf_utils.Document cannot be used any more
+        for key in [key for key in self._documents if getattr(key, "closed", False)]:
+            self._documents.pop(key).close()
+        document = self._documents.get(pdf)
+        if document is None:
+            # Read an opened document through its shared memory mapping instead of reopening the file
+            source = pdf.open_stream() if hasattr(pdf, "open_stream") else pdf
+            document = self._pdfium.PdfDocument(source)
+            self._documents[pdf] = document
+        return document
+
+    def render(self, pdf, first_page: int, last_page: int, dpi: int = 200) -> List[Image.Image]:
+        images = []
+        with self._lock:
+            document = self._open(pdf)
+            for page_index in range(first_page - 1, last_page):
+                page = document[page_index]
+                try:
+                    bitmap = page.render(scale=dpi / 72)
+                    images.append(bitmap.to_pil())
+                finally:
+                    page.close()
+        return images
+
+    def close(self) -> None:
+        with self._lock:
+            for document in self._documents.values():
+                document.close()
+            self._documents.clear()
+
+
+def _supervised_worker(conn, backend_name: str, poppler_path: Optional[str], max_memory_bytes: Optional[int]) -> None:
+    """Render requests received over a pipe until None arrives; runs in a worker process"""
+    # A process group of its own, so that renderer subprocesses are killed together with the worker
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    # Inherited by renderer subprocesses such as pdftoppm
+    if max_memory_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+
+    try:
+        backend = get_render_backend(backend_name, poppler_path)
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+    # Startup time does not count against the page timeout
+    conn.send(("ready", None))
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            pdf_path, first_page, last_page, dpi = request
+            try:
+                images = backend.render(pdf_path, first_page, last_page, dpi)
+                conn.send(("ok", [(image.mode, image.size, image.tobytes()) for image in images]))
+            except MemoryError:
+                conn.send(("memory", None))
+            except Exception as e:
+                conn.send(("error", str(e)))
+    finally:
+        backend.close()
+
+
+class SupervisedBackend(RenderBackend):
+    """
+    Runs another backend in supervised worker processes.
+
+    Each render call is handed to a worker process with an address space limit,
+    and given ``page_timeout`` seconds per page. When a chunk times out or runs
+    out of memory, the worker is killed. When a chunk fails for any reason,
+    including renderer errors and empty results, its pages are rendered one by
+    one, so that only the offending page is retried at lower resolutions
+    (RETRY_DPI_SCALES). Pages that cannot be rendered even then come back as None.
+    """
+
+    supports_threads = True
+
+    def __init__(self, backend_name: str, poppler_path: Optional[str] = None, page_timeout: Optional[float] = None,
+                 max_memory_mb: Optional[int] = None):
+        """
+        Initialize the backend. Worker processes are started on demand, one per concurrent render call.
+
+        Args:
+            backend_name: Name of the backend run in the workers
+            poppler_path: Path to Poppler executable files (Poppler backends only)
+            page_timeout: Wall-clock limit per page in seconds (None for no limit)
+            max_memory_mb: Address space limit of a worker and its renderer subprocesses in MB
+                (None for no limit; not available on Windows)
+        """
+        # Renders are identical to the wrapped backend's, so they share render cache entries
+        self.name = backend_name
+        self.poppler_path = poppler_path
+        self.page_timeout = page_timeout
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        if self.max_memory_bytes and resource is None:
+            logger.warning("Render memory limits are not supported on this platform")
+        self.timeouts = 0
+        self.memory_failures = 0
+        self.errors = 0
+        self.empty_renders = 0
+        self.degraded_pages: Dict[int, int] = {}
+        self.failed_pages: List[int] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_supervised_worker,
+            args=(child_conn, self.name, self.poppler_path, self.max_memory_bytes),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        try:
+            status, payload = parent_conn.recv()
+        except EOFError:
+            status, payload = "error", "render worker exited during startup"
+        if status != "ready":
+            process.join()
+            parent_conn.close()
+            raise Exception(payload)
+        return process, parent_conn
+
+    def _release(self, worker) -> None:
+        with self._lock:
+            self._idle.append(worker)
+
+    @staticmethod
+    def _kill(worker) -> None:
+        process, conn = worker
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                # Killed before the worker set up its process group
+                pass
+        process.kill()
+        process.join()
+        conn.close()
+
+    def _run(self, pdf_path: str, first_page: int, last_page: int, dpi: int) -> Optional[List[Image.Image]]:
+        """Render a range in a worker; returns None after a timeout, a crash, a renderer error or an empty result"""
+        worker = self._acquire()
+        _, conn = worker
+        timeout = self.page_timeout * (last_page - first_page + 1) if self.page_timeout else None
+        pages = f"page {first_page}" if first_page == last_page else f"pages {first_page}-{last_page}"
+        try:
+            conn.send((pdf_path, first_page, last_page, dpi))
+            if not conn.poll(timeout):
+                logger.warning(f"Rendering {pages} at {dpi} DPI timed out after {timeout:.1f} s")
+                self._kill(worker)
+                with self._lock:
+                    self.timeouts += 1
+                return None
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            # The worker died, typically because a renderer hit the memory limit
+            status, payload = "memory", None
+            self._kill(worker)
+        else:
+            self._release(worker)
+
+        if status == "error":
+            logger.warning(f"Rendering {pages} at {dpi} DPI failed: {payload}")
+            with self._lock:
+                self.errors += 1
+            return None
+        if status == "memory":
+            logger.warning(f"Rendering {pages} at {dpi} DPI ran out of memory")
+            with self._lock:
+                self.memory_failures += 1
+            return None
+        if not payload:
+            logger.warning(f"Rendering {pages} at {dpi} DPI returned no images")
+            with self._lock:
+                self.empty_renders += 1
+            return None
+        return [Image.frombytes(mode, size, data) for mode, size, data in payload]
+
+    def _render_page(self, pdf_path: str, page_num: int, dpi: int) -> Optional[Image.Image]:
+        for scale in (1.0,) + RETRY_DPI_SCALES:
+            page_dpi = round(dpi * scale)
+            if scale < 1.0 and page_dpi < MIN_RETRY_DPI:
+                break
+            images = self._run(pdf_path, page_num, page_num, page_dpi)
+            if images:
+                if page_dpi != dpi:
+                    logger.warning(f"Rendered page {page_num} at {page_dpi} DPI instead of {dpi} DPI")
+                    # Lets callers keep reduced renders out of caches keyed by the requested DPI
+                    images[0].info["render_dpi"] = page_dpi
+                    with self._lock:
+                        self.degraded_pages[page_num] = page_dpi
+                return images[0]
+
+        logger.error(f"Could not render page {page_num}")
+        with self._lock:
+            self.failed_pages.append(page_num)
+        return None
+
+    def render(self, pdf, first_page: int, last_page: int, dpi: int = 200) -> List[Optional[Image.Image]]:
+        pdf_path = getattr(pdf, "path", pdf)
+        if last_page > first_page:
+            images = self._run(pdf_path, first_page, last_page, dpi)
+            if images is not None and len(images) == last_page - first_page + 1:
+                return images
+        # Isolate the offending page of a failed chunk
+        return [self._render_page(pdf_path, page_num, dpi) for page_num in range(first_page, last_page + 1)]
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            process, conn = worker
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            process.join(5)
+            if process.is_alive():
+                self._kill(worker)
+            else:
+                conn.close()
+
+
+RENDER_BACKENDS = {
+    PdftoppmBackend.name: PdftoppmBackend,
+    PdftocairoBackend.name: PdftocairoBackend,
+    PdfiumBackend.name: PdfiumBackend,
+}
+
+DEFAULT_RENDER_BACKEND = PdftoppmBackend.name
+
+
+def check_render_backend(name: str) -> None:
+    """
+    Check that a render backend exists and its optional dependency is installed.
+
+    Args:
+        name: Backend name (pdftoppm, pdftocairo or pdfium)
+
+    Raises:
+        ValueError: If the backend is unknown or its dependency is missing
+    """
+    if name not in RENDER_BACKENDS:
+        raise ValueError(f"Unknown render backend '{name}'. Available: {', '.join(RENDER_BACKENDS)}")
+    requires = RENDER_BACKENDS[name].requires
+    if requires is not None and importlib.util.find_spec(requires) is None:
+        raise ValueError(f"The {name} render backend requires {requires}. Install it with: pip install {requires}")
+
+
+def get_render_backend(name: str = DEFAULT_RENDER_BACKEND, poppler_path: Optional[str] = None,
+                       page_timeout: Optional[float] = None, max_memory_mb: Optional[int] = None) -> RenderBackend:
+    """
+    Create a render backend by name.
+
+    Args:
+        name: Backend name (pdftoppm, pdftocairo or pdfium)
+        poppler_path: Path to Poppler executable files (Poppler backends only)
+        page_timeout: Per-page time limit in seconds; with a limit the backend runs in supervised worker processes
+        max_memory_mb: Memory limit of a render worker in MB; with a limit the backend runs in supervised worker processes
+
+    Returns:
+        Render backend instance
+    """
+    check_render_backend(name)
+    if page_timeout or max_memory_mb:
+        return SupervisedBackend(name, poppler_path, page_timeout, max_memory_mb)
+
+    backend_class = RENDER_BACKENDS[name]
+    if issubclass(backend_class, PdftoppmBackend):
+        return backend_class(poppler_path)
+    return backend_class()
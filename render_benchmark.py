@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rendering benchmarks for the datasheet parser.
+Measures page rendering throughput, latency and memory, document access costs
+and page image encoding, without calling the model API.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from image_encoder import DEFAULT_FORMATS, DEFAULT_MAX_BYTES, encode_image
+from pdf_utils import Document, get_page_range, iter_page_images
+from render_backends import RENDER_BACKENDS, check_render_backend
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark PDF page rendering")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    workers_parser = subparsers.add_parser("workers", help="Compare pages/sec for different worker counts")
+    workers_parser.add_argument("--workers", "-w", type=int, nargs="+", help="Worker counts to compare", default=[1, 2, 4, 8])
+    workers_parser.add_argument("--render-backend", "-rb", choices=sorted(RENDER_BACKENDS), help="Page rendering backend", default="pdftoppm")
+
+    backends_parser = subparsers.add_parser("backends", help="Compare per-page latency and peak memory of render backends")
+    backends_parser.add_argument("--backends", "-b", nargs="+", choices=sorted(RENDER_BACKENDS), help="Backends to compare", default=sorted(RENDER_BACKENDS))
+
+    open_parser = subparsers.add_parser("open", help="Compare memory-mapped and path-based document access")
+    open_parser.add_argument("--text", action="store_true", help="Also extract the text layer of every page in range")
+    open_parser.add_argument("--render-backend", "-rb", choices=sorted(RENDER_BACKENDS), help="Also render the range with this backend", default=None)
+
+    encode_parser = subparsers.add_parser("encode", help="Measure page image encoding time and payload size")
+    encode_parser.add_argument("--max-image-size", type=float, help="Byte budget of a page image in MB", default=DEFAULT_MAX_BYTES / (1024 * 1024))
+    encode_parser.add_argument("--image-formats", nargs="+", choices=DEFAULT_FORMATS, help="Image formats the encoder may use", default=list(DEFAULT_FORMATS))
+    encode_parser.add_argument("--render-backend", "-rb", choices=sorted(RENDER_BACKENDS), help="Page rendering backend", default="pdftoppm")
+
+    for subparser in (workers_parser, backends_parser, open_parser, encode_parser):
+        subparser.add_argument("pdf_paths", nargs="+", help="Paths to the PDF files")
+        subparser.add_argument("--dpi", type=int, help="Rendering resolution", default=200)
+        subparser.add_argument("--chunk-size", type=int, help="Pages rendered per renderer call", default=4)
+        subparser.add_argument("--poppler-path", "-p", help="Path to Poppler executable files", default=None)
+        subparser.add_argument("--start-page", "-sp", type=int, help="First page to render (1-based index)", default=None)
+        subparser.add_argument("--end-page", "-ep", type=int, help="Last page to render (1-based index)", default=None)
+
+    return parser.parse_args()
+
+
+def _private_rss_mb() -> float:
+    """Current anonymous (private, non file-backed) resident memory in MB, Linux only"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def _peak_rss_mb(who) -> float:
+    """Peak resident set size in MB for the current process or its finished children"""
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _render_timed(pdf_path, args, backend, workers=1):
+    """Render the requested range and return per-page latencies in seconds"""
+    latencies = []
+    with tempfile.TemporaryDirectory(prefix="render_benchmark_") as output_dir:
+        started = time.perf_counter()
+        for _ in iter_page_images(
+            pdf_path,
+            output_dir,
+            args.poppler_path,
+            start_page=args.start_page,
+            end_page=args.end_page,
+            dpi=args.dpi,
+            chunk_size=args.chunk_size,
+            workers=workers,
+            backend=backend
+        ):
+            now = time.perf_counter()
+            latencies.append(now - started)
+            started = now
+    return latencies
+
+
+def _backend_worker(pdf_path, args, backend, results):
+    """Run one backend in a fresh process so that its peak memory is measured in isolation"""
+    try:
+        latencies = _render_timed(pdf_path, args, backend)
+        results.put({
+            "latencies": latencies,
+            "self_rss": _peak_rss_mb(resource.RUSAGE_SELF) if resource else float("nan"),
+            "child_rss": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else float("nan"),
+        })
+    except Exception as e:
+        results.put({"error": str(e)})
+
+
+def _open_worker(pdf_path, args, use_mmap, results):
+    """Open a document the requested way in a fresh process and touch it like a parser run does"""
+    try:
+        started = time.perf_counter()
+        with Document(pdf_path, use_mmap=use_mmap) as document:
+            document.metadata
+            start_page, end_page = get_page_range(document.page_count, args.start_page, args.end_page)
+            opened = time.perf_counter() - started
+
+            if args.text:
+                for page_num in range(start_page, end_page + 1):
+                    document.page_text(page_num)
+
+            if args.render_backend:
+                for _ in iter_page_images(
+                    pdf_path,
+                    poppler_path=args.poppler_path,
+                    start_page=start_page,
+                    end_page=end_page,
+                    dpi=args.dpi,
+                    chunk_size=args.chunk_size,
+                    backend=args.render_backend,
+                    in_memory=True,
+                    document=document
+                ):
+                    pass
+            private_rss = _private_rss_mb()
+
+        results.put({
+            "open": opened,
+            "total": time.perf_counter() - started,
+            "peak_rss": _peak_rss_mb(resource.RUSAGE_SELF) if resource else float("nan"),
+            "private_rss": private_rss,
+        })
+    except Exception as e:
+        results.put({"error": str(e)})
+
+
+def benchmark_open(args):
+    """Open each document through a memory mapping and by path and report wall time and RSS"""
+    for pdf_path in args.pdf_paths:
+        print(f"\n{pdf_path}")
+        print(f"{'access':>7} {'open s':>8} {'total s':>8} {'peak RSS MB':>12} {'private RSS MB':>15}")
+
+        for label, use_mmap in (("path", False), ("mmap", True)):
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_open_worker, args=(pdf_path, args, use_mmap, results))
+            process.start()
+            result = results.get()
+            process.join()
+
+            if "error" in result:
+                print(f"{label:>7} failed: {result['error']}")
+                continue
+            print(f"{label:>7} {result['open']:>8.2f} {result['total']:>8.2f} "
+                  f"{result['peak_rss']:>12.1f} {result['private_rss']:>15.1f}")
+
+
+def benchmark_encode(args):
+    """Render pages in memory, encode each within the byte budget and report time and size per page"""
+    max_bytes = int(args.max_image_size * 1024 * 1024)
+    for pdf_path in args.pdf_paths:
+        print(f"\n{pdf_path} ({args.render_backend}, {args.dpi} DPI, budget {max_bytes / 1024:.0f} KB)")
+        print(f"{'page':>5} {'PNG KB':>8} {'KB':>8} {'format':>8} {'quality':>8} {'scale':>6} {'encodes':>8} {'ms':>7}")
+
+        times = []
+        for page_num, page_bytes in iter_page_images(
+            pdf_path,
+            poppler_path=args.poppler_path,
+            start_page=args.start_page,
+            end_page=args.end_page,
+            dpi=args.dpi,
+            chunk_size=args.chunk_size,
+            backend=args.render_backend,
+            in_memory=True
+        ):
+            _, info = encode_image(page_bytes, max_bytes, formats=args.image_formats)
+            times.append(info["seconds"])
+            print(f"{page_num:>5} {len(page_bytes) / 1024:>8.0f} {info['size'] / 1024:>8.0f} {info['format']:>8} "
+                  f"{str(info['quality'] or '-'):>8} {info['scale']:>6.2f} {info['encodes']:>8} {info['seconds'] * 1000:>7.0f}")
+
+        if times:
+            ordered = sorted(times)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            print(f"mean {sum(times) / len(times) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms per page")
+
+
+def benchmark_workers(args):
+    """Render the same page range with each worker count and report pages/sec"""
+    for pdf_path in args.pdf_paths:
+        print(f"\n{pdf_path} ({args.render_backend}, {args.dpi} DPI)")
+        print(f"{'workers':>8} {'pages':>6} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+
+        baseline = None
+        for workers in args.workers:
+            latencies = _render_timed(pdf_path, args, args.render_backend, workers)
+            pages = len(latencies)
+            elapsed = sum(latencies)
+
+            rate = pages / elapsed if elapsed > 0 else 0.0
+            if baseline is None:
+                baseline = rate
+            speedup = rate / baseline if baseline else 0.0
+            print(f"{workers:>8} {pages:>6} {elapsed:>9.2f} {rate:>9.2f} {speedup:>7.2f}x")
+
+
+def benchmark_backends(args):
+    """Render the same pages with each backend and report per-page latency and peak memory"""
+    for pdf_path in args.pdf_paths:
+        print(f"\n{pdf_path} ({args.dpi} DPI)")
+        print(f"{'backend':>11} {'pages':>6} {'first ms':>9} {'mean ms':>8} {'p95 ms':>8} "
+              f"{'py RSS MB':>10} {'child RSS MB':>13}")
+
+        for backend in args.backends:
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_backend_worker, args=(pdf_path, args, backend, results))
+            process.start()
+            result = results.get()
+            process.join()
+
+            if "error" in result:
+                print(f"{backend:>11} failed: {result['error']}")
+                continue
+
+            latencies = result["latencies"]
+            if not latencies:
+                print(f"{backend:>11} rendered no pages")
+                continue
+            ordered = sorted(latencies)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            mean = sum(latencies) / len(latencies)
+            print(f"{backend:>11} {len(latencies):>6} {latencies[0] * 1000:>9.1f} {mean * 1000:>8.1f} "
+                  f"{p95 * 1000:>8.1f} {result['self_rss']:>10.1f} {result['child_rss']:>13.1f}")
+
+
+def main():
+    """Main function"""
+    args = parse_args()
+
+    # The backends benchmark reports a missing dependency per backend instead
+    if getattr(args, "render_backend", None):
+        try:
+            check_render_backend(args.render_backend)
+        except ValueError as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return 1
+
+    if args.benchmark == "workers":
+        benchmark_workers(args)
+    elif args.benchmark == "backends":
+        benchmark_backends(args)
+    elif args.benchmark == "encode":
+        benchmark_encode(args)
+    else:
+        benchmark_open(args)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional
+
+
+# Default location of persistent caches (can be overridden with SMARTPDF_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.getenv(
+    "SMARTPDF_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "smartpdf-analyzer")
+)
+
+# Default render cache size budget in megabytes
+DEFAULT_RENDER_CACHE_SIZE_MB = 2048
+
+logger = logging.getLogger("RenderCache")
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hash of a file's contents.
+
+    Args:
+        path: Path to the file
+        block_size: Read block size in bytes
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Write a file via a temporary file and rename, so concurrent readers never see a partial file.
+
+    Args:
+        path: Destination path
+        data: File contents
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def evict_lru(directory: str, max_bytes: int, target_ratio: float = 0.9) -> int:
+    """
+    Delete least recently used files under a directory until it fits a size budget.
+
+    Files are ordered by modification time, which cache hits refresh.
+
+    Args:
+        directory: Directory to trim
+        max_bytes: Size budget in bytes
+        target_ratio: Fraction of the budget to trim down to once it is exceeded
+
+    Returns:
+        Total size in bytes after eviction
+    """
+    entries = []
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    if total <= max_bytes:
+        return total
+
+    target = int(max_bytes * target_ratio)
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+    return total
+
+
+class RenderCache:
+    """
+    Persistent content-addressed cache of encoded page images.
+
+    Entries are keyed by the hash of the PDF bytes, the page number and every
+    parameter that affects the output (DPI, backend, encoder settings), so any
+    change in the input or settings results in a miss rather than a stale hit.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: int = DEFAULT_RENDER_CACHE_SIZE_MB):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Cache root directory (default: renders/ under DEFAULT_CACHE_DIR)
+            max_size_mb: Size budget in megabytes; least recently used pages are evicted beyond it
+        """
+        self.cache_dir = cache_dir or os.path.join(DEFAULT_CACHE_DIR, "renders")
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def page_key(pdf_hash: str, page_num: int, **params) -> str:
+        """
+        Build the cache key for a rendered page.
+
+        Args:
+            pdf_hash: Hash of the PDF file contents
+            page_num: Page number (1-based index)
+            **params: Rendering and encoder parameters
+
+        Returns:
+            Hex key
+        """
+        key_data = json.dumps({"pdf": pdf_hash, "page": page_num, **params}, sort_keys=True)
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def contains(self, key: str) -> bool:
+        """Check whether an entry exists without counting a hit or miss"""
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Read an entry and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached bytes, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store an entry and evict old entries if the size budget is exceeded.
+
+        Args:
+            key: Cache key
+            data: Bytes to store
+        """
+        try:
+            write_atomic(self._path(key), data)
+        except OSError as e:
+            logger.warning(f"Could not write render cache entry: {str(e)}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = evict_lru(self.cache_dir, self.max_bytes)
+            else:
+                self._size += len(data)
+                if self._size > self.max_bytes:
+                    self._size = evict_lru(self.cache_dir, self.max_bytes)
+
+    def record_miss(self) -> None:
+        """Count a miss for an entry that was known to be absent"""
+        with self._lock:
+            self.misses += 1
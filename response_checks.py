@@ -0,0 +1,69 @@
+import re
+from typing import List, Optional
+
+
+# Without a text layer, shorter outputs are suspicious on any page worth sending
+MIN_OUTPUT_CHARS = 40
+
+# Outputs with fewer words than this fraction of the text layer are too short
+MIN_TEXT_LAYER_WORDS = 0.5
+
+# Fraction of the text layer's numbers that must appear in the output
+MIN_NUMBER_RECALL = 0.8
+
+# Text layers with fewer numbers are not used for the number check
+MIN_TEXT_LAYER_NUMBERS = 5
+
+# Fraction of garbled numeric tokens above which the output is rejected
+MAX_GARBLED_NUMBERS = 0.05
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Look-alike letters between digits (1O0, 10l5) and broken separators (3..3, 1,,000);
+# letters next to digits alone are common in pin and part names (IO12, S0)
+_GARBLED_NUMBER = re.compile(r"\d[OoIl]+\d|\d[.,]{2,}\d")
+
+_NUMERIC_TOKEN = re.compile(r"\b\w*\d[\w.,]*\b")
+
+
+def _numbers(text: str) -> List[str]:
+    return [number.replace(",", ".") for number in _NUMBER.findall(text)]
+
+
+def check_response(content: str, finish_reason: Optional[str] = None, text: str = "") -> List[str]:
+    """
+    Look for signs that a page was extracted incompletely or misread.
+
+    Args:
+        content: Markdown returned by the model
+        finish_reason: Finish reason reported by the API (None if not reported)
+        text: Text layer of the page, compared with the output if present
+
+    Returns:
+        Reasons the output looks bad ("truncated", "short output", "garbled numbers",
+        "text layer mismatch"); empty if it looks fine
+    """
+    reasons = []
+    if finish_reason is not None and finish_reason != "stop":
+        reasons.append("truncated")
+
+    text_words = text.split()
+    if text_words:
+        short = len(content.split()) < len(text_words) * MIN_TEXT_LAYER_WORDS
+    else:
+        short = len(content.strip()) < MIN_OUTPUT_CHARS
+    if short:
+        reasons.append("short output")
+
+    numeric_tokens = _NUMERIC_TOKEN.findall(content)
+    garbled = _GARBLED_NUMBER.findall(content)
+    if "�" in content or (numeric_tokens and len(garbled) / len(numeric_tokens) > MAX_GARBLED_NUMBERS):
+        reasons.append("garbled numbers")
+
+    # Numbers survive translation and reformatting, so they are compared instead of words
+    text_numbers = set(_numbers(text))
+    if len(text_numbers) >= MIN_TEXT_LAYER_NUMBERS:
+        found = text_numbers & set(_numbers(content))
+        if len(found) / len(text_numbers) < MIN_NUMBER_RECALL:
+            reasons.append("text layer mismatch")
+    return reasons
@@ -0,0 +1,170 @@
+import io
+import json
+import time
+
+import pytest
+from PIL import Image, ImageDraw
+
+import datasheet_parser
+import render_backends
+from datasheet_parser import find_duplicate_page, process_datasheet, request_tiled_page
+from page_analysis import hamming_distance, page_dhash
+
+
+class _EchoClient:
+    def request_page(self, image, instructions, previous_context="", translate=False, target_language=None):
+        return {"content": f"Tile {image} text\n", "usage": {"total_tokens": 10}, "finish_reason": "stop"}
+
+
+def test_tiled_page_results_follow_tile_order():
+    # Quadrants of different gray levels tell the tiles apart
+    page = Image.new("L", (400, 400))
+    draw = ImageDraw.Draw(page)
+    for level, box in enumerate([(0, 0, 200, 200), (200, 0, 400, 200), (0, 200, 200, 400), (200, 200, 400, 400)], 1):
+        draw.rectangle(box, fill=level * 10)
+    buffer = io.BytesIO()
+    page.save(buffer, "PNG")
+    boxes = [(0, 0, 220, 220), (180, 0, 400, 220), (0, 180, 220, 400), (180, 180, 400, 400)]
+
+    def encode(tile_image):
+        with Image.open(io.BytesIO(tile_image)) as img:
+            tile_num = img.getpixel((img.width // 2, img.height // 2)) // 10
+        # Earlier tiles take longer, so they finish last
+        time.sleep(0.02 * (len(boxes) - tile_num))
+        return tile_num, {"mode": "L", "tile": tile_num}
+
+    response = request_tiled_page(_EchoClient(), buffer.getvalue(), boxes, "Extract the page.", encode, workers=4)
+    assert response["content"] == "Tile 1 text\n\nTile 2 text\n\nTile 3 text\n\nTile 4 text\n"
+    assert response["usage"]["total_tokens"] == 40
+    assert [encoding["tile"] for encoding in response["encodings"]] == [1, 2, 3, 4]
+
+
+class _StubClient:
+    """Records page requests and answers each with a numbered result"""
+
+    def __init__(self, model=None):
+        self.model = model or "gpt-4o"
+        self.requests = []
+
+    def request_page(self, image, previous_context="", instructions="", translate=False, target_language=None):
+        self.requests.append(instructions)
+        return {"content": f"# Result {len(self.requests)}\n\nPin 1 is VDD, pin 2 is GND, request {len(self.requests)}.\n",
+                "finish_reason": "stop", "usage": {"total_tokens": 100}}
+
+
+def _layout_page(shift=0, dot=False, other=False):
+    img = Image.new("L", (850, 1100), 255)
+    draw = ImageDraw.Draw(img)
+    if other:
+        for y in range(120, 1000, 60):
+            draw.rectangle((100, y, 750, y + 20), fill=0)
+    else:
+        draw.rectangle((100, 100, 750, 300), fill=0)
+        draw.rectangle((100, 400 + shift, 400, 900), fill=80)
+    if dot:
+        draw.rectangle((600, 600, 604, 604), fill=0)
+    return img
+
+
+def _process(tmp_path, monkeypatch, images, **options):
+    pytest.importorskip("pypdfium2")
+    pdf_path = tmp_path / "doc.pdf"
+    images[0].save(pdf_path, "PDF", resolution=100, save_all=True, append_images=images[1:])
+    client = _StubClient()
+    monkeypatch.setattr(datasheet_parser, "OpenAIClient", lambda model=None: client)
+    output_dir = tmp_path / "out"
+    process_datasheet(str(pdf_path), str(output_dir), render_backend="pdfium", in_memory=True, dpi=100,
+                      workspace_dir=str(tmp_path / "workspaces"), **options)
+    with open(output_dir / "doc_pages.json", encoding="utf-8") as f:
+        records = json.load(f)
+    markdown = [(output_dir / f"doc_page_{record['page']:03d}.md").read_text(encoding="utf-8") for record in records]
+    return client, records, markdown
+
+
+def test_near_duplicate_page_reuses_earlier_result(tmp_path, monkeypatch):
+    pages = [_layout_page(), _layout_page(other=True), _layout_page(dot=True)]
+    assert hamming_distance(page_dhash(pages[0]), page_dhash(pages[2])) <= 4
+
+    client, records, markdown = _process(tmp_path, monkeypatch, pages, dedupe_pages=True, dedupe_distance=4)
+    assert len(client.requests) == 2
+    assert [record["status"] for record in records] == ["sent", "sent", "duplicate"]
+    assert records[2]["duplicate_of"] == 1
+    assert markdown[2] == markdown[0]
+
+
+def test_pages_beyond_hamming_threshold_are_sent(tmp_path, monkeypatch):
+    pages = [_layout_page(), _layout_page(shift=150)]
+    assert hamming_distance(page_dhash(pages[0]), page_dhash(pages[1])) > 4
+
+    client, records, markdown = _process(tmp_path, monkeypatch, pages, dedupe_pages=True, dedupe_distance=4)
+    assert len(client.requests) == 2
+    assert [record["status"] for record in records] == ["sent", "sent"]
+    assert markdown[0] != markdown[1]
+
+
+def test_thumbnail_pass_plans_duplicates_before_rendering(tmp_path, monkeypatch):
+    pages = [_layout_page(), _layout_page(dot=True), _layout_page(shift=150)]
+    client, records, markdown = _process(tmp_path, monkeypatch, pages, dedupe_pages=True, dedupe_distance=4,
+                                         thumbnail_pass=True)
+    assert len(client.requests) == 2
+    assert [record["status"] for record in records] == ["sent", "duplicate", "sent"]
+    assert markdown[1] == markdown[0]
+
+
+def test_thumbnail_pass_skips_blank_pages(tmp_path, monkeypatch):
+    rendered = []
+    iter_page_images = datasheet_parser.iter_page_images
+    monkeypatch.setattr(datasheet_parser, "iter_page_images",
+                        lambda *args, **kwargs: rendered.extend(kwargs["pages"]) or iter_page_images(*args, **kwargs))
+    pages = [_layout_page(), Image.new("L", (850, 1100), 255), _layout_page(other=True)]
+    client, records, markdown = _process(tmp_path, monkeypatch, pages, skip_blank_pages=True, thumbnail_pass=True)
+    # The blank page is never rendered at full resolution
+    assert rendered == [1, 3]
+    assert len(client.requests) == 2
+    assert [record["status"] for record in records] == ["sent", "blank", "sent"]
+    assert "blank page" in markdown[1]
+
+
+def test_find_duplicate_page_picks_closest_match_within_distance():
+    processed = [
+        {"page": 1, "hash": 0b1111, "digest": None, "text": "", "md_file": "1.md"},
+        {"page": 2, "hash": 0b0111, "digest": None, "text": "", "md_file": "2.md"},
+    ]
+    assert find_duplicate_page(processed, 0b0011, 1)["page"] == 2
+    assert find_duplicate_page(processed, 0b0000, 2) is None
+    # Different text layers or byte digests rule out a match
+    processed[1]["text"] = "Rev A"
+    assert find_duplicate_page(processed, 0b0111, 1, text="Rev B")["page"] == 1
+    processed[0]["digest"] = "abc"
+    assert find_duplicate_page(processed, 0b1111, 0, digest="abd") is None
+
+
+def test_render_workers_are_shut_down_when_a_run_fails(tmp_path, monkeypatch):
+    closed = []
+    monkeypatch.setattr(render_backends.SupervisedBackend, "close", lambda self: closed.append(self))
+
+    def failing_client(model=None):
+        raise RuntimeError("no API key")
+
+    monkeypatch.setattr(datasheet_parser, "OpenAIClient", failing_client)
+    pdf_path = tmp_path / "doc.pdf"
+    Image.new("RGB", (850, 1100), "white").save(pdf_path, "PDF", resolution=100)
+    with pytest.raises(RuntimeError):
+        process_datasheet(str(pdf_path), str(tmp_path / "out"), render_backend="pdfium", render_timeout=30,
+                          workspace_dir=str(tmp_path / "workspaces"))
+    assert len(closed) == 1
+
+
+def test_chunk_size_is_passed_to_the_renderer(tmp_path, monkeypatch):
+    chunk_sizes = []
+    iter_page_images = datasheet_parser.iter_page_images
+
+    def recording_iter_page_images(*args, **kwargs):
+        chunk_sizes.append(kwargs["chunk_size"])
+        return iter_page_images(*args, **kwargs)
+
+    monkeypatch.setattr(datasheet_parser, "iter_page_images", recording_iter_page_images)
+    pages = [_layout_page(100), _layout_page(300)]
+    client, records, _ = _process(tmp_path, monkeypatch, pages, chunk_size=1)
+    assert chunk_sizes == [1]
+    assert [record["status"] for record in records] == ["sent", "sent"]
@@ -0,0 +1,112 @@
+import io
+
+import pytest
+from PIL import Image
+from PyPDF2 import PdfWriter
+
+from dpi_calibration import calibrate_dpi, distinct_payload_dpis, pick_sample_pages, text_agreement
+
+
+REFERENCE = "| Parameter | Min | Max |\n|---|---|---|\n| VDD | 3.0 V | 3.6 V |\n| IDD | | 12 mA |\n"
+MISREAD = "| Parameter | Min | Max |\n|---|---|---|\n| VDD | 8.0 V | 3.6 V |\n| 1DD | | 17 mA |\n"
+
+
+class _StubDocument:
+    def __init__(self, texts):
+        self.texts = texts
+
+    def page_text(self, page_num):
+        return self.texts.get(page_num, "")
+
+
+class _StubClient:
+    """Reads the page correctly only from images at least min_width pixels wide"""
+
+    def __init__(self, min_width):
+        self.min_width = min_width
+        self.widths = []
+
+    def process_page(self, image, instructions=""):
+        with Image.open(io.BytesIO(image)) as img:
+            self.widths.append(img.width)
+            return REFERENCE if img.width >= self.min_width else MISREAD
+
+
+def _blank_pdf(tmp_path, pages=3):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(612, 792)
+    path = tmp_path / "doc.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def _calibrate(tmp_path, client, dpis, **options):
+    pytest.importorskip("pypdfium2")
+    return calibrate_dpi(_blank_pdf(tmp_path), client, [1, 3], lambda page_num: f"Page {page_num}",
+                         dpis=dpis, backend="pdfium", **options)
+
+
+def test_text_agreement_ignores_markdown_and_spacing():
+    assert text_agreement(REFERENCE, REFERENCE.replace("|", " ").replace("---", "")) == 1.0
+    assert text_agreement("", "") == 1.0
+    assert text_agreement(REFERENCE, "") == 0.0
+    assert 0.5 < text_agreement(REFERENCE, MISREAD) < 0.95
+
+
+def test_pick_sample_pages_takes_densest_page_of_each_part():
+    document = _StubDocument({2: "short", 3: "a much longer text layer", 5: "text", 8: "the densest page of all"})
+    assert pick_sample_pages(document, list(range(1, 10)), 3) == [3, 5, 8]
+    # Without a text layer the middle page of each part is used
+    assert pick_sample_pages(_StubDocument({}), list(range(1, 10)), 3) == [2, 5, 8]
+    assert pick_sample_pages(_StubDocument({}), [4, 7], 5) == [4, 7]
+
+
+def test_calibrate_picks_lowest_resolution_agreeing_with_reference(tmp_path):
+    client = _StubClient(min_width=600)
+    dpi, agreement = _calibrate(tmp_path, client, (144, 36, 72))
+    assert dpi == 72
+    assert agreement[144] == 1.0 and agreement[72] == 1.0 and agreement[36] < 0.95
+    # Reference first, then from the lowest resolution up
+    assert client.widths == [1224, 1224, 306, 306, 612, 612]
+
+
+def test_calibrate_passes_resolution_to_encoder(tmp_path):
+    encoded = []
+
+    def encode(image, image_dpi):
+        encoded.append(image_dpi)
+        return image, {}
+
+    _calibrate(tmp_path, _StubClient(min_width=0), (36, 72), encode=encode)
+    assert encoded == [72, 72, 36, 36]
+
+
+def test_calibrate_skips_resolutions_sent_at_the_same_size(tmp_path):
+    def target_size(width, height):
+        scale = min(1.0, 700 / width)
+        return round(width * scale), round(height * scale)
+
+    assert distinct_payload_dpis([(612, 792)], (36, 72, 144, 216), target_size) == [36, 72, 144]
+    client = _StubClient(min_width=600)
+    dpi, agreement = _calibrate(tmp_path, client, (36, 72, 144, 216), target_size=target_size)
+    assert dpi == 72
+    assert sorted(agreement) == [36, 72, 144]
+    assert 1836 not in client.widths
+
+
+def test_calibrate_makes_no_requests_when_every_resolution_is_capped(tmp_path):
+    client = _StubClient(min_width=600)
+    dpi, agreement = _calibrate(tmp_path, client, (100, 150, 200, 300), target_size=lambda width, height: (200, 259))
+    assert (dpi, agreement) == (100, {100: 1.0})
+    assert client.widths == []
+
+
+def test_distinct_payload_dpis_ignores_rounding_of_provider_scaling():
+    # Scaling to a short side of 768 px gives 767 or 768 px depending on the render size
+    def target_size(width, height):
+        scale = 768 / min(width, height)
+        return int(width * scale), int(height * scale)
+
+    assert distinct_payload_dpis([(612, 792)], (100, 150, 200, 300), target_size) == [100]
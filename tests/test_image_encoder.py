@@ -0,0 +1,102 @@
+import io
+
+from PIL import Image, ImageChops, ImageDraw
+
+from image_encoder import encode_image
+
+
+def _text_page(size=(1000, 1400)):
+    img = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(img)
+    for y in range(100, size[1] - 100, 40):
+        draw.text((100, y), "VDD 3.3 V, IDD 12 mA, tSU 5 ns", fill=0)
+    return img
+
+
+def test_palette_only_bilevel_page_falls_back_to_png():
+    data, info = encode_image(_text_page(), formats=("palette",), color_mode="1")
+    assert info["format"] == "png"
+    assert info["mode"] == "1"
+    assert info["size"] == len(data)
+
+
+def _photo_page(size=(1200, 1600)):
+    # Noise compresses badly in every format, so the budget forces the scale down
+    return Image.effect_noise(size, 80).convert("RGB")
+
+
+def test_encode_keeps_full_scale_within_budget():
+    data, info = encode_image(_text_page())
+    assert info["scale"] == 1.0
+    assert (info["width"], info["height"]) == (1000, 1400)
+    assert info["size"] == len(data)
+    assert Image.open(io.BytesIO(data)).size == (1000, 1400)
+
+
+def test_encode_lowers_scale_to_fit_budget():
+    data, info = encode_image(_photo_page(), max_bytes=150_000, formats=("jpeg",))
+    assert len(data) <= 150_000
+    assert info["format"] == "jpeg"
+    assert 0.5 <= info["scale"] <= 1.0
+
+
+def test_encode_stops_at_legibility_floor():
+    data, info = encode_image(_photo_page(), max_bytes=1000, min_scale=0.5, formats=("png",))
+    assert len(data) > 1000
+    assert info["scale"] == 0.5
+    assert (info["width"], info["height"]) == (600, 800)
+
+
+def test_encode_limits_longest_side():
+    _, info = encode_image(_text_page(), max_side=700)
+    assert max(info["width"], info["height"]) == 700
+    assert info["scale"] == 0.5
+
+
+def test_encode_passes_through_input_already_in_candidate_format():
+    buffer = io.BytesIO()
+    _text_page().save(buffer, "PNG")
+    page = buffer.getvalue()
+    data, info = encode_image(page, formats=("png",))
+    assert data == page
+    assert info["encodes"] == 0
+
+
+def test_encode_bilevel_page():
+    data, info = encode_image(_text_page(), color_mode="1")
+    assert info["mode"] == "1"
+    assert Image.open(io.BytesIO(data)).mode == "1"
+
+
+
+def _noisy_scan(size=(1000, 1400)):
+    # Sensor noise makes lossless PNG far larger than palette PNG, which quantizes it away
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    for y in range(100, size[1] - 100, 40):
+        draw.text((100, y), "VDD 3.3 V, IDD 12 mA, tSU 5 ns", fill=(30, 30, 120))
+    noise = Image.effect_noise(size, 4)
+    return ImageChops.add(img, Image.merge("RGB", (noise, noise, noise)), 1, -128)
+
+
+def test_encode_prefers_lossless_png_within_budget():
+    page = _noisy_scan()
+    png_size = encode_image(page, formats=("png",))[1]["size"]
+    assert encode_image(page, formats=("palette",))[1]["size"] < png_size
+
+    _, info = encode_image(page)
+    assert (info["format"], info["scale"]) == ("png", 1.0)
+    assert info["encodes"] == 1
+
+    _, info = encode_image(page, max_bytes=png_size - 1)
+    assert info["format"] != "png"
+    assert info["scale"] == 1.0
+
+
+def test_encode_prefers_input_as_is_over_lossless_reencoding():
+    buffer = io.BytesIO()
+    _noisy_scan().save(buffer, "JPEG", quality=90)
+    page = buffer.getvalue()
+    data, info = encode_image(page)
+    assert data == page
+    assert (info["format"], info["encodes"]) == ("jpeg", 0)
@@ -0,0 +1,76 @@
+import json
+import os
+
+from PyPDF2 import PdfWriter
+
+import metadata_cache
+from metadata_cache import MetadataCache, load_document_info, page_fingerprints
+from pdf_utils import Document
+
+
+def _pdf(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4 not really parsed here")
+    return str(path)
+
+
+def test_update_does_not_create_entries(tmp_path):
+    cache = MetadataCache(str(tmp_path / "cache"))
+    pdf_path = _pdf(tmp_path)
+    sha256 = cache.file_hash(pdf_path)
+
+    assert not cache.update(sha256, {"dpi_calibration": {"model": {"dpi": 150}}})
+    assert cache.get(pdf_path) is None
+
+    cache.put({"sha256": sha256, "page_count": 2, "page_sizes": [[612, 792], [612, 792]]})
+    assert cache.update(sha256, {"dpi_calibration": {"model": {"dpi": 150}}})
+    info = cache.get(pdf_path)
+    assert info["page_count"] == 2
+    assert info["dpi_calibration"]["model"]["dpi"] == 150
+
+
+def test_partial_entries_are_ignored(tmp_path):
+    cache = MetadataCache(str(tmp_path / "cache"))
+    pdf_path = _pdf(tmp_path)
+    sha256 = cache.file_hash(pdf_path)
+    entry_path = os.path.join(cache.cache_dir, "documents", f"{sha256}.json")
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    with open(entry_path, "w", encoding="utf-8") as f:
+        json.dump({"sha256": sha256, "dpi_calibration": {}}, f)
+    assert cache.get(pdf_path) is None
+
+
+def _blank_pdf(tmp_path):
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(612, 792)
+    path = tmp_path / "blank.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_fingerprints_are_computed_only_on_request(tmp_path, monkeypatch):
+    cache = MetadataCache(str(tmp_path / "cache"))
+    pdf_path = _blank_pdf(tmp_path)
+    calls = []
+    monkeypatch.setattr(metadata_cache, "page_fingerprints",
+                        lambda document: calls.append(document.path) or ["x"] * document.page_count)
+
+    info = load_document_info(pdf_path, cache)
+    assert info["page_count"] == 3
+    assert info["page_sizes"] == [[612.0, 792.0]] * 3
+    assert "page_fingerprints" not in info
+    assert calls == []
+
+    info = load_document_info(pdf_path, cache, fingerprints=True)
+    assert info["page_fingerprints"] == ["x"] * 3
+    assert load_document_info(pdf_path, cache, fingerprints=True)["page_fingerprints"] == ["x"] * 3
+    assert calls == [pdf_path]
+
+
+def test_identical_pages_have_identical_fingerprints(tmp_path):
+    with Document(_blank_pdf(tmp_path)) as document:
+        fingerprints = page_fingerprints(document)
+    assert len(fingerprints) == 3
+    assert len(set(fingerprints)) == 1
@@ -0,0 +1,17 @@
+from model_profiles import MODEL_PROFILES, get_model_profile
+
+
+def test_unknown_models_are_not_downscaled():
+    profile = get_model_profile("local-vlm-7b")
+    assert profile is MODEL_PROFILES["default"]
+    assert profile.target_size(1700, 2200) == (1700, 2200)
+    assert profile.target_size(3400, 4400) == (3400, 4400)
+    assert profile.estimate_tokens(1700, 2200) > 0
+
+
+def test_known_families_use_their_provider_limits():
+    assert get_model_profile("openai/gpt-4o").name == "openai"
+    assert get_model_profile("gpt-4o-mini").name == "openai-mini"
+    assert get_model_profile("anthropic/claude-3-5-sonnet").name == "anthropic"
+    # OpenAI scales the short side to 768 px, so larger pages are not sent
+    assert min(get_model_profile("gpt-4o").target_size(1700, 2200)) <= 768
@@ -0,0 +1,67 @@
+import io
+
+from PIL import Image, ImageDraw, ImageFont
+
+from page_analysis import (find_content_box, hamming_distance, is_blank_page, page_color_mode, page_dhash,
+                           page_ink_stats, to_gray_array)
+
+
+def _text_page(size=(1700, 2200)):
+    """Antialiased 10 pt text on a letter page at 200 DPI, like a born-digital render"""
+    img = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=20)
+    for y in range(150, size[1] - 200, 32):
+        draw.text((150, y), "Supply voltage VDD 1.8 V to 3.6 V, typical current 12 mA", font=font, fill=0)
+    return img
+
+
+def test_antialiased_render_stays_grayscale():
+    assert page_color_mode(_text_page()) == "L"
+    assert page_color_mode(_text_page().convert("RGB")) == "L"
+
+
+def test_thresholded_scan_is_bilevel():
+    bilevel = _text_page().point(lambda value: 255 if value >= 128 else 0)
+    assert page_color_mode(bilevel) == "1"
+    assert page_color_mode(bilevel.convert("1")) == "1"
+
+
+def test_colored_plot_stays_in_color():
+    img = _text_page().convert("RGB")
+    ImageDraw.Draw(img).line((200, 1800, 1400, 1400), fill=(220, 0, 0), width=6)
+    assert page_color_mode(img) == "RGB"
+
+
+def test_blank_page_detection():
+    blank = Image.new("L", (850, 1100), 250)
+    assert is_blank_page(page_ink_stats(blank))
+    assert not is_blank_page(page_ink_stats(_text_page()))
+    assert is_blank_page(page_ink_stats(_text_page()), text="This page intentionally left blank")
+    assert not is_blank_page(page_ink_stats(_text_page()), text="Not blank. " * 100 + "intentionally left blank")
+
+
+def test_content_box_in_original_pixels():
+    img = Image.new("L", (2000, 3000), 255)
+    ImageDraw.Draw(img).rectangle((500, 600, 1500, 2400), fill=0)
+    left, top, right, bottom = find_content_box(img, padding=10)
+    assert 470 <= left <= 500 and 570 <= top <= 600
+    assert 1500 <= right <= 1530 and 2400 <= bottom <= 2430
+    assert find_content_box(Image.new("L", (200, 200), 255)) is None
+
+
+def test_gray_array_leaves_caller_image_unchanged():
+    img = Image.new("RGB", (2400, 3200), "white")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG")
+    opened = Image.open(io.BytesIO(buffer.getvalue()))
+    assert max(to_gray_array(opened).shape) <= 256
+    assert opened.size == (2400, 3200) and opened.mode == "RGB"
+
+
+def test_dhash_matches_rerenders_and_separates_pages():
+    page = _text_page()
+    other = Image.new("L", (1700, 2200), 255)
+    ImageDraw.Draw(other).rectangle((200, 200, 1500, 1000), fill=0)
+    assert hamming_distance(page_dhash(page), page_dhash(page.resize((1275, 1650), Image.LANCZOS))) <= 4
+    assert hamming_distance(page_dhash(page), page_dhash(other)) > 20
@@ -0,0 +1,37 @@
+from page_index import PageTextIndex, find_keyword_pages
+
+
+INDEX = PageTextIndex({
+    1: "Ordering information: STM32F407VG, STM32F405RG",
+    2: "ADC_CR1: ADC control register 1",
+    3: "The 74HC595-Q1 shift register",
+    4: "Register map",
+    5: "Package dimensions",
+})
+
+
+def test_find_matches_whole_words_ignoring_case_and_punctuation():
+    assert INDEX.find("adc_cr1") == {2}
+    assert INDEX.find("register") == {2, 3, 4}
+    assert INDEX.find("regist") == set()
+    assert INDEX.find("") == set()
+
+
+def test_find_prefix_and_phrase():
+    assert INDEX.find("STM32F4*") == {1}
+    assert INDEX.find("74HC595 Q1") == {3}
+    assert INDEX.find("shift register") == {3}
+    assert INDEX.find("register shift") == set()
+    assert INDEX.find("control reg*") == {2}
+
+
+def test_find_regex_searches_raw_text():
+    assert INDEX.find_regex(r"74HC\d+-Q1") == {3}
+    assert INDEX.find_regex(r"stm32f40[57]") == {1}
+
+
+def test_find_keyword_pages_adds_neighbors_within_index():
+    assert find_keyword_pages(INDEX, keywords=["package"]) == [5]
+    assert find_keyword_pages(INDEX, keywords=["package"], neighbors=1) == [4, 5]
+    assert find_keyword_pages(INDEX, keywords=["ordering"], patterns=[r"map$"], neighbors=1) == [1, 2, 3, 4, 5]
+    assert find_keyword_pages(INDEX) == []
@@ -0,0 +1,40 @@
+from model_profiles import ModelProfile
+from page_tiling import MAX_TILES, needs_tiling, plan_tiles, stitch_tile_markdown
+
+
+PROFILE = ModelProfile("test", max_pixels=1_000_000, max_aspect_ratio=2.5, tile_overlap=64)
+
+
+def test_needs_tiling_on_large_or_elongated_pages():
+    assert not needs_tiling(800, 1100, PROFILE)
+    assert needs_tiling(1700, 2200, PROFILE)
+    assert needs_tiling(400, 1200, PROFILE)
+    assert not needs_tiling(0, 1000, PROFILE)
+
+
+def test_plan_tiles_covers_page_with_overlap():
+    boxes = plan_tiles(1700, 2200, PROFILE)
+    assert 1 < len(boxes) <= MAX_TILES
+    assert all(not needs_tiling(right - left, bottom - top, PROFILE) for left, top, right, bottom in boxes)
+    assert min(box[0] for box in boxes) == 0 and min(box[1] for box in boxes) == 0
+    assert max(box[2] for box in boxes) == 1700 and max(box[3] for box in boxes) == 2200
+    # Reading order: rows top to bottom, left to right within a row
+    assert boxes == sorted(boxes, key=lambda box: (box[1], box[0]))
+    tops = sorted({box[1] for box in boxes})
+    bottoms = sorted({box[3] for box in boxes})
+    assert all(bottom - top == PROFILE.tile_overlap for top, bottom in zip(tops[1:], bottoms))
+
+
+def test_plan_tiles_keeps_small_page_whole():
+    assert plan_tiles(800, 1100, PROFILE) == [(0, 0, 800, 1100)]
+
+
+def test_stitch_drops_lines_repeated_across_tile_border():
+    first = "# Pin Description\n\n| Pin | Name |\n|-----|------|\n| 1 | VDD supply input |\n"
+    second = "| 1 | VDD supply input |\n| 2 | GND |\n"
+    assert stitch_tile_markdown([first, second]) == (
+        "# Pin Description\n\n| Pin | Name |\n|-----|------|\n| 1 | VDD supply input |\n\n| 2 | GND |\n")
+
+
+def test_stitch_keeps_short_repeats():
+    assert stitch_tile_markdown(["Value\n---", "---\nNext"]) == "Value\n---\n\n---\nNext\n"
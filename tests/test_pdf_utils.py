@@ -0,0 +1,316 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import BooleanObject, DecodedStreamObject, NameObject, NumberObject
+
+from pdf_utils import (Document, MappedFile, _group_pages, crop_image_margins, extract_scan_image, find_scan_image,
+                       format_page_set, get_page_range, iter_page_images, page_image_dpi, parse_page_set, read_outline,
+                       render_thumbnails, select_sections)
+from render_backends import get_render_backend
+
+
+def _jpeg_page(size=(2480, 3508), content=(400, 500, 2000, 3000)):
+    img = Image.new("RGB", size, "white")
+    ImageDraw.Draw(img).rectangle(content, fill=(200, 30, 30))
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def test_crop_jpeg_keeps_color_and_full_resolution():
+    sizes = []
+    data, box = crop_image_margins(_jpeg_page(), padding=16, accept=lambda size, box: sizes.append(size) or True)
+
+    assert sizes == [(2480, 3508)]
+    left, top, right, bottom = box
+    assert left <= 400 and top <= 500 and right >= 2000 and bottom >= 3000
+    assert right - left < 1700 and bottom - top < 2600
+
+    cropped = Image.open(io.BytesIO(data))
+    assert cropped.mode == "RGB"
+    assert cropped.size == (right - left, bottom - top)
+    # Content fills the crop up to the padding on every side
+    for x, y in ((50, 50), (cropped.width - 50, cropped.height - 50), (cropped.width // 2, cropped.height // 2)):
+        red, green, blue = cropped.getpixel((x, y))
+        assert red > 150 and green < 80 and blue < 80
+
+
+def test_crop_rejected_by_accept_returns_original():
+    page = _jpeg_page()
+    data, box = crop_image_margins(page, accept=lambda size, box: False)
+    assert box is None
+    assert data is page
+
+
+def test_parse_page_set_ranges_and_single_pages():
+    assert parse_page_set("1-4, 37,120-122", 200) == [1, 2, 3, 4, 37, 120, 121, 122]
+    assert parse_page_set("3,1-3,,2", 10) == [1, 2, 3]
+
+
+def test_parse_page_set_open_ranges_and_clamping():
+    assert parse_page_set("8-", 10) == [8, 9, 10]
+    assert parse_page_set("-3", 10) == [1, 2, 3]
+    assert parse_page_set("9-20,50", 10) == [9, 10]
+
+
+def test_parse_page_set_checks_syntax_without_page_count():
+    assert parse_page_set("1-4,7", 0) == []
+
+
+@pytest.mark.parametrize("spec", ["a", "1-b", "0", "5-3", "1-2-3"])
+def test_parse_page_set_rejects_malformed_entries(spec):
+    with pytest.raises(ValueError):
+        parse_page_set(spec, 10)
+
+
+def test_format_page_set_round_trips():
+    pages = [1, 2, 3, 4, 37, 120, 121]
+    assert format_page_set(pages) == "1-4,37,120-121"
+    assert format_page_set(pages, separator=", ") == "1-4, 37, 120-121"
+    assert parse_page_set(format_page_set(pages), 200) == pages
+    assert format_page_set([]) == ""
+
+
+def test_group_pages_splits_gaps_and_long_runs():
+    assert _group_pages([1, 2, 3, 4, 5, 9, 10], 2) == [(1, 2), (3, 4), (5, 5), (9, 10)]
+    assert _group_pages([], 4) == []
+
+
+def test_get_page_range_clamps_to_document():
+    assert get_page_range(10) == (1, 10)
+    assert get_page_range(10, 0, 50) == (1, 10)
+    assert get_page_range(10, 8, 3) == (8, 8)
+
+
+_OUTLINE = [
+    {"title": "1 Overview", "level": 0, "page": 1, "end_page": 2},
+    {"title": "2 Electrical Characteristics", "level": 0, "page": 3, "end_page": 6},
+    {"title": "2.1 Absolute Maximum Ratings", "level": 1, "page": 3, "end_page": 3},
+    {"title": "3 Package Information", "level": 0, "page": 7, "end_page": 9},
+]
+
+
+def test_select_sections_matches_titles_ignoring_case():
+    assert select_sections(_OUTLINE, ["electrical"]) == [3, 4, 5, 6]
+    assert select_sections(_OUTLINE, ["^1 ", "package"]) == [1, 2, 7, 8, 9]
+    assert select_sections(_OUTLINE, ["pinout"]) == []
+
+
+def test_select_sections_rejects_invalid_pattern():
+    with pytest.raises(ValueError):
+        select_sections(_OUTLINE, ["(unclosed"])
+
+
+def test_read_outline_ends_sections_before_the_next_one():
+    writer = PdfWriter()
+    for _ in range(8):
+        writer.add_blank_page(612, 792)
+    writer.add_outline_item("1  Overview", 0)
+    registers = writer.add_outline_item("2 Registers", 2)
+    writer.add_outline_item("2.1 Control", 2, parent=registers)
+    writer.add_outline_item("2.2 Status", 4, parent=registers)
+    writer.add_outline_item("3 Package", 6)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    outline = read_outline(PdfReader(io.BytesIO(buffer.getvalue())))
+    assert [(entry["title"], entry["level"], entry["page"], entry["end_page"]) for entry in outline] == [
+        ("1 Overview", 0, 1, 2),
+        ("2 Registers", 0, 3, 6),
+        ("2.1 Control", 1, 3, 4),
+        ("2.2 Status", 1, 5, 6),
+        ("3 Package", 0, 7, 8),
+    ]
+    assert select_sections(outline, ["status"]) == [5, 6]
+
+
+def _blank_pdf(tmp_path, pages=3):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(612, 792)
+    path = tmp_path / "blank.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_mapped_streams_keep_their_own_position(tmp_path):
+    with Document(_blank_pdf(tmp_path)) as document:
+        first, second = document.open_stream(), document.open_stream()
+        assert isinstance(first, MappedFile)
+        assert first.read(5) == b"%PDF-"
+        assert second.read(1) == b"%"
+        first.seek(-5, io.SEEK_END)
+        assert first.read() == b"%EOF\n"
+        assert second.tell() == 1
+        assert len(document.reader.pages) == 3
+
+
+def test_closing_document_invalidates_open_streams_and_readers(tmp_path):
+    document = Document(_blank_pdf(tmp_path))
+    stream = document.open_stream()
+    reader = document.reader
+    document.close()
+
+    assert document.closed
+    with pytest.raises(ValueError):
+        stream.read(4)
+    with pytest.raises(ValueError):
+        reader.pages[0].mediabox
+
+
+def test_closed_document_is_not_reopened(tmp_path):
+    document = Document(_blank_pdf(tmp_path))
+    assert document.page_count == 3
+    document.close()
+    document.close()
+
+    with pytest.raises(ValueError):
+        document.reader
+    with pytest.raises(ValueError):
+        document.open_stream()
+
+
+def test_pdfium_does_not_reuse_documents_of_a_closed_mapping(tmp_path):
+    pytest.importorskip("pypdfium2")
+    backend = get_render_backend("pdfium")
+    pdf_path = _blank_pdf(tmp_path)
+    try:
+        with Document(pdf_path) as document:
+            assert backend.render(document, 1, 1, dpi=30)[0].size == (255, 330)
+        with Document(pdf_path) as document:
+            assert backend.render(document, 2, 3, dpi=30)[1].size == (255, 330)
+            # The first document's mapping is gone, so its PDFium document was dropped
+            assert list(backend._documents) == [document]
+    finally:
+        backend.close()
+
+
+def _scan_pdf():
+    # Pillow writes one full-page image per page: JPEG for RGB, CCITT G4 for bilevel images
+    color = Image.new("RGB", (850, 1100), "white")
+    ImageDraw.Draw(color).rectangle((100, 100, 700, 300), fill=(200, 30, 30))
+    bilevel = Image.new("1", (850, 1100), 1)
+    ImageDraw.Draw(bilevel).rectangle((100, 100, 700, 300), fill=0)
+    buffer = io.BytesIO()
+    color.save(buffer, "PDF", resolution=100, save_all=True, append_images=[bilevel])
+    return buffer.getvalue()
+
+
+def _scan_page(contents=None):
+    page = PdfReader(io.BytesIO(_scan_pdf())).pages[0]
+    if contents is not None:
+        stream = DecodedStreamObject()
+        stream.set_data(contents)
+        page[NameObject("/Contents")] = stream
+    return page
+
+
+def test_find_scan_image_on_full_page_image():
+    page = _scan_page()
+    image = find_scan_image(page)
+    assert image is not None
+    data = extract_scan_image(image)
+    assert data.startswith(b"\xff\xd8")
+    assert Image.open(io.BytesIO(data)).size == (850, 1100)
+    assert page_image_dpi(page, 850, 1100) == pytest.approx(100)
+
+
+def test_find_scan_image_follows_nested_transformations():
+    assert find_scan_image(_scan_page(b"q 2 0 0 2 0 0 cm q 306 0 0 396 0 0 cm /image Do Q Q")) is not None
+
+
+@pytest.mark.parametrize("contents", [
+    # Text drawn over the scan
+    b"q 612 0 0 792 0 0 cm /image Do Q BT /F1 12 Tf (x) Tj ET",
+    # Rotated by 90 degrees
+    b"q 0 792 -612 0 612 0 cm /image Do Q",
+    # Mirrored
+    b"q -612 0 0 792 612 0 cm /image Do Q",
+    # Covering a quarter of the page
+    b"q 306 0 0 396 0 0 cm /image Do Q",
+    # Drawn twice
+    b"q 612 0 0 396 0 0 cm /image Do Q q 612 0 0 396 0 396 cm /image Do Q",
+    # A scale undone by the graphics state stack
+    b"q 0.5 0 0 0.5 0 0 cm Q q 306 0 0 396 0 0 cm /image Do Q",
+])
+def test_find_scan_image_rejects_pages_that_need_rendering(contents):
+    assert find_scan_image(_scan_page(contents)) is None
+
+
+def test_find_scan_image_rejects_rotated_page():
+    page = _scan_page()
+    page[NameObject("/Rotate")] = NumberObject(90)
+    assert find_scan_image(page) is None
+
+
+def test_extract_ccitt_scan_as_bilevel_png():
+    page = PdfReader(io.BytesIO(_scan_pdf())).pages[1]
+    image = find_scan_image(page)
+    # Pillow stores black as 1, which inverts the CCITT run colors
+    assert extract_scan_image(image) is None
+
+    # An explicit false must not count as set
+    image["/DecodeParms"][0][NameObject("/BlackIs1")] = BooleanObject(False)
+    image[NameObject("/ImageMask")] = BooleanObject(False)
+    with Image.open(io.BytesIO(extract_scan_image(image))) as img:
+        assert (img.format, img.mode, img.size) == ("PNG", "1", (850, 1100))
+
+
+def test_iter_page_images_passes_scans_through(tmp_path):
+    pytest.importorskip("pypdfium2")
+    pdf_path = tmp_path / "scan.pdf"
+    pdf_path.write_bytes(_scan_pdf())
+    with Document(str(pdf_path)) as document:
+        jpeg = extract_scan_image(find_scan_image(document.page(1)))
+        pages = dict(iter_page_images(str(pdf_path), dpi=72, backend="pdfium", in_memory=True,
+                                      document=document, passthrough_scans=True))
+    assert pages[1] == jpeg
+    # The inverted CCITT scan is rendered instead
+    with Image.open(io.BytesIO(pages[2])) as img:
+        assert (img.format, img.size) == ("PNG", (612, 792))
+
+
+def _sized_pdf(tmp_path, pages=6):
+    # Page n is 100 + 10 * n points wide, so a render at 72 DPI tells which page it is
+    writer = PdfWriter()
+    for page_num in range(1, pages + 1):
+        writer.add_blank_page(100 + 10 * page_num, 200)
+    path = tmp_path / "sized.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_iter_page_images_renders_sparse_pages_in_order(tmp_path):
+    pytest.importorskip("pypdfium2")
+    rendered = list(iter_page_images(_sized_pdf(tmp_path), dpi=72, backend="pdfium", in_memory=True,
+                                     pages=[5, 2, 9, 3, 2], chunk_size=2))
+    assert [page_num for page_num, _ in rendered] == [2, 3, 5]
+    for page_num, data in rendered:
+        with Image.open(io.BytesIO(data)) as img:
+            assert img.size == (100 + 10 * page_num, 200)
+
+
+def test_iter_page_images_writes_sparse_pages_to_disk(tmp_path):
+    pytest.importorskip("pypdfium2")
+    output_dir = tmp_path / "pages"
+    rendered = dict(iter_page_images(_sized_pdf(tmp_path), str(output_dir), dpi=72, backend="pdfium", pages=[6, 1]))
+    assert rendered == {1: str(output_dir / "page_001.png"), 6: str(output_dir / "page_006.png")}
+    with Image.open(rendered[6]) as img:
+        assert img.size == (160, 200)
+
+
+def test_render_thumbnails_stacks_pages_in_page_order(tmp_path):
+    pytest.importorskip("pypdfium2")
+    thumbnails = render_thumbnails(_sized_pdf(tmp_path), [4, 1, 4, 2], dpi=36, backend="pdfium", chunk_size=2)
+    assert thumbnails.pages == [1, 2, 4]
+    assert len(thumbnails) == 3 and 2 in thumbnails and 3 not in thumbnails
+    # Padded to the widest page, but returned without the padding
+    assert thumbnails.images.shape == (3, 100, 70)
+    assert thumbnails.get(1).shape == (100, 55)
+    assert thumbnails.get(4).shape == (100, 70)
+    assert thumbnails.get(2).dtype == np.uint8 and (thumbnails.get(2) == 255).all()
@@ -0,0 +1,55 @@
+import pytest
+from PyPDF2 import PdfWriter
+
+import render_backends
+from render_backends import get_render_backend
+
+pytest.importorskip("pypdfium2")
+
+
+def _blank_pdf(tmp_path, page_count=3):
+    writer = PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(612, 792)
+    path = tmp_path / "blank.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_renderer_error_fails_only_the_offending_page(tmp_path):
+    pdf_path = _blank_pdf(tmp_path)
+    with get_render_backend("pdfium", page_timeout=30) as backend:
+        # Page 4 does not exist, so the worker reports an error for the chunk and for the page itself
+        images = backend.render(pdf_path, 2, 4, dpi=72)
+
+        assert [image.size if image else None for image in images] == [(612, 792), (612, 792), None]
+        assert backend.failed_pages == [4]
+        assert backend.errors >= 2
+        assert backend.timeouts == 0 and backend.memory_failures == 0 and backend.empty_renders == 0
+
+
+def test_timed_out_pages_are_retried_then_failed(tmp_path):
+    pdf_path = _blank_pdf(tmp_path, page_count=2)
+    with get_render_backend("pdfium", page_timeout=0.001) as backend:
+        images = backend.render(pdf_path, 1, 2, dpi=100)
+
+        assert images == [None, None]
+        assert backend.failed_pages == [1, 2]
+        # The chunk, then each page at 100 and 50 DPI; 25 DPI is below MIN_RETRY_DPI
+        assert backend.timeouts == 5
+        assert backend.degraded_pages == {}
+
+
+@pytest.mark.skipif(render_backends.resource is None, reason="memory limits need the resource module")
+def test_out_of_memory_pages_are_retried_at_lower_dpi(tmp_path):
+    pdf_path = _blank_pdf(tmp_path, page_count=1)
+    # A 1200 DPI letter page needs over 500 MB, the 600 DPI retry about a quarter of that
+    with get_render_backend("pdfium", max_memory_mb=600) as backend:
+        images = backend.render(pdf_path, 1, 1, dpi=1200)
+
+        assert backend.memory_failures >= 1
+        assert backend.degraded_pages == {1: 600}
+        assert images[0].width == 5100 and abs(images[0].height - 6600) <= 1
+        assert images[0].info["render_dpi"] == 600
+        assert backend.failed_pages == []
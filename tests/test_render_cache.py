@@ -0,0 +1,57 @@
+import os
+
+from render_cache import RenderCache, evict_lru, write_atomic
+
+
+def _write(path, size, mtime):
+    write_atomic(path, b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_evict_lru_keeps_directory_within_budget(tmp_path):
+    _write(str(tmp_path / "a" / "old"), 400, 1000)
+    _write(str(tmp_path / "b" / "middle"), 400, 2000)
+    _write(str(tmp_path / "a" / "new"), 400, 3000)
+
+    assert evict_lru(str(tmp_path), 2000) == 1200
+    assert evict_lru(str(tmp_path), 1000) == 800
+    assert not (tmp_path / "a" / "old").exists()
+    assert (tmp_path / "b" / "middle").exists() and (tmp_path / "a" / "new").exists()
+
+
+def test_evict_lru_trims_below_budget(tmp_path):
+    for i in range(10):
+        _write(str(tmp_path / f"{i}"), 100, 1000 + i)
+    assert evict_lru(str(tmp_path), 900, target_ratio=0.5) == 400
+    assert sorted(os.listdir(tmp_path)) == ["6", "7", "8", "9"]
+
+
+def test_page_key_depends_on_every_parameter():
+    key = RenderCache.page_key("abc", 1, dpi=200, backend="poppler")
+    assert key == RenderCache.page_key("abc", 1, backend="poppler", dpi=200)
+    assert key != RenderCache.page_key("abc", 2, dpi=200, backend="poppler")
+    assert key != RenderCache.page_key("abc", 1, dpi=300, backend="poppler")
+    assert key != RenderCache.page_key("abd", 1, dpi=200, backend="poppler")
+
+
+def test_render_cache_counts_hits_and_misses(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    key = RenderCache.page_key("abc", 1, dpi=200)
+    assert cache.get(key) is None
+    assert not cache.contains(key)
+
+    cache.put(key, b"page")
+    assert cache.contains(key)
+    assert cache.get(key) == b"page"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_render_cache_evicts_least_recently_used_pages(tmp_path):
+    cache = RenderCache(str(tmp_path), max_size_mb=1)
+    keys = [RenderCache.page_key("abc", page_num) for page_num in range(1, 4)]
+    for i, key in enumerate(keys):
+        cache.put(key, b"x" * 400 * 1024)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+
+    assert not cache.contains(keys[0])
+    assert cache.contains(keys[1]) and cache.contains(keys[2])
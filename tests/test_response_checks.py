@@ -0,0 +1,28 @@
+from response_checks import check_response
+
+
+TEXT = "Supply voltage 3.3 V, current 12 mA, frequency 16 MHz, temperature -40 to 85 C, pins 48"
+GOOD = "| Parameter | Value |\n|---|---|\n| Supply voltage | 3.3 V |\n| Current | 12 mA |\n" \
+       "| Frequency | 16 MHz |\n| Temperature | -40 to 85 C |\n| Pins | 48 |\n"
+
+
+def test_good_output_passes():
+    assert check_response(GOOD, "stop", TEXT) == []
+
+
+def test_truncated_output():
+    assert check_response(GOOD, "length", TEXT) == ["truncated"]
+
+
+def test_short_output_without_text_layer():
+    assert check_response("# Title", "stop") == ["short output"]
+
+
+def test_garbled_numbers():
+    assert "garbled numbers" in check_response(GOOD.replace("12 mA", "1O2 mA"), "stop")
+    assert "garbled numbers" in check_response(GOOD + "�", "stop")
+
+
+def test_numbers_missing_from_text_layer():
+    output = GOOD.replace("3.3", "5.0").replace("16", "8")
+    assert check_response(output, "stop", TEXT) == ["text layer mismatch"]
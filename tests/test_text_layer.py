@@ -0,0 +1,68 @@
+from text_layer import find_repeated_lines, score_text_layer, text_layer_markdown
+
+
+PROSE = ("The device enters standby mode when the enable pin is held low for longer than the\n"
+         "debounce interval. In standby mode all outputs are high impedance and the supply\n"
+         "current drops below one microampere.\n")
+
+TOPICS = ("regulator", "oscillator", "watchdog", "comparator", "reference")
+
+
+def _body(topic):
+    return "".join(f"Paragraph line {word} about the {topic} block, long enough to read as prose text.\n"
+                   for word in ("one", "two", "three", "four", "five", "six"))
+
+
+def _page(number, body):
+    return f"Chapter 2: Power Management\n{body}Revision 1.3 Confidential\n{number}\n"
+
+
+def test_repeated_lines_found_at_page_edges_only():
+    pages = [_page(10 + i, _body(topic)) for i, topic in enumerate(TOPICS[:4])]
+    repeated = find_repeated_lines(pages)
+    assert "chapter #: power management" in repeated
+    assert "revision #.# confidential" in repeated
+    assert not any("paragraph" in line for line in repeated)
+    # Two pages are not enough to tell a running header from a coincidence
+    assert find_repeated_lines(pages[:2]) == set()
+
+
+def test_running_headers_dropped_but_body_matches_kept():
+    pages = [_page(10 + i, _body(topic)) for i, topic in enumerate(TOPICS[:4])]
+    body = PROSE + _body("reference") + "Revision 1.3 Confidential\n" + _body("reference")
+    markdown = text_layer_markdown(_page(14, body), find_repeated_lines(pages))
+    assert "Chapter 2" not in markdown
+    # The body line matching the running footer stays, the footer itself goes
+    assert markdown.count("Revision 1.3 Confidential") == 1
+    assert not markdown.rstrip().endswith("14")
+    assert markdown.startswith("The device enters standby mode")
+
+
+def test_markdown_structure():
+    text = ("3.1 Power-up sequence\n"
+            "After power-up the regulator starts in low-power mode and the reference is trim-\n"
+            "med from the fuse bank before the outputs are enabled.\n"
+            "• Apply VDD before VIO\n"
+            "• Keep RESET low for 10 µs\n")
+    markdown = text_layer_markdown(text)
+    assert "### 3.1 Power-up sequence" in markdown
+    assert "trimmed from the fuse bank" in markdown
+    assert "- Apply VDD before VIO" in markdown
+    assert "- Keep RESET low for 10 µs" in markdown
+
+
+def test_score_prefers_clean_prose():
+    prose = PROSE * 6
+    glyphs = sum(1 for char in prose if not char.isspace())
+    clean = score_text_layer(prose, {"glyphs": glyphs, "figure_area": 0.0, "path_segments": 4})
+    assert clean["score"] > 0.85
+
+    garbled = score_text_layer(prose.replace("e", "", 20), {"glyphs": glyphs, "figure_area": 0.0,
+                                                                  "path_segments": 4})
+    figure = score_text_layer(prose, {"glyphs": glyphs, "figure_area": 0.3, "path_segments": 4})
+    missing = score_text_layer(prose, {"glyphs": glyphs * 3, "figure_area": 0.0, "path_segments": 4})
+    table = score_text_layer("Parameter\nMin\nTyp\nMax\n1.8\n3.3\n3.6\n" * 5, {"glyphs": 150, "figure_area": 0.0,
+                                                                                "path_segments": 400})
+    for result in (garbled, figure, missing, table):
+        assert result["score"] < 0.5
+    assert score_text_layer("", {"glyphs": 0, "figure_area": 0.0, "path_segments": 0})["score"] == 0.0
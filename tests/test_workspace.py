@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+from workspace import Workspace
+
+
+KB = 1024
+
+
+def _write(path, size, mtime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_successful_run_removes_its_workspace(tmp_path):
+    with Workspace(str(tmp_path)) as workspace:
+        path = workspace.create()
+        _write(os.path.join(path, "page_001.png"), 10, 1000)
+    assert not os.path.exists(path)
+    assert os.listdir(tmp_path / "kept") == []
+
+
+def test_failed_and_debug_runs_are_kept(tmp_path):
+    with Workspace(str(tmp_path)) as workspace:
+        failed = workspace.create()
+        _write(os.path.join(failed, "page_001.png"), 10, 1000)
+        workspace.mark_failed()
+    with Workspace(str(tmp_path), keep=True) as workspace:
+        debug = workspace.create()
+        _write(os.path.join(debug, "page_001.png"), 10, 1000)
+    assert sorted(os.listdir(tmp_path / "kept")) == sorted([os.path.basename(failed), os.path.basename(debug)])
+    assert os.listdir(tmp_path / "active") == []
+
+
+def test_kept_runs_are_evicted_oldest_first(tmp_path):
+    for i, name in enumerate(["run_1_old", "run_2_middle", "run_3_new"]):
+        _write(str(tmp_path / "kept" / name / "page_001.png"), 400 * KB, 1000 + i)
+
+    workspace = Workspace(str(tmp_path), max_size_mb=1)
+    workspace.create()
+    assert sorted(os.listdir(tmp_path / "kept")) == ["run_2_middle", "run_3_new"]
+    workspace.close()
+
+
+def test_active_runs_are_never_trimmed(tmp_path):
+    # A concurrent run of a live process, over the whole budget on its own
+    active_run = tmp_path / "active" / f"run_{os.getpid()}_other"
+    _write(str(active_run / "page_001.png"), 1200 * KB, 1000)
+    _write(str(tmp_path / "kept" / "run_1_old" / "page_001.png"), 100 * KB, 2000)
+
+    workspace = Workspace(str(tmp_path), max_size_mb=1)
+    workspace.create()
+    assert (active_run / "page_001.png").exists()
+    assert os.listdir(tmp_path / "kept") == []
+    workspace.close()
+    assert (active_run / "page_001.png").exists()
+
+
+def test_workspaces_of_exited_runs_are_kept(tmp_path):
+    orphan = f"run_{_dead_pid()}_crashed"
+    _write(str(tmp_path / "active" / orphan / "page_001.png"), 10, 1000)
+
+    workspace = Workspace(str(tmp_path))
+    path = workspace.create()
+    assert os.listdir(tmp_path / "active") == [os.path.basename(path)]
+    assert os.listdir(tmp_path / "kept") == [orphan]
+    workspace.close()
@@ -0,0 +1,261 @@
+import logging
+import re
+import statistics
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set
+
+from PyPDF2 import PageObject
+from PyPDF2.generic import ContentStream
+
+
+logger = logging.getLogger("TextLayer")
+
+# Default score from which a page is converted from its text layer instead of being sent to the model
+DEFAULT_TEXT_LAYER_SCORE = 0.85
+
+# Garbage character ratio at which the score drops to zero; extraction errors
+# cluster, so a few bad characters already mean a broken font encoding
+MAX_GARBAGE_RATIO = 0.02
+
+# Fraction of the page area covered by images and forms at which the layout
+# counts as fully complex; logos in headers stay well below it
+FIGURE_AREA_LIMIT = 0.1
+
+# Number of path segments at which the layout counts as fully complex;
+# header and footer rules take a few, table grids and diagrams hundreds
+PATH_SEGMENT_LIMIT = 200
+
+# Lines shorter than this are table cells, labels or code rather than prose
+SHORT_LINE_CHARS = 30
+
+# Fraction of tabular lines (short lines and lines with dot leaders) at which the layout counts as fully complex
+TABULAR_LINE_LIMIT = 0.5
+
+# Lines repeated at the top or bottom of at least this many pages are running headers and footers;
+# headers carrying chapter titles change along the document, so no fraction of all pages is required
+REPEATED_LINE_MIN_PAGES = 3
+
+# Number of lines at the top and bottom of a page searched for running headers and footers
+EDGE_LINES = 3
+
+# Path construction operators and the number of segments each adds
+_PATH_OPERATORS = {b"m": 0, b"l": 1, b"c": 1, b"v": 1, b"y": 1, b"h": 1, b"re": 4}
+
+_TEXT_OPERATORS = {b"Tj", b"TJ", b"'", b'"'}
+
+_MAX_FORM_DEPTH = 4
+
+_BULLET = re.compile(r"^(?:[•●▪■◦‣∙·*–—-]|\(?[a-z0-9]\))\s+")
+_NUMBERED_HEADING = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+([A-Z].{0,80})$")
+_LEADER = re.compile(r"(?:[.:·…]\s?){4,}")
+_PAGE_NUMBER = re.compile(r"^(?:page\s+)?\d+(?:\s+of\s+\d+)?$", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"[.:!?)]$")
+_MARKDOWN_LEADING = re.compile(r"^([#>|`=+])")
+
+
+def _multiply(first: tuple, second: tuple) -> tuple:
+    a, b, c, d, e, f = first
+    return (a * second[0] + b * second[2], a * second[1] + b * second[3],
+            c * second[0] + d * second[2], c * second[1] + d * second[3],
+            e * second[0] + f * second[2] + second[4], e * second[1] + f * second[3] + second[5])
+
+
+def _shown_glyphs(operands: list, two_byte: bool) -> int:
+    strings = operands[0] if operands and isinstance(operands[0], list) else operands[-1:]
+    glyphs = 0
+    for value in strings:
+        if isinstance(value, (str, bytes)):
+            data = value.encode("latin-1", "replace") if isinstance(value, str) else value
+            glyphs += len(data) // 2 if two_byte else len(data.replace(b" ", b""))
+    return glyphs
+
+
+def _walk_content(content, resources, matrix: tuple, stats: dict, depth: int = 0) -> None:
+    """Accumulate glyph, figure and path statistics of a content stream, following forms"""
+    fonts = resources.get("/Font", {}) if resources is not None else {}
+    xobjects = resources.get("/XObject", {}) if resources is not None else {}
+    fonts = fonts.get_object() if fonts else {}
+    xobjects = xobjects.get_object() if xobjects else {}
+    stack = []
+    two_byte = False
+    for operands, operator in content.operations:
+        if operator == b"q":
+            stack.append(matrix)
+        elif operator == b"Q" and stack:
+            matrix = stack.pop()
+        elif operator == b"cm":
+            matrix = _multiply(tuple(float(value) for value in operands), matrix)
+        elif operator == b"Tf":
+            font = fonts.get(operands[0]) if operands else None
+            two_byte = font is not None and font.get_object().get("/Subtype") == "/Type0"
+        elif operator in _TEXT_OPERATORS:
+            stats["glyphs"] += _shown_glyphs(operands, two_byte)
+        elif operator in _PATH_OPERATORS:
+            stats["path_segments"] += _PATH_OPERATORS[operator]
+        elif operator == b"INLINE IMAGE":
+            stats["figure_area"] += abs(matrix[0] * matrix[3] - matrix[1] * matrix[2])
+        elif operator == b"Do" and operands:
+            xobject = xobjects.get(operands[0])
+            if xobject is None:
+                continue
+            xobject = xobject.get_object()
+            if xobject.get("/Subtype") == "/Image":
+                stats["figure_area"] += abs(matrix[0] * matrix[3] - matrix[1] * matrix[2])
+            elif xobject.get("/Subtype") == "/Form" and depth < _MAX_FORM_DEPTH:
+                form_matrix = tuple(float(value) for value in xobject.get("/Matrix", (1, 0, 0, 1, 0, 0)))
+                form_resources = xobject.get("/Resources")
+                _walk_content(ContentStream(xobject, xobject.indirect_reference.pdf if xobject.indirect_reference else None),
+                              form_resources.get_object() if form_resources is not None else resources,
+                              _multiply(form_matrix, matrix), stats, depth + 1)
+
+
+def page_layout_stats(page: PageObject) -> Dict[str, float]:
+    """
+    Measure what a page draws besides text, without rendering it.
+
+    Args:
+        page: PyPDF2 page object
+
+    Returns:
+        Dictionary with "glyphs" (glyphs shown by text operators), "figure_area"
+        (fraction of the page area covered by images) and "path_segments"
+        (segments of vector paths: rules, table grids, diagrams)
+    """
+    stats = {"glyphs": 0, "figure_area": 0.0, "path_segments": 0}
+    try:
+        contents = page.get_contents()
+        if contents is None:
+            return stats
+        if not isinstance(contents, ContentStream):
+            contents = ContentStream(contents, page.pdf)
+        resources = page.get("/Resources")
+        _walk_content(contents, resources.get_object() if resources is not None else None,
+                      (1.0, 0.0, 0.0, 1.0, 0.0, 0.0), stats)
+        page_area = float(page.mediabox.width) * float(page.mediabox.height)
+        stats["figure_area"] = min(1.0, stats["figure_area"] / page_area) if page_area > 0 else 0.0
+    except Exception as e:
+        # Unparseable content streams are treated as fully complex
+        logger.debug(f"Cannot analyze page content: {str(e)}")
+        stats["figure_area"] = 1.0
+    return stats
+
+
+def _is_garbage(char: str) -> bool:
+    if char == "�":
+        return True
+    category = unicodedata.category(char)
+    return category in ("Co", "Cn") or (category == "Cc" and char not in "\n\r\t")
+
+
+def score_text_layer(text: str, layout: Dict[str, float]) -> Dict[str, float]:
+    """
+    Score how well the text layer of a page represents its content.
+
+    Args:
+        text: Text layer of the page
+        layout: Result of page_layout_stats
+
+    Returns:
+        Dictionary with "coverage" (extracted characters per glyph shown, up to 1.0),
+        "garbage_ratio" (fraction of unreadable characters), "layout_complexity"
+        (0.0 for plain prose, 1.0 for figures, tables or diagrams) and "score"
+        (0.0 to 1.0, high when the text layer alone is a faithful copy of the page)
+    """
+    characters = [char for char in text if not char.isspace()]
+    if not characters:
+        return {"coverage": 0.0, "garbage_ratio": 0.0, "layout_complexity": 1.0, "score": 0.0}
+
+    coverage = min(1.0, len(characters) / layout["glyphs"]) if layout["glyphs"] else 0.0
+    garbage_ratio = sum(1 for char in characters if _is_garbage(char)) / len(characters)
+
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    # Tables of contents and indexes extract as lines with dot leaders
+    tabular_lines = sum(1 for line in lines if len(line) < SHORT_LINE_CHARS or _LEADER.search(line)) / len(lines)
+    layout_complexity = max(min(1.0, layout["figure_area"] / FIGURE_AREA_LIMIT),
+                            min(1.0, layout["path_segments"] / PATH_SEGMENT_LIMIT),
+                            min(1.0, tabular_lines / TABULAR_LINE_LIMIT))
+
+    score = coverage * max(0.0, 1.0 - garbage_ratio / MAX_GARBAGE_RATIO) * (1.0 - layout_complexity)
+    return {
+        "coverage": round(coverage, 3),
+        "garbage_ratio": round(garbage_ratio, 4),
+        "layout_complexity": round(layout_complexity, 3),
+        "score": round(score, 3),
+    }
+
+
+def _line_key(line: str) -> str:
+    # Page numbers differ between otherwise identical headers and footers
+    return re.sub(r"\d+", "#", " ".join(line.split()).lower())
+
+
+def find_repeated_lines(texts: Iterable[str]) -> Set[str]:
+    """
+    Find running headers and footers in the text layers of a document's pages.
+
+    Args:
+        texts: Text layers of the pages
+
+    Returns:
+        Normalized lines (see text_layer_markdown) found at the top or bottom of
+        at least REPEATED_LINE_MIN_PAGES pages
+    """
+    counts = {}
+    for text in texts:
+        lines = [line for line in text.splitlines() if line.strip()]
+        for key in {_line_key(line) for line in lines[:EDGE_LINES] + lines[-EDGE_LINES:]}:
+            counts[key] = counts.get(key, 0) + 1
+    return {key for key, count in counts.items() if count >= REPEATED_LINE_MIN_PAGES}
+
+
+def text_layer_markdown(text: str, repeated_lines: Optional[Set[str]] = None) -> str:
+    """
+    Convert the text layer of a prose page to Markdown.
+
+    Wrapped lines are joined into paragraphs, words hyphenated at line ends are
+    rejoined, bullets become list items and numbered headings ("3.1 Overview")
+    become headings of the matching level. Page numbers and running headers
+    and footers are dropped from the top and bottom EDGE_LINES lines, where
+    find_repeated_lines looks for them; the body is kept as it is.
+
+    Args:
+        text: Text layer of the page
+        repeated_lines: Running headers and footers from find_repeated_lines
+
+    Returns:
+        Markdown content
+    """
+    repeated_lines = repeated_lines or set()
+    lines = [line for line in (" ".join(line.split()) for line in text.splitlines()) if line]
+    lines = [line for i, line in enumerate(lines)
+             if EDGE_LINES <= i < len(lines) - EDGE_LINES
+             or not (_PAGE_NUMBER.match(line) or _line_key(line) in repeated_lines)]
+    if not lines:
+        return ""
+    # Lines well short of the usual width end a paragraph
+    paragraph_width = statistics.median(len(line) for line in lines) * 0.6
+
+    blocks: List[str] = []
+    paragraph = ""
+    previous = ""
+    for line in lines:
+        heading = _NUMBERED_HEADING.match(line)
+        bullet = _BULLET.match(line)
+        if heading is not None and not _SENTENCE_END.search(line):
+            blocks.append(paragraph)
+            level = min(6, heading.group(1).count(".") + 2)
+            blocks.append(f"{'#' * level} {line}")
+            paragraph = ""
+        elif bullet is not None:
+            blocks.append(paragraph)
+            paragraph = f"- {line[bullet.end():]}"
+        elif paragraph.endswith("-") and line[:1].islower():
+            paragraph = paragraph[:-1] + line
+        elif paragraph and not (_SENTENCE_END.search(previous) and len(previous) < paragraph_width):
+            paragraph = f"{paragraph} {line}"
+        else:
+            blocks.append(paragraph)
+            paragraph = _MARKDOWN_LEADING.sub(r"\\\1", line)
+        previous = line
+    blocks.append(paragraph)
+    return "\n\n".join(block for block in blocks if block) + "\n"
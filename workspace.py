@@ -0,0 +1,225 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import Optional
+
+from render_cache import evict_lru
+
+
+# Default root of run workspaces (can be overridden with SMARTPDF_WORKSPACE_DIR)
+DEFAULT_WORKSPACE_DIR = os.getenv(
+    "SMARTPDF_WORKSPACE_DIR",
+    os.path.join(tempfile.gettempdir(), "smartpdf-analyzer")
+)
+
+# Default disk budget of all workspaces under a root, in megabytes
+DEFAULT_WORKSPACE_SIZE_MB = 4096
+
+# RAM-backed file system used for workspaces when requested and large enough
+TMPFS_DIR = "/dev/shm"
+
+# Free tmpfs space and available RAM required, as a multiple of the expected workspace size
+TMPFS_HEADROOM = 2.0
+
+# Typical size of a rendered page PNG at 200 DPI; scales with the square of the resolution
+PAGE_BYTES_AT_200_DPI = 1536 * 1024
+
+_RUN_DIR = re.compile(r"run_(\d+)_")
+
+logger = logging.getLogger("Workspace")
+
+
+def estimate_page_bytes(dpi: int) -> int:
+    """Estimate the size of a rendered page image at a resolution"""
+    return int(PAGE_BYTES_AT_200_DPI * (dpi / 200) ** 2)
+
+
+def _directory_size(directory: str) -> int:
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _available_memory() -> Optional[int]:
+    """Available RAM in bytes, Linux only"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill cannot probe processes on Windows; treat every run as alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def tmpfs_fits(expected_bytes: int) -> bool:
+    """
+    Check whether a workspace of the expected size fits on tmpfs.
+
+    Args:
+        expected_bytes: Expected workspace size in bytes
+
+    Returns:
+        True if TMPFS_DIR exists and both its free space and the available RAM
+        exceed the expected size by TMPFS_HEADROOM
+    """
+    if not os.path.isdir(TMPFS_DIR):
+        return False
+    try:
+        stat = os.statvfs(TMPFS_DIR)
+    except (AttributeError, OSError):
+        return False
+    required = expected_bytes * TMPFS_HEADROOM
+    available_memory = _available_memory()
+    return stat.f_bavail * stat.f_frsize >= required and available_memory is not None and available_memory >= required
+
+
+class Workspace:
+    """
+    Directory owning the page artifacts of one run.
+
+    Workspaces live under ``<root>/active`` while their run is in progress.
+    When the run finishes, the workspace is deleted on success, or moved to
+    ``<root>/kept`` on failure and in debug mode. Workspaces of runs whose
+    process is gone are moved to ``kept`` as well. Kept artifacts are trimmed,
+    least recently used first, so that all workspaces under the root stay
+    within a disk budget shared by concurrent runs; active workspaces are never
+    trimmed.
+
+    The budget is only applied between runs, when a workspace is created and
+    when one is kept. Pages written while a run is in progress are not checked
+    against it, so a long run can exceed it until the next run starts or ends.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_size_mb: int = DEFAULT_WORKSPACE_SIZE_MB, keep: bool = False):
+        """
+        Initialize the workspace. The directory is created by create().
+
+        Args:
+            root: Root directory of the workspaces (default: DEFAULT_WORKSPACE_DIR)
+            max_size_mb: Disk budget of all workspaces under the root in megabytes
+            keep: Keep the artifacts even if the run succeeds
+        """
+        self.root = root or DEFAULT_WORKSPACE_DIR
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.keep = keep
+        self.path = None
+        self.failed = False
+
+    def create(self, expected_bytes: int = 0, use_tmpfs: bool = False) -> str:
+        """
+        Create the workspace directory.
+
+        Args:
+            expected_bytes: Expected size of the artifacts, used for the tmpfs decision
+            use_tmpfs: Place the workspace on tmpfs if it fits there
+
+        Returns:
+            Path to the workspace directory
+        """
+        if use_tmpfs:
+            if tmpfs_fits(expected_bytes):
+                self.root = os.path.join(TMPFS_DIR, os.path.basename(self.root.rstrip(os.sep)))
+            else:
+                logger.info(f"Not enough RAM for a {expected_bytes / 1024 / 1024:.0f} MB workspace on tmpfs, using {self.root}")
+
+        active_dir = os.path.join(self.root, "active")
+        os.makedirs(active_dir, exist_ok=True)
+        os.makedirs(os.path.join(self.root, "kept"), exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=f"run_{os.getpid()}_", dir=active_dir)
+        logger.info(f"Using workspace {self.path}")
+
+        self._keep_orphans()
+        self.enforce_budget(expected_bytes)
+        return self.path
+
+    def _keep_orphans(self) -> None:
+        """Move workspaces of runs whose process has exited to kept"""
+        active_dir = os.path.join(self.root, "active")
+        for name in os.listdir(active_dir):
+            match = _RUN_DIR.match(name)
+            if match is None or _process_alive(int(match.group(1))):
+                continue
+            try:
+                os.replace(os.path.join(active_dir, name), os.path.join(self.root, "kept", name))
+            except OSError:
+                continue
+
+    def enforce_budget(self, reserve_bytes: int = 0) -> int:
+        """
+        Trim kept artifacts so that all workspaces fit the disk budget.
+
+        Called by create and close; call it again to apply the budget during a run.
+
+        Args:
+            reserve_bytes: Space to keep free for artifacts still to be written
+
+        Returns:
+            Total size of the workspaces under the root in bytes
+        """
+        active_bytes = _directory_size(os.path.join(self.root, "active"))
+        kept_dir = os.path.join(self.root, "kept")
+        kept_bytes = evict_lru(kept_dir, max(0, self.max_bytes - active_bytes - reserve_bytes))
+
+        # Drop run directories emptied by the eviction
+        for name in os.listdir(kept_dir):
+            run_dir = os.path.join(kept_dir, name)
+            if os.path.isdir(run_dir) and not any(files for _, _, files in os.walk(run_dir)):
+                shutil.rmtree(run_dir, ignore_errors=True)
+
+        if active_bytes + reserve_bytes > self.max_bytes:
+            logger.warning(f"Active workspaces need {(active_bytes + reserve_bytes) / 1024 / 1024:.0f} MB, "
+                           f"more than the {self.max_bytes / 1024 / 1024:.0f} MB budget")
+        return active_bytes + kept_bytes
+
+    def mark_failed(self) -> None:
+        """Keep the artifacts when the workspace is closed"""
+        self.failed = True
+
+    def close(self, success: bool = True) -> None:
+        """
+        Finish the run: delete the workspace, or keep it on failure and in debug mode.
+
+        Args:
+            success: Whether the run succeeded
+        """
+        if self.path is None:
+            return
+        if success and not self.failed and not self.keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+            logger.info(f"Removed workspace {self.path}")
+        else:
+            kept_path = os.path.join(self.root, "kept", os.path.basename(self.path))
+            try:
+                os.replace(self.path, kept_path)
+            except OSError:
+                kept_path = self.path
+            logger.info(f"Kept page artifacts in {kept_path}")
+            self.enforce_budget()
+        self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(success=exc_type is None)